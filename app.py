@@ -1,18 +1,27 @@
 import streamlit as st
 import pandas as pd
-import base64
 import sys
 import os
+import time
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Nettoyage du cache
-for module_name in ['src', 'src.visualisation_with_llm', 'src.visualisation_with_llm.llm_utils', 'src.visualisation_with_llm.viz_utils']:
-    if module_name in sys.modules:
-        del sys.modules[module_name]
-
-from src.visualisation_with_llm.llm_utils import init_llm, generate_visualization_proposals
-from src.visualisation_with_llm.viz_utils import plot, fig_to_base64
+from src.visualisation_with_llm.llm_utils import init_llm, stream_visualization_proposals
+from src.visualisation_with_llm.viz_utils import IMAGE_FORMATS
+from src.visualisation_with_llm.filtering import column_index, count_rows, filter_rows
+from src.visualisation_with_llm.preprocessing import prepare_columns
+from src.visualisation_with_llm.render_cache import get_render_cache, render_images
+from src.visualisation_with_llm.llm_cache import cache_stats as llm_cache_stats
+from src.visualisation_with_llm.thumbnails import DISPLAY_OUTPUT, prerender, ready_thumbnail
+from src.visualisation_with_llm.dataset_cache import hash_file
+from src.visualisation_with_llm.dataset_store import get_dataset_store
+from src.visualisation_with_llm.dataset_summary import column_kinds, compact_llm_summary
+from src.visualisation_with_llm.profiler import cached_profile, profile_dataset, remember_profile
+from src.visualisation_with_llm.config import (
+    APPROX_PROFILE_MIN_ROWS,
+    MAX_CATEGORIES,
+    RENDER_DPI,
+)
 
 # =========================================================
 # CONFIG PAGE
@@ -43,6 +52,10 @@ st.markdown("""
         font-weight: 700;
     }
     h2, h3 { color: #1F2937; }
+    div[data-testid="stImage"] img {
+        border-radius: 8px;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.1);
+    }
     .stButton>button {
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
         color: white;
@@ -75,6 +88,69 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# =========================================================
+# ÉTAPES MISES EN CACHE
+# =========================================================
+# chargement → profil → propositions → rendu : chaque étape n'est recalculée
+# que si ses entrées changent. Les DataFrames sont identifiés par le hash du
+# fichier (`dataset_key`) ; les paramètres préfixés « _ » ne sont pas hachés.
+
+def record_stage(name, missed, start):
+    """Note pour le panneau de debug si une étape a été recalculée ou servie par le cache"""
+    st.session_state.setdefault("stage_stats", {})[name] = (missed, (time.perf_counter() - start) * 1000)
+
+
+def run_stage(name, func, *args, **kwargs):
+    """Appelle une étape en cache ; son corps ne s'exécute (et ne marque le recalcul) qu'en cas d'échec du cache"""
+    st.session_state["_stage_missed"] = False
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    record_stage(name, st.session_state["_stage_missed"], start)
+    return result
+
+
+def _mark_missed():
+    st.session_state["_stage_missed"] = True
+
+
+@st.cache_resource(show_spinner=False)
+def get_llm():
+    """Client LLM partagé par toutes les sessions"""
+    _mark_missed()
+    return init_llm()
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def dataset_overview(dataset_key: str, _df: pd.DataFrame) -> dict:
+    """Métriques et aperçu du dataset, calculés une fois par contenu"""
+    _mark_missed()
+    return {
+        "rows": len(_df),
+        "columns": len(_df.columns),
+        "numeric": len(_df.select_dtypes(include='number').columns),
+        "missing": int(_df.isnull().sum().sum()),
+        "head": _df.head(10),
+    }
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def dataset_profile(dataset_key: str, _df: pd.DataFrame, _digest: str = None):
+    """Profil du dataset (objet partagé, en lecture seule)"""
+    _mark_missed()
+    # Très gros CSV : profil par sketches déjà calculé pendant le chargement
+    profile = cached_profile(_digest)
+    if profile is not None and profile.approximate:
+        return profile
+    # Passes groupées, approchées par sketches sur les très gros datasets
+    return profile_dataset(_df, approximate=len(_df) >= APPROX_PROFILE_MIN_ROWS)
+
+
+def fragment(func=None, **kwargs):
+    """Fragment Streamlit (rerun partiel) si la version le permet, sinon fonction ordinaire"""
+    if func is None:
+        return lambda f: fragment(f, **kwargs)
+    return st.fragment(func, **kwargs) if hasattr(st, "fragment") else func
+
 # =========================================================
 # SIDEBAR
 # =========================================================
@@ -152,8 +228,24 @@ if not uploaded_file:
 
 # Charger
 try:
-    df = pd.read_csv(uploaded_file)
-    df = df.dropna(how="all").dropna(axis=1, how="all")
+    # Hash calculé une seule fois par upload, pas à chaque rerun
+    upload_id = getattr(uploaded_file, "file_id", None) or (uploaded_file.name, uploaded_file.size)
+    load_start = time.perf_counter()
+    loads = get_dataset_store().loads
+    if st.session_state.get("upload_id") != upload_id or "dataset" not in st.session_state:
+        st.session_state["upload_id"] = upload_id
+        st.session_state["dataset_hash"] = hash_file(uploaded_file)
+        # Dataset partagé entre sessions : la session ne garde qu'une poignée
+        previous = st.session_state.pop("dataset", None)
+        if previous is not None:
+            previous.release()
+        st.session_state["dataset"] = get_dataset_store().open(
+            uploaded_file, digest=st.session_state["dataset_hash"], streaming=True
+        )
+    
+    # En mémoire si le budget le permet, sinon relu depuis le fichier Arrow memory-mappé
+    df = st.session_state["dataset"].df
+    record_stage("Chargement", get_dataset_store().loads > loads, load_start)
     
     if df.empty:
         st.error("❌ Dataset vide")
@@ -166,20 +258,20 @@ except Exception as e:
     st.stop()
 
 # Aperçu
+overview = run_stage("Aperçu", dataset_overview, st.session_state["dataset"].key, df)
 with st.expander("👁️ Aperçu", expanded=False):
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("📊 Lignes", f"{len(df):,}")
+        st.metric("📊 Lignes", f"{overview['rows']:,}")
     with col2:
-        st.metric("📋 Colonnes", len(df.columns))
+        st.metric("📋 Colonnes", overview['columns'])
     with col3:
-        numeric = df.select_dtypes(include='number').columns
-        st.metric("🔢 Numériques", len(numeric))
+        st.metric("🔢 Numériques", overview['numeric'])
     with col4:
-        st.metric("❓ Manquantes", f"{df.isnull().sum().sum():,}")
+        st.metric("❓ Manquantes", f"{overview['missing']:,}")
     
-    st.dataframe(df.head(10), use_container_width=True)
+    st.dataframe(overview['head'], use_container_width=True)
 
 if not problem:
     st.warning("⚠️ Saisissez une problématique")
@@ -207,21 +299,53 @@ with col3:
 # =========================================================
 # DATASET SUMMARIZATION
 # =========================================================
-def summarize_dataset(df: pd.DataFrame) -> str:
-    summary = []
-    summary.append(f"Nombre de lignes : {len(df)}")
-    summary.append(f"Nombre de colonnes : {len(df.columns)}")
-    summary.append("\nColonnes :")
-    for col in df.columns:
-        dtype = str(df[col].dtype)
-        if pd.api.types.is_numeric_dtype(df[col]):
-            summary.append(
-                f"- {col} ({dtype}) | min={df[col].min()} | max={df[col].max()} | moyenne={df[col].mean():.2f}"
-            )
+def summarize_dataset(df: pd.DataFrame, problem: str) -> str:
+    profile = run_stage("Profil", dataset_profile, st.session_state["dataset"].key, df,
+                        st.session_state.get("dataset_hash"))
+    # Réutilisé au rendu (moyenne et médiane des histogrammes)
+    remember_profile(st.session_state.get("dataset_hash"), profile)
+    # Résumé borné en tokens : colonnes les plus pertinentes pour la problématique d'abord
+    return compact_llm_summary(profile, problem)
+
+# =========================================================
+# CARTES DE PROPOSITION
+# =========================================================
+def render_spec_card(spec: dict, idx: int, thumbnail=None):
+    st.subheader(f"📊 Proposition {idx + 1}")
+    st.markdown(f"**{spec.get('title', 'Sans titre')}**")
+    
+    # Miniature rendue en arrière-plan (Future), affichée dès qu'elle est prête
+    if thumbnail is not None:
+        image = ready_thumbnail(thumbnail)
+        if image is not None:
+            st.image(image, use_container_width=True)
+        elif thumbnail.done():
+            st.caption("⚠️ Aperçu indisponible")
         else:
-            uniques = df[col].nunique()
-            summary.append(f"- {col} ({dtype}) | valeurs uniques={uniques}")
-    return "\n".join(summary)
+            st.caption("⏳ Aperçu en cours de rendu...")
+    
+    st.markdown(f"**Type :** {spec.get('type', 'N/A').upper()}")
+    st.markdown(f"**Variables :** {spec.get('x', 'N/A')} {('vs ' + spec.get('y')) if spec.get('y') else ''}")
+    
+    # JUSTIFICATION
+    if spec.get('justification'):
+        st.markdown(f"""
+        <div class="justification">
+            <strong>💡 Justification :</strong><br>
+            {spec.get('justification')}
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # DÉTAILS TECHNIQUES (TOUJOURS VISIBLES)
+    with st.expander("🔧 Détails techniques", expanded=False):
+        st.markdown(f"""
+        <div class="tech-details">
+        📊 <strong>Type :</strong> {spec.get('type', 'N/A')}<br>
+        📈 <strong>Axe X :</strong> {spec.get('x', 'null')}<br>
+        📈 <strong>Axe Y :</strong> {spec.get('y', 'null')}<br>
+        📝 <strong>Titre :</strong> {spec.get('title', 'Sans titre')}
+        </div>
+        """, unsafe_allow_html=True)
 
 # =========================================================
 # GÉNÉRATION
@@ -229,8 +353,8 @@ def summarize_dataset(df: pd.DataFrame) -> str:
 if gen_btn or regen_btn:
     with st.spinner("🔄 Génération des propositions..."):
         try:
-            llm = init_llm()
-            dataset_summary = summarize_dataset(df)
+            llm = run_stage("Client LLM", get_llm)
+            dataset_summary = summarize_dataset(df, problem)
             
             if show_details:
                 with st.expander("📄 Résumé LLM"):
@@ -249,21 +373,53 @@ if gen_btn or regen_btn:
             else:
                 st.info(f"🤖 Mode automatique - {num_proposals} visualisation(s)")
             
-            specs = generate_visualization_proposals(
-                llm,
-                problem,
-                dataset_summary,
-                preferred_types=preferred_types,
-                num_proposals=num_proposals,
-                allow_duplicates=allow_duplicates
-            )
+            # Les cartes s'affichent au fil de la réponse du LLM
+            propose_start = time.perf_counter()
+            llm_calls = llm_cache_stats["calls"]
+            specs = []
+            thumbnails = []
+            stream_area = st.empty()
+            with stream_area.container():
+                cols = None
+                for spec in stream_visualization_proposals(
+                    llm,
+                    problem,
+                    dataset_summary,
+                    preferred_types=preferred_types,
+                    num_proposals=num_proposals,
+                    allow_duplicates=allow_duplicates,
+                    # "Régénérer" force un nouvel appel au lieu de relire le cache
+                    use_cache=not regen_btn,
+                    # Specs validées contre les colonnes réelles du dataset
+                    columns=column_kinds(dataset_profile(st.session_state["dataset"].key, df,
+                                                         st.session_state.get("dataset_hash")))
+                ):
+                    if len(specs) % 3 == 0:
+                        cols = st.columns(3)
+                    with cols[len(specs) % 3]:
+                        render_spec_card(spec, len(specs))
+                    specs.append(spec)
+                    # Miniature (et rendu pleine résolution) lancés dès l'arrivée de la spec
+                    thumbnails.extend(prerender(
+                        df, [spec], palette=palette, color=custom_color,
+                        dataset_key=st.session_state.get("dataset_hash")
+                    ))
+            # Remplacé par la grille interactive ci-dessous
+            stream_area.empty()
+            record_stage("Propositions", llm_cache_stats["calls"] > llm_calls, propose_start)
             
             if not specs:
                 st.error("❌ Aucune visualisation générée")
                 st.stop()
             
             st.session_state["specs"] = specs
-            st.session_state["df"] = df
+            st.session_state["thumbnails"] = thumbnails
+            # Nouvelle poignée : le dataset des propositions reste disponible après un autre upload
+            previous = st.session_state.pop("df_handle", None)
+            if previous is not None:
+                previous.release()
+            st.session_state["df_handle"] = get_dataset_store().acquire(st.session_state["dataset"].key)
+            st.session_state["df_hash"] = st.session_state.get("dataset_hash")
             st.session_state["palette"] = palette
             st.session_state["color"] = custom_color
             st.session_state["selected_viz"] = None
@@ -282,7 +438,13 @@ if gen_btn or regen_btn:
 # =========================================================
 if "specs" in st.session_state and st.session_state["specs"]:
     specs = st.session_state["specs"]
-    df = st.session_state["df"]
+    try:
+        df = st.session_state["df_handle"].df
+    except KeyError as e:
+        # Dataset déchargé dont la copie sur disque a disparu : propositions à regénérer
+        st.session_state.pop("specs", None)
+        st.error(f"❌ Dataset des propositions indisponible ({e}), relancez la génération")
+        st.stop()
     palette = st.session_state.get("palette", "deep")
     color = st.session_state.get("color", "#4F8BF9")
     
@@ -290,61 +452,51 @@ if "specs" in st.session_state and st.session_state["specs"]:
     st.header("📋 Propositions de visualisations")
     st.markdown("**Sélectionnez une visualisation pour la générer**")
     
-    # Grille adaptative
-    for row_start in range(0, len(specs), 3):
-        cols = st.columns(3)
-        row_specs = specs[row_start:row_start + 3]
-        
-        for idx_in_row, (col, spec) in enumerate(zip(cols, row_specs)):
-            actual_idx = row_start + idx_in_row
+    thumbnails = st.session_state.get("thumbnails") or [None] * len(specs)
+    
+    def render_proposal_grid(auto_refresh=False):
+        # Grille adaptative
+        for row_start in range(0, len(specs), 3):
+            cols = st.columns(3)
+            row_specs = specs[row_start:row_start + 3]
             
-            with col:
-                st.subheader(f"📊 Proposition {actual_idx + 1}")
-                st.markdown(f"**{spec.get('title', 'Sans titre')}**")
-                
-                st.markdown(f"**Type :** {spec.get('type', 'N/A').upper()}")
-                st.markdown(f"**Variables :** {spec.get('x', 'N/A')} {('vs ' + spec.get('y')) if spec.get('y') else ''}")
-                
-                # JUSTIFICATION
-                if spec.get('justification'):
-                    st.markdown(f"""
-                    <div class="justification">
-                        <strong>💡 Justification :</strong><br>
-                        {spec.get('justification')}
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                # DÉTAILS TECHNIQUES (TOUJOURS VISIBLES)
-                with st.expander("🔧 Détails techniques", expanded=False):
-                    st.markdown(f"""
-                    <div class="tech-details">
-                    📊 <strong>Type :</strong> {spec.get('type', 'N/A')}<br>
-                    📈 <strong>Axe X :</strong> {spec.get('x', 'null')}<br>
-                    📈 <strong>Axe Y :</strong> {spec.get('y', 'null')}<br>
-                    📝 <strong>Titre :</strong> {spec.get('title', 'Sans titre')}
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                # Bouton de sélection
-                is_selected = st.session_state.get("selected_viz") == actual_idx
+            for idx_in_row, (col, spec) in enumerate(zip(cols, row_specs)):
+                actual_idx = row_start + idx_in_row
                 
-                if st.button(
-                    "✓ Sélectionné" if is_selected else "Sélectionner",
-                    key=f"select_{actual_idx}",
-                    use_container_width=True,
-                    disabled=is_selected,
-                    type="primary" if is_selected else "secondary"
-                ):
-                    st.session_state["selected_viz"] = actual_idx
-                    # Initialiser les paramètres de personnalisation
-                    st.session_state["custom_title"] = spec.get('title', '')
-                    st.session_state["filter_enabled"] = False
-                    st.rerun()
+                with col:
+                    render_spec_card(spec, actual_idx, thumbnails[actual_idx])
+                    
+                    # Bouton de sélection
+                    is_selected = st.session_state.get("selected_viz") == actual_idx
+                    
+                    if st.button(
+                        "✓ Sélectionné" if is_selected else "Sélectionner",
+                        key=f"select_{actual_idx}",
+                        use_container_width=True,
+                        disabled=is_selected,
+                        type="primary" if is_selected else "secondary"
+                    ):
+                        st.session_state["selected_viz"] = actual_idx
+                        # Initialiser les paramètres de personnalisation
+                        st.session_state["custom_title"] = spec.get('title', '')
+                        st.session_state["filter_enabled"] = False
+                        st.rerun()
+        
+        # Toutes les miniatures sont prêtes : arrêter le rafraîchissement périodique
+        if auto_refresh and all(t is None or t.done() for t in thumbnails):
+            st.rerun()
+    
+    # Grille en fragment : rafraîchie seule tant que des miniatures sont en cours
+    pending = any(t is not None and not t.done() for t in thumbnails)
+    if pending:
+        fragment(render_proposal_grid, run_every=1.0)(auto_refresh=True)
+    else:
+        fragment(render_proposal_grid)()
     
     # =========================================================
     # VISUALISATION FINALE AVEC PERSONNALISATION
     # =========================================================
-    if st.session_state.get("selected_viz") is not None:
+    def render_final_panel():
         st.divider()
         st.header("📊 Visualisation finale")
         
@@ -384,59 +536,83 @@ if "specs" in st.session_state and st.session_state["specs"]:
                 )
                 st.session_state["filter_enabled"] = filter_enabled
                 
+                filters = {}
                 if filter_enabled:
                     x_col = selected_spec.get('x')
                     y_col = selected_spec.get('y')
+                    df_key = st.session_state.get("df_hash")
                     
-                    # Filtrage selon les colonnes disponibles
-                    if x_col and x_col in df.columns:
-                        if pd.api.types.is_numeric_dtype(df[x_col]):
-                            min_val = float(df[x_col].min())
-                            max_val = float(df[x_col].max())
-                            filter_range_x = st.slider(
-                                f"Plage de {x_col}",
-                                min_val,
-                                max_val,
-                                (min_val, max_val),
-                                help=f"Filtrer les valeurs de {x_col}"
+                    # Colonnes nettoyées (mémoïsées) et index construits une fois par dataset :
+                    # bornes et effectifs lus dans les index, sans parcourir le DataFrame
+                    filter_cols = [c for c in dict.fromkeys([x_col, y_col]) if c and c in df.columns]
+                    prepared = prepare_columns(df, filter_cols, df_key)
+                    for filter_col in filter_cols:
+                        series = prepared[filter_col]
+                        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                            index = column_index(series, "range", df_key)
+                            if not index.min < index.max:
+                                continue
+                            filters[filter_col] = st.slider(
+                                f"Plage de {filter_col}",
+                                index.min,
+                                index.max,
+                                (index.min, index.max),
+                                help=f"Filtrer les valeurs de {filter_col}"
                             )
-                            # Appliquer le filtre
-                            df = df[(df[x_col] >= filter_range_x[0]) & (df[x_col] <= filter_range_x[1])]
-                    
-                    if y_col and y_col in df.columns and pd.api.types.is_numeric_dtype(df[y_col]):
-                        min_val = float(df[y_col].min())
-                        max_val = float(df[y_col].max())
-                        filter_range_y = st.slider(
-                            f"Plage de {y_col}",
-                            min_val,
-                            max_val,
-                            (min_val, max_val),
-                            help=f"Filtrer les valeurs de {y_col}"
-                        )
-                        # Appliquer le filtre
-                        df = df[(df[y_col] >= filter_range_y[0]) & (df[y_col] <= filter_range_y[1])]
+                        else:
+                            index = column_index(series, "category", df_key)
+                            if not 1 < len(index.categories) <= MAX_CATEGORIES:
+                                continue
+                            options = list(index.categories)
+                            selected = st.multiselect(
+                                f"Valeurs de {filter_col}",
+                                options,
+                                default=options,
+                                help=f"Filtrer les catégories de {filter_col}"
+                            )
+                            filters[filter_col] = selected
                     
-                    st.caption(f"📊 Données filtrées : {len(df)} lignes")
+                    st.caption(f"📊 Données filtrées : {count_rows(prepared, filters, df_key):,} lignes")
         
-        # Générer et afficher
+        # Générer et afficher (servi depuis le cache si rien de pertinent n'a changé)
         try:
-            fig = plot(df, selected_spec, palette=palette, color=color)
-            img_base64 = fig_to_base64(fig)
+            # L'image reste au-dessus du choix du format d'export, rendu avec elle
+            image_slot = st.empty()
+            col_fmt, col_dl = st.columns([1, 3])
+            with col_fmt:
+                export_format = st.selectbox(
+                    "Format",
+                    list(IMAGE_FORMATS),
+                    format_func=str.upper,
+                    label_visibility="collapsed"
+                )
             
-            st.markdown(
-                f'<img src="{img_base64}" style="width:100%; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.1);">',
-                unsafe_allow_html=True
+            render_start = time.perf_counter()
+            render_misses = get_render_cache().misses
+            # Une seule figure pour l'image affichée (résolution adaptée à la largeur
+            # d'affichage) et le fichier exporté ; octets bruts servis tels quels
+            export_output = (export_format, RENDER_DPI)
+            images = render_images(
+                df,
+                selected_spec,
+                palette=palette,
+                color=color,
+                filters=filters,
+                outputs=(DISPLAY_OUTPUT, export_output),
+                dataset_key=st.session_state.get("df_hash")
             )
+            record_stage("Rendu", get_render_cache().misses > render_misses, render_start)
+            image_slot.image(images[DISPLAY_OUTPUT], use_container_width=True)
             
-            # Export PNG
-            img_bytes = base64.b64decode(img_base64.split(',')[1])
-            st.download_button(
-                label="💾 Télécharger PNG",
-                data=img_bytes,
-                file_name=f"visualization_{selected_spec.get('type', 'chart')}.png",
-                mime="image/png",
-                use_container_width=True
-            )
+            # Export dans le format choisi
+            with col_dl:
+                st.download_button(
+                    label=f"💾 Télécharger {export_format.upper()}",
+                    data=images[export_output],
+                    file_name=f"visualization_{selected_spec.get('type', 'chart')}.{export_format}",
+                    mime=IMAGE_FORMATS[export_format],
+                    use_container_width=True
+                )
             
             if show_details:
                 with st.expander("ℹ️ Détails de la visualisation"):
@@ -464,7 +640,9 @@ if "specs" in st.session_state and st.session_state["specs"]:
         
         with col2:
             if st.button("📊 Export CSV", use_container_width=True):
-                csv = df.to_csv(index=False).encode('utf-8')
+                rows = filter_rows(prepare_columns(df, list(filters), st.session_state.get("df_hash")),
+                                   filters, st.session_state.get("df_hash"))
+                csv = (df if rows is None else df.take(rows)).to_csv(index=False).encode('utf-8')
                 st.download_button(
                     "💾 CSV",
                     csv,
@@ -472,9 +650,35 @@ if "specs" in st.session_state and st.session_state["specs"]:
                     "text/csv",
                     use_container_width=True
                 )
+    
+    if st.session_state.get("selected_viz") is not None:
+        # Fragment : titre, bins, filtres et exports ne relancent que ce panneau
+        fragment(render_final_panel)()
 
 else:
     st.info("👆 Cliquez sur 'Générer les propositions' pour commencer")
 
+# =========================================================
+# PANNEAU DE DEBUG
+# =========================================================
+if show_details:
+    with st.sidebar.expander("🧪 Étapes et caches", expanded=True):
+        for name, (missed, elapsed) in st.session_state.get("stage_stats", {}).items():
+            st.caption(f"{'🔄 recalculé' if missed else '✅ cache'} • {name} ({elapsed:,.0f} ms)")
+        
+        render_cache = get_render_cache()
+        st.caption(
+            f"🖼️ Rendus : {render_cache.hits} servis par le cache, {render_cache.misses} calculés "
+            f"({render_cache.size / 1024 ** 2:,.1f} Mo)"
+        )
+        st.caption(f"🤖 LLM : {llm_cache_stats['hits']} réponses en cache, {llm_cache_stats['calls']} appels")
+        
+        usage = get_dataset_store().usage()
+        st.caption(
+            f"🗄️ Datasets en mémoire : {usage['resident_bytes'] / 1024 ** 2:,.0f} / "
+            f"{usage['max_bytes'] / 1024 ** 2:,.0f} Mo • {usage['datasets']} dataset(s), "
+            f"{usage['handles']} poignée(s)"
+        )
+
 st.divider()
 st.caption("🤖 Propulsé par Google Gemini 2.0 • DataViz AI")
\ No newline at end of file
@@ -0,0 +1,176 @@
+# aggregation.py
+import numpy as np
+import pandas as pd
+
+# Résolution de la grille d'agrégation (≈ pixels de la zone de tracé)
+GRID_WIDTH = 600
+GRID_HEIGHT = 360
+
+
+def _as_float(values) -> np.ndarray:
+    """Valeurs numériques ou dates converties en float64 (dates en nanosecondes)"""
+    if isinstance(values, pd.Series) and pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy().astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+
+def _bin_index(values, lo, hi, n_bins):
+    """Indice de case de chaque valeur (bornes incluses) par simple arithmétique"""
+    span = hi - lo if hi > lo else 1.0
+    idx = ((values - lo) * (n_bins / span)).astype(np.int64)
+    return np.clip(idx, 0, n_bins - 1)
+
+
+# =========================================================
+# SCATTER : GRILLE DE DENSITÉ
+# =========================================================
+
+def density_grid(x, y, width=GRID_WIDTH, height=GRID_HEIGHT, groups=None, n_groups=1):
+    """
+    Compte les points par case d'une grille width × height.
+
+    Args:
+        groups: codes entiers (0..n_groups-1) pour une grille par catégorie
+
+    Returns:
+        (grille de forme (n_groups, height, width), (xmin, xmax, ymin, ymax))
+    """
+    x = _as_float(x)
+    y = _as_float(y)
+    extent = (float(x.min()), float(x.max()), float(y.min()), float(y.max()))
+
+    flat = _bin_index(y, extent[2], extent[3], height) * width + _bin_index(x, extent[0], extent[1], width)
+    if groups is not None:
+        flat = flat + np.asarray(groups, dtype=np.int64) * (width * height)
+    counts = np.bincount(flat, minlength=n_groups * width * height)
+    return counts.reshape(n_groups, height, width), extent
+
+
+# =========================================================
+# LINE : MOYENNE ET ENVELOPPE PAR COLONNE DE PIXELS
+# =========================================================
+
+def line_envelope(x, y, n_bins=GRID_WIDTH):
+    """
+    Résume une série (x, y) en n_bins colonnes : x moyen, y moyen, min et max.
+    Le tracé reste de taille constante quel que soit le nombre de points.
+
+    Returns:
+        dict de tableaux 'x', 'mean', 'min', 'max' (colonnes vides retirées)
+    """
+    x = _as_float(x)
+    y = _as_float(y)
+    idx = _bin_index(x, x.min(), x.max(), n_bins)
+
+    counts = np.bincount(idx, minlength=n_bins)
+    sum_x = np.bincount(idx, weights=x, minlength=n_bins)
+    sum_y = np.bincount(idx, weights=y, minlength=n_bins)
+    y_min = np.full(n_bins, np.inf)
+    y_max = np.full(n_bins, -np.inf)
+    np.minimum.at(y_min, idx, y)
+    np.maximum.at(y_max, idx, y)
+
+    present = counts > 0
+    n = counts[present]
+    return {
+        "x": sum_x[present] / n,
+        "mean": sum_y[present] / n,
+        "min": y_min[present],
+        "max": y_max[present],
+    }
+
+
+# =========================================================
+# BAR / COUNT / BOXPLOT : AGRÉGATS PAR CATÉGORIE
+# =========================================================
+
+OTHERS_LABEL = "Autres"
+
+
+def category_codes(values, top_n=None):
+    """
+    Code entier de chaque valeur (ordre d'apparition, ordre croissant si numérique).
+    Au-delà de top_n catégories, seules les plus fréquentes sont gardées et
+    les autres regroupées dans une catégorie "Autres" placée en dernier.
+
+    Returns:
+        (codes, labels)
+    """
+    values = pd.Series(values)
+    numeric = pd.api.types.is_numeric_dtype(values)
+    codes, uniques = pd.factorize(values, sort=numeric)
+    labels = [str(u) for u in uniques]
+
+    if top_n and len(uniques) > top_n:
+        counts = np.bincount(codes, minlength=len(uniques))
+        keep = np.sort(np.argsort(-counts, kind="stable")[:top_n])
+        remap = np.full(len(uniques), top_n, dtype=np.int64)
+        remap[keep] = np.arange(top_n)
+        codes = remap[codes]
+        labels = [labels[k] for k in keep] + [OTHERS_LABEL]
+
+    return codes, labels
+
+
+def group_counts(values, top_n=None):
+    """Effectif par catégorie. Returns: (labels, counts)"""
+    codes, labels = category_codes(values, top_n)
+    return labels, np.bincount(codes, minlength=len(labels))
+
+
+def group_stats(x, y, top_n=None, whisker=1.5, max_outliers=50, seed=0):
+    """
+    Statistiques de y par catégorie de x en un seul tri :
+    effectif, moyenne, quartiles, moustaches et échantillon de valeurs aberrantes.
+
+    Returns:
+        (labels, dict de tableaux 'count', 'mean', 'q1', 'median', 'q3',
+         'whislo', 'whishi' et liste 'fliers' par catégorie)
+    """
+    codes, labels = category_codes(x, top_n)
+    y = np.asarray(y, dtype=np.float64)
+    k = len(labels)
+
+    # Tri par (catégorie, valeur) : chaque groupe devient une tranche triée
+    order = np.lexsort((y, codes))
+    codes, y = codes[order], y[order]
+    counts = np.bincount(codes, minlength=k)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    def _quantile(q):
+        pos = starts + (counts - 1) * q
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, starts + counts - 1)
+        return y[lo] + (y[hi] - y[lo]) * (pos - lo)
+
+    q1, median, q3 = _quantile(0.25), _quantile(0.5), _quantile(0.75)
+    iqr = q3 - q1
+    inside = (y >= (q1 - whisker * iqr)[codes]) & (y <= (q3 + whisker * iqr)[codes])
+
+    whislo = np.full(k, np.inf)
+    whishi = np.full(k, -np.inf)
+    np.minimum.at(whislo, codes[inside], y[inside])
+    np.maximum.at(whishi, codes[inside], y[inside])
+
+    # Valeurs aberrantes : échantillon borné, extrêmes toujours conservés
+    rng = np.random.default_rng(seed)
+    fliers = []
+    for g in range(k):
+        segment = slice(starts[g], starts[g] + counts[g])
+        out = y[segment][~inside[segment]]
+        if len(out) > max_outliers:
+            sample = rng.choice(out[1:-1], max_outliers - 2, replace=False)
+            out = np.concatenate([out[:1], sample, out[-1:]])
+        fliers.append(out)
+
+    stats = {
+        "count": counts,
+        "mean": np.bincount(codes, weights=y, minlength=k) / counts,
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "whislo": whislo,
+        "whishi": whishi,
+        "fliers": fliers,
+    }
+    return labels, stats
@@ -0,0 +1,251 @@
+# cli.py
+# Rendu en lot, sans interface : toutes les specs d'un dataset rendues en
+# parallèle dans un pool de processus (backend Agg). Le dataset est partagé
+# via le fichier Arrow memory-mappé du cache, jamais sérialisé vers les workers.
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+import pandas as pd  # noqa: E402
+
+from . import pairplot  # noqa: E402
+from .config import APPROX_PROFILE_MIN_ROWS  # noqa: E402
+from .dataset_cache import (  # noqa: E402
+    cache_key, cache_path, hash_file, load_dataset_cached, open_cached_table, pin, unpin, write_cached,
+)
+from .preprocessing import prepare_columns  # noqa: E402
+from .viz_utils import IMAGE_FORMATS, fig_to_bytes, plot, spec_columns  # noqa: E402
+
+OUTPUT_FORMATS = tuple(IMAGE_FORMATS)
+
+
+# =========================================================
+# DATASET PARTAGÉ
+# =========================================================
+
+def load_shared_dataset(path, cache_dir=None, profile: bool = False):
+    """
+    Charge le dataset (CSV ou Parquet) et s'assure qu'il est présent dans le
+    cache Arrow, que les workers ouvrent en memory-map. Le fichier est épinglé
+    contre l'éviction (`pin`) : l'appelant le libère avec `unpin` après le rendu.
+    Avec `profile=True`, un très gros CSV est profilé pendant sa lecture
+    (voir `load_dataset_cached`).
+
+    Returns:
+        (hash du contenu, clé du cache, DataFrame)
+    """
+    digest = hash_file(path)
+    if Path(path).suffix.lower() in (".parquet", ".pq"):
+        key = cache_key(digest, "parquet")
+        pin(key, cache_dir)
+        table = open_cached_table(key, cache_dir)
+        if table is not None:
+            return digest, key, table.to_pandas()
+        df = pd.read_parquet(path).dropna(how="all").dropna(axis=1, how="all")
+    else:
+        # Même clé que load_dataset_cached : le fichier Arrow est écrit au premier chargement
+        key = cache_key(digest)
+        pin(key, cache_dir)
+        df = load_dataset_cached(path, digest=digest, streaming=True, cache_dir=cache_dir, profile=profile)
+
+    # Les workers ont besoin du fichier, même s'il dépasse le budget du cache
+    if not df.empty and not cache_path(key, cache_dir).exists():
+        write_cached(key, df, cache_dir)
+    return digest, key, df
+
+
+def load_specs(path) -> list:
+    """Specs exportées par l'application (« Export JSON ») : liste, ou dict avec une clé 'specs'"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    specs = data.get("specs", []) if isinstance(data, dict) else data
+    return [spec for spec in specs if isinstance(spec, dict)]
+
+
+def check_specs(specs, columns) -> tuple:
+    """
+    Normalise et valide les specs contre les colonnes du dataset ({colonne: est numérique}).
+
+    Returns:
+        (specs valides [(index, spec)], specs rejetées [(index, erreurs)])
+    """
+    from .llm_utils import normalize_spec, validate_spec
+
+    valid, rejected = [], []
+    for idx, spec in enumerate(specs):
+        # Les clés non reconnues par normalize_spec (bins, ...) sont conservées
+        spec = {**spec, **normalize_spec(spec)}
+        errors = validate_spec(spec, columns)
+        if errors:
+            rejected.append((idx, errors))
+        else:
+            valid.append((idx, spec))
+    return valid, rejected
+
+
+def propose_specs(df, problem, num_proposals, digest=None):
+    """Demande les specs au LLM, à partir du profil du dataset"""
+    from .dataset_summary import column_kinds, compact_llm_summary
+    from .llm_utils import generate_visualization_proposals, init_llm
+    from .profiler import cached_profile, profile_dataset
+
+    # Profil par sketches déjà calculé pendant la lecture d'un très gros CSV
+    profile = cached_profile(digest) or profile_dataset(df, approximate=len(df) >= APPROX_PROFILE_MIN_ROWS)
+    return generate_visualization_proposals(init_llm(), problem, compact_llm_summary(profile, problem),
+                                            num_proposals=num_proposals, columns=column_kinds(profile))
+
+
+# =========================================================
+# WORKERS
+# =========================================================
+
+_worker = {}
+
+
+def _init_worker(key, cache_dir):
+    """Ouvre une fois par processus la table memory-mappée (aucune copie du dataset)"""
+    table = open_cached_table(key, cache_dir)
+    if table is None:
+        raise RuntimeError(f"Dataset partagé introuvable dans le cache : {key}")
+    _worker["key"] = key
+    _worker["table"] = table
+    _worker["schema_df"] = table.schema.empty_table().to_pandas()
+    # Les workers sont déjà parallèles : pas de pool imbriqué pour les pairplots
+    pairplot.PAIRPLOT_WORKERS = 1
+
+
+def output_name(idx: int, spec: dict, fmt: str) -> str:
+    label = str(spec.get("title") or spec.get("type") or "graphique")
+    slug = re.sub(r"[^\w-]+", "_", label).strip("_")[:60] or "graphique"
+    return f"{idx + 1:03d}_{slug}.{fmt}"
+
+
+def _render_spec(idx, spec, output_dir, fmt, palette, color, dpi):
+    """Rend une spec : seules ses colonnes sont converties depuis la table partagée"""
+    columns = spec_columns(_worker["schema_df"], spec)
+    df = _worker["table"].select(columns).to_pandas()
+    # Colonnes nettoyées mémoïsées par dataset dans chaque worker
+    data = prepare_columns(df, columns, dataset_key=_worker["key"])
+    # Un graphique vide (colonne sans données, ...) est un échec, pas un fichier produit
+    fig = plot(data, spec, palette=palette, color=color, preprocessed=True, raise_errors=True)
+    path = Path(output_dir) / output_name(idx, spec, fmt)
+    path.write_bytes(fig_to_bytes(fig, fmt=fmt, dpi=dpi))
+    return str(path)
+
+
+def render_all(specs, key, output_dir, fmt="png", palette="deep", color="#4F8BF9",
+               dpi=150, workers=None, cache_dir=None, indexes=None):
+    """
+    Rend toutes les specs dans `output_dir`, en parallèle sur `workers` processus.
+    `indexes` : numéros des specs dans les noms de fichiers (défaut : leur position).
+    Retourne la liste des (index, chemin ou None, erreur ou None).
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(specs)))
+    indexes = range(len(specs)) if indexes is None else indexes
+    args = [(i, spec, output_dir, fmt, palette, color, dpi) for i, spec in zip(indexes, specs)]
+    results = []
+
+    if workers == 1:
+        _init_worker(key, cache_dir)
+        for task in args:
+            try:
+                results.append((task[0], _render_spec(*task), None))
+            except Exception as e:
+                results.append((task[0], None, str(e)))
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                             initializer=_init_worker, initargs=(key, cache_dir)) as pool:
+        futures = {pool.submit(_render_spec, *task): task[0] for task in args}
+        for future in as_completed(futures):
+            try:
+                results.append((futures[future], future.result(), None))
+            except Exception as e:
+                results.append((futures[future], None, str(e)))
+    return sorted(results)
+
+
+# =========================================================
+# POINT D'ENTRÉE
+# =========================================================
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="visualisation-llm",
+        description="Rend en lot les visualisations d'un dataset (CSV ou Parquet).",
+    )
+    parser.add_argument("dataset", help="Chemin du fichier CSV ou Parquet")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--problem", help="Problématique envoyée au LLM pour proposer les specs")
+    source.add_argument("--specs", help="Fichier JSON de specs (export de l'application)")
+    parser.add_argument("-o", "--output", default="charts", help="Dossier de sortie (défaut : charts)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="png", help="Format des images")
+    parser.add_argument("-n", "--num-proposals", type=int, default=3, help="Nombre de specs demandées au LLM")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus (défaut : nombre de CPU)")
+    parser.add_argument("--palette", default="deep", help="Palette seaborn")
+    parser.add_argument("--color", default="#4F8BF9", help="Couleur principale")
+    parser.add_argument("--dpi", type=int, default=150, help="Résolution des images matricielles")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("❌ pyarrow est requis pour partager le dataset entre les processus")
+        return 1
+
+    start = time.perf_counter()
+    digest, key, df = load_shared_dataset(args.dataset, profile=not args.specs)
+    try:
+        return _render_dataset(args, digest, key, df, start)
+    finally:
+        unpin(key)
+
+
+def _render_dataset(args, digest, key, df, start) -> int:
+    if df.empty:
+        print("❌ Dataset vide")
+        return 1
+    print(f"📂 Dataset : {len(df):,} lignes × {len(df.columns)} colonnes")
+
+    from .dataset_summary import frame_column_kinds
+
+    specs = load_specs(args.specs) if args.specs else propose_specs(df, args.problem, args.num_proposals, digest)
+    valid, rejected = check_specs(specs, frame_column_kinds(df))
+    del df
+    if not specs:
+        print("❌ Aucune spec à rendre")
+        return 1
+
+    results = [(idx, None, "spec invalide : " + "; ".join(errors)) for idx, errors in rejected]
+    if valid:
+        print(f"📊 Rendu de {len(valid)} graphique(s)...")
+        indexes, valid_specs = zip(*valid)
+        results += render_all(list(valid_specs), key, args.output, fmt=args.format, palette=args.palette,
+                              color=args.color, dpi=args.dpi, workers=args.workers, indexes=indexes)
+
+    failures = 0
+    for idx, path, error in sorted(results):
+        if error:
+            failures += 1
+            print(f"❌ Spec {idx + 1} : {error}")
+        else:
+            print(f"✅ {path}")
+    print(f"⏱️ {len(results) - failures}/{len(results)} graphique(s) en {time.perf_counter() - start:.1f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,3 +6,73 @@ load_dotenv()
 
 # Clés API
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+# Cache disque des datasets uploadés (fichiers Arrow IPC indexés par hash)
+DATASET_CACHE_DIR = os.getenv(
+    "DATASET_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "visualisation_with_llm", "datasets")
+)
+DATASET_CACHE_MAX_BYTES = int(os.getenv("DATASET_CACHE_MAX_BYTES", 5 * 1024 ** 3))
+
+# Datasets chargés en mémoire, partagés par toutes les sessions : au-delà de ce
+# budget (octets), les moins récemment utilisés sont déchargés vers le cache disque
+DATASET_STORE_MAX_BYTES = int(os.getenv("DATASET_STORE_MAX_BYTES", 4 * 1024 ** 3))
+
+# Au-delà de ce nombre de lignes, le résumé LLM utilise un profil approché (sketches)
+APPROX_PROFILE_MIN_ROWS = int(os.getenv("APPROX_PROFILE_MIN_ROWS", 5_000_000))
+
+# Profil exact : mémoire de travail d'un bloc de colonnes numériques (octets)
+PROFILE_BLOCK_MAX_BYTES = int(os.getenv("PROFILE_BLOCK_MAX_BYTES", 256 * 1024 ** 2))
+
+# Taille maximale (tokens estimés localement) du résumé du dataset envoyé au LLM
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", 1500))
+
+# Cache disque des réponses LLM (SQLite)
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "visualisation_with_llm", "llm_cache.sqlite")
+)
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 2000))
+
+# Appels LLM : parallélisme maximal des traitements par lot et nombre de nouvelles tentatives
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+
+# Cache mémoire des rendus PNG (octets)
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", 256 * 1024 ** 2))
+
+# Colonnes nettoyées mémoïsées par dataset (octets de copies conservées, tous datasets confondus)
+PREPARED_MAX_BYTES = int(os.getenv("PREPARED_MAX_BYTES", 1024 ** 3))
+
+# Valeurs triées mémoïsées pour les histogrammes (octets, toutes colonnes confondues)
+HISTOGRAM_CACHE_MAX_BYTES = int(os.getenv("HISTOGRAM_CACHE_MAX_BYTES", 512 * 1024 ** 2))
+
+# Au-delà de ce nombre de points, scatter et line sont agrégés avant le rendu
+AGGREGATION_MIN_ROWS = int(os.getenv("AGGREGATION_MIN_ROWS", 100_000))
+
+# Nombre maximal de catégories affichées (bar, count, boxplot), les autres sont regroupées
+MAX_CATEGORIES = int(os.getenv("MAX_CATEGORIES", 30))
+
+# Heatmap de corrélation : échantillonnage des lignes, nombre de colonnes affichées, annotations
+CORR_SAMPLE_ROWS = int(os.getenv("CORR_SAMPLE_ROWS", 200_000))
+HEATMAP_MAX_COLUMNS = int(os.getenv("HEATMAP_MAX_COLUMNS", 40))
+HEATMAP_ANNOT_MAX_COLUMNS = int(os.getenv("HEATMAP_ANNOT_MAX_COLUMNS", 20))
+
+# Pairplot : colonnes affichées, lignes échantillonnées, seuil du mode histogramme 2D, processus de rendu
+PAIRPLOT_MAX_COLUMNS = int(os.getenv("PAIRPLOT_MAX_COLUMNS", 8))
+PAIRPLOT_SAMPLE_ROWS = int(os.getenv("PAIRPLOT_SAMPLE_ROWS", 50_000))
+PAIRPLOT_SCATTER_MAX_ROWS = int(os.getenv("PAIRPLOT_SCATTER_MAX_ROWS", 5_000))
+PAIRPLOT_WORKERS = int(os.getenv("PAIRPLOT_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Miniatures des propositions : résolution et nombre de threads de rendu en arrière-plan
+THUMBNAIL_DPI = int(os.getenv("THUMBNAIL_DPI", 40))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", 2))
+
+# Rendu des images : résolution par défaut, bornes du dpi adaptatif,
+# largeur d'affichage cible (pixels) et format servi au navigateur (png, webp, svg)
+RENDER_DPI = int(os.getenv("RENDER_DPI", 150))
+RENDER_MIN_DPI = int(os.getenv("RENDER_MIN_DPI", 60))
+RENDER_MAX_DPI = int(os.getenv("RENDER_MAX_DPI", 200))
+RENDER_DISPLAY_WIDTH = int(os.getenv("RENDER_DISPLAY_WIDTH", 1600))
+RENDER_DISPLAY_FORMAT = os.getenv("RENDER_DISPLAY_FORMAT", "png")
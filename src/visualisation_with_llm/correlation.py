@@ -0,0 +1,142 @@
+# correlation.py
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .config import CORR_SAMPLE_ROWS
+from .preprocessing import same_dataset
+
+# Nombre de matrices conservées en mémoire
+MAX_CACHED_MATRICES = 16
+
+
+@dataclass
+class CorrelationResult:
+    """Matrice de corrélation et conditions de calcul"""
+    matrix: pd.DataFrame
+    n_rows: int
+    sampled: bool
+    # Demi-largeur de l'intervalle de confiance à 95% (pour r ≈ 0)
+    ci_halfwidth: float
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+# =========================================================
+# CALCUL
+# =========================================================
+
+def _compute(df: pd.DataFrame, sample_rows, seed) -> CorrelationResult:
+    n = len(df)
+    sampled = bool(sample_rows) and n > sample_rows
+    if sampled:
+        rows = np.sort(np.random.default_rng(seed).choice(n, sample_rows, replace=False))
+        df = df.iloc[rows]
+
+    values = df.to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~np.isnan(values)
+
+    # Moyennes et écarts-types en float64 : seules les colonnes déjà centrées
+    # réduites passent en float32 (un décalage comme un timestamp epoch
+    # absorberait sinon toute la précision du float32)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+        standardized = ((values - mean) / std).astype(np.float32)
+    del values
+    standardized[~np.isfinite(standardized)] = 0.0
+
+    # Produit matriciel float32 (BLAS)
+    products = standardized.T @ standardized
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if valid.all():
+            corr = np.clip(products / len(standardized), -1.0, 1.0)
+        else:
+            # Moments par paire sur les lignes où les deux colonnes sont renseignées,
+            # comme pandas : effectifs, sommes et sommes des carrés restreintes à chaque paire
+            mask = valid.astype(np.float32)
+            pairs = mask.T @ mask
+            sums = standardized.T @ mask
+            squares = (standardized ** 2).T @ mask
+            cov = products - sums * sums.T / pairs
+            var = squares - sums ** 2 / pairs
+            corr = np.clip(cov / np.sqrt(var * var.T), -1.0, 1.0)
+            corr[(pairs < 2) | ~(var > 0) | ~(var.T > 0)] = np.nan
+    # Colonnes constantes : corrélation indéfinie, comme pandas
+    constant = ~(std > 0)
+    corr[constant, :] = np.nan
+    corr[:, constant] = np.nan
+    np.fill_diagonal(corr, np.where(constant, np.nan, 1.0))
+
+    n_used = len(standardized)
+    return CorrelationResult(
+        matrix=pd.DataFrame(corr.astype(np.float64), index=df.columns, columns=df.columns),
+        n_rows=n_used,
+        sampled=sampled,
+        ci_halfwidth=float(1.96 / np.sqrt(max(n_used - 3, 1))),
+    )
+
+
+def correlation_matrix(df: pd.DataFrame, dataset_key: str = None,
+                       sample_rows: int = CORR_SAMPLE_ROWS, seed: int = 0) -> CorrelationResult:
+    """
+    Corrélations de Pearson entre colonnes numériques, calculées en float32
+    par produit matriciel sur un échantillon de lignes au-delà de `sample_rows`.
+    Les valeurs manquantes sont traitées par paires complètes, comme pandas.
+    Le résultat est mis en cache par `dataset_key` quand elle est fournie.
+    """
+    key = (dataset_key, tuple(map(str, df.columns)), sample_rows, seed) if dataset_key else None
+    if key is not None:
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached is not None:
+                _cache.move_to_end(key)
+                return cached
+
+    result = _compute(df, sample_rows, seed)
+
+    if key is not None:
+        with _cache_lock:
+            _cache[key] = result
+            while len(_cache) > MAX_CACHED_MATRICES:
+                _cache.popitem(last=False)
+    return result
+
+
+def forget_correlations(dataset_key: str):
+    """Oublie les matrices calculées sur un dataset"""
+    with _cache_lock:
+        for key in [k for k in _cache if same_dataset(k[0], dataset_key)]:
+            del _cache[key]
+
+
+# =========================================================
+# SÉLECTION ET ORDRE DES COLONNES
+# =========================================================
+
+def top_columns(corr: pd.DataFrame, k: int) -> pd.DataFrame:
+    """Garde les k colonnes les plus corrélées aux autres (moyenne des |r|)"""
+    if len(corr.columns) <= k:
+        return corr
+    strength = corr.abs().where(~np.eye(len(corr), dtype=bool)).mean().fillna(0)
+    keep = strength.sort_values(ascending=False).index[:k]
+    return corr.loc[keep, keep]
+
+
+def cluster_order(corr: pd.DataFrame) -> pd.DataFrame:
+    """
+    Réordonne les colonnes pour rapprocher les variables corrélées
+    (sériation spectrale : tri selon le vecteur de Fiedler de |r|).
+    """
+    if len(corr.columns) < 3:
+        return corr
+    affinity = corr.abs().fillna(0).to_numpy()
+    laplacian = np.diag(affinity.sum(axis=1)) - affinity
+    _, vectors = np.linalg.eigh(laplacian)
+    order = corr.columns[np.argsort(vectors[:, 1], kind="stable")]
+    return corr.loc[order, order]
@@ -3,20 +3,308 @@ import pandas as pd
 from pathlib import Path
 
 # data_loader.py
+import os
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Paramètres par défaut du mode streaming
+DEFAULT_CHUNKSIZE = 100_000
+DEFAULT_SAMPLE_ROWS = 10_000
+# Une colonne texte devient "category" si elle a peu de valeurs distinctes
+MAX_CATEGORY_RATIO = 0.5
+MAX_CATEGORIES = 10_000
+# Début du fichier lu pour estimer la longueur moyenne d'une ligne
+ROW_ESTIMATE_PROBE_BYTES = 1024 * 1024
+
+
+def _rewind(file):
+    """Remet un fichier uploadé au début (sans effet sur un chemin)"""
+    if hasattr(file, "seek"):
+        file.seek(0)
+
+
+def estimate_rows(file, probe_bytes: int = ROW_ESTIMATE_PROBE_BYTES) -> int:
+    """Nombre de lignes estimé : taille du fichier / longueur moyenne des premières lignes"""
+    if hasattr(file, "read"):
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        file.seek(0)
+        head = file.read(probe_bytes)
+        file.seek(0)
+    else:
+        size = os.path.getsize(file)
+        with open(file, "rb") as f:
+            head = f.read(probe_bytes)
+    if not head:
+        return 0
+    lines = head.count("\n" if isinstance(head, str) else b"\n")
+    return max(1, size * lines // len(head))
+
+
+def _useful_columns(columns):
+    """Colonnes conservées (les 'Unnamed: n' produits par un index exporté sont ignorés)"""
+    return [c for c in columns if 'unnamed' not in str(c).lower()]
+
+
+def infer_schema(sample: pd.DataFrame,
+                 max_category_ratio: float = MAX_CATEGORY_RATIO,
+                 max_categories: int = MAX_CATEGORIES) -> dict:
+    """
+    Déduit un schéma compact à partir d'un échantillon.
+
+    Retourne un dict {colonne: type} avec type parmi
+    "integer", "float", "category", "object" (texte) et "bool".
+    """
+    schema = {}
+    n_rows = max(len(sample), 1)
+
+    for col in sample.columns:
+        series = sample[col]
+
+        if pd.api.types.is_bool_dtype(series):
+            schema[col] = "bool"
+            continue
 
-def load_dataset(file) -> pd.DataFrame:
+        if series.dtype == object:
+            # Même règle que le mode classique : conversion si tout est numérique
+            try:
+                series = pd.to_numeric(series)
+            except (ValueError, TypeError):
+                pass
+
+        if pd.api.types.is_integer_dtype(series):
+            schema[col] = "integer"
+        elif pd.api.types.is_float_dtype(series) and series.isna().any() and (series.dropna() % 1 == 0).all():
+            # Entiers lus en float à cause des valeurs manquantes
+            schema[col] = "integer"
+        elif pd.api.types.is_float_dtype(series):
+            schema[col] = "float"
+        else:
+            n_unique = series.nunique(dropna=True)
+            if n_unique <= max_categories and n_unique / n_rows <= max_category_ratio:
+                schema[col] = "category"
+            else:
+                schema[col] = "object"
+
+    return schema
+
+
+# Largeurs entières essayées de la plus petite à la plus grande
+INTEGER_DTYPES = ("int8", "int16", "int32", "int64")
+
+
+@dataclass
+class _ColumnScan:
+    """Ce qu'il faut savoir d'une colonne numérique sur tout le fichier pour fixer son type"""
+    kind: str
+    text: bool = False          # une valeur hors échantillon n'est pas numérique
+    has_na: bool = False
+    integral: bool = True       # aucune décimale rencontrée
+    exact_float32: bool = True  # float32 restitue exactement toutes les valeurs
+    lo: float = np.inf
+    hi: float = -np.inf
+
+    def update(self, raw: pd.Series):
+        if self.text:
+            return
+        values = pd.to_numeric(raw, errors="coerce")
+        missing = values.isna()
+        if (missing & raw.notna()).any():
+            # Texte hors échantillon : la colonne entière reste du texte
+            self.text = True
+            return
+        self.has_na = self.has_na or bool(missing.any())
+        values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.integral = self.integral and bool(np.all(values == np.floor(values)))
+        self.exact_float32 = self.exact_float32 and bool(
+            np.array_equal(values.astype(np.float32).astype(np.float64), values)
+        )
+        self.lo = min(self.lo, float(values.min()))
+        self.hi = max(self.hi, float(values.max()))
+
+    def dtype(self):
+        if self.text:
+            return str
+        if self.kind == "integer" and self.integral:
+            for name in INTEGER_DTYPES:
+                info = np.iinfo(name)
+                if info.min <= self.lo and self.hi <= info.max:
+                    # Entiers nullables : un NaN n'impose pas de passer en float
+                    return name.capitalize() if self.has_na else name
+        return "float32" if self.exact_float32 else "float64"
+
+
+def scan_dtypes(chunks, schema: dict) -> dict:
+    """
+    Fixe un dtype unique par colonne à partir de blocs couvrant tout le fichier.
+
+    Le schéma déduit de l'échantillon est vérifié sur toutes les lignes :
+    une colonne numérique contenant du texte plus loin reste du texte, les
+    entiers prennent la plus petite largeur qui contient toutes les valeurs
+    (nullable s'il manque des valeurs) et un float32 n'est retenu que s'il
+    restitue exactement toutes les valeurs.
+
+    Retourne {colonne: dtype} avec dtype parmi les dtypes numériques, "category",
+    "object" (texte), "bool" (type laissé à pandas) et str (colonne numérique
+    redevenue texte).
+    """
+    scans = {col: _ColumnScan(kind) for col, kind in schema.items() if kind in ("integer", "float")}
+    for chunk in chunks:
+        for col, scan in scans.items():
+            scan.update(chunk[col])
+    return {col: scans[col].dtype() if col in scans else kind for col, kind in schema.items()}
+
+
+def resolve_schema(file, schema: dict, chunksize: int = DEFAULT_CHUNKSIZE) -> dict:
+    """Premier parcours du fichier, limité aux colonnes numériques : voir `scan_dtypes`"""
+    numeric = [col for col, kind in schema.items() if kind in ("integer", "float")]
+    if not numeric:
+        return dict(schema)
+    _rewind(file)
+    return scan_dtypes(pd.read_csv(file, usecols=numeric, chunksize=chunksize), schema)
+
+
+def apply_schema(chunk: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """Applique les types définitifs à un bloc lu (les numériques sont typés à la lecture)"""
+    for col, dtype in dtypes.items():
+        if col in chunk.columns and dtype == "category":
+            chunk[col] = chunk[col].astype("category")
+    return chunk
+
+
+def iter_csv_chunks(file, dtypes: dict, chunksize: int = DEFAULT_CHUNKSIZE):
+    """Lit un CSV bloc par bloc avec les types définitifs de `resolve_schema`"""
+    _rewind(file)
+    reader = pd.read_csv(
+        file,
+        usecols=list(dtypes),
+        # Texte forcé pour que les blocs aient tous le même type (et des catégories comparables)
+        dtype={c: str if d in ("category", "object", str) else d for c, d in dtypes.items() if d != "bool"},
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        yield apply_schema(chunk, dtypes)
+
+
+def _collect_chunks(chunks, dtypes: dict) -> pd.DataFrame:
+    """
+    Assemble les blocs colonne par colonne : chaque bloc est copié colonne par
+    colonne puis libéré, et chaque colonne finale libère ses morceaux dès
+    qu'elle est construite. Le pic mémoire reste proche d'un bloc plus le
+    DataFrame final (plus une colonne en cours d'assemblage).
+    """
+    pieces = {col: [] for col in dtypes}
+    for chunk in chunks:
+        for col in dtypes:
+            # Copie : une vue garderait en vie tout le bloc 2D du morceau lu
+            pieces[col].append(chunk[col].copy())
+        del chunk
+    if not pieces or not next(iter(pieces.values())):
+        return pd.DataFrame(columns=list(dtypes))
+
+    columns = {}
+    for col, dtype in dtypes.items():
+        parts = pieces.pop(col)
+        if dtype == "category":
+            columns[col] = pd.Series(union_categoricals(parts), name=col)
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+        del parts
+    # copy=False : les colonnes ne sont pas recopiées dans des blocs consolidés
+    return pd.DataFrame(columns, copy=False)
+
+
+def csv_dtypes(file,
+               chunksize: int = DEFAULT_CHUNKSIZE,
+               sample_rows: int = DEFAULT_SAMPLE_ROWS) -> dict:
+    """
+    Dtype compact de chaque colonne utile du CSV (dict vide si le fichier est vide).
+
+    Le schéma est déduit d'un échantillon puis vérifié sur tout le fichier
+    (`resolve_schema`, colonnes numériques seulement), sauf quand
+    l'échantillon contient déjà tout le fichier.
+    """
+    _rewind(file)
+    sample = pd.read_csv(file, nrows=sample_rows)
+    sample = sample[_useful_columns(sample.columns)]
+    if sample.empty:
+        return {}
+
+    schema = infer_schema(sample)
+    if len(sample) < sample_rows:
+        # Fichier entièrement lu par l'échantillon
+        return scan_dtypes([sample], schema)
+    return resolve_schema(file, schema, chunksize=chunksize)
+
+
+def read_csv_streaming(file,
+                       chunksize: int = DEFAULT_CHUNKSIZE,
+                       sample_rows: int = DEFAULT_SAMPLE_ROWS,
+                       on_chunk=None) -> pd.DataFrame:
+    """
+    Lit un gros CSV par blocs avec un schéma compact déduit d'un échantillon.
+
+    Deux parcours : le premier (`csv_dtypes`) fixe un dtype par colonne, le
+    second lit les blocs avec ces dtypes. `on_chunk(bloc)` est appelé sur
+    chaque bloc lu (profil par sketches pendant le chargement, par exemple).
+    Le pic mémoire est borné par la taille d'un bloc plus le DataFrame compact final.
+    """
+    dtypes = csv_dtypes(file, chunksize=chunksize, sample_rows=sample_rows)
+    if not dtypes:
+        return pd.DataFrame()
+
+    chunks = iter_csv_chunks(file, dtypes, chunksize=chunksize)
+    if on_chunk is not None:
+        chunks = _observe(chunks, on_chunk)
+    df = _collect_chunks(chunks, dtypes)
+
+    # Colonnes redevenues texte : même règle que l'échantillon, sur la colonne complète
+    text = [col for col, dtype in dtypes.items() if dtype is str]
+    if text and len(df):
+        for col, kind in infer_schema(df[text]).items():
+            if kind == "category":
+                df[col] = df[col].astype("category")
+    return df
+
+
+def _observe(chunks, on_chunk):
+    for chunk in chunks:
+        on_chunk(chunk)
+        yield chunk
+
+
+def load_dataset(file, streaming: bool = False,
+                 chunksize: int = DEFAULT_CHUNKSIZE,
+                 sample_rows: int = DEFAULT_SAMPLE_ROWS,
+                 on_chunk=None) -> pd.DataFrame:
     """
     Charge un dataset CSV depuis un fichier uploadé ou un chemin.
+
+    Args:
+        file: chemin ou fichier uploadé
+        streaming: lecture par blocs avec types compacts (pour les gros fichiers)
+        chunksize: nombre de lignes par bloc en mode streaming
+        sample_rows: taille de l'échantillon servant à déduire le schéma
+        on_chunk: appelé sur chaque bloc lu en mode streaming
     """
     try:
+        if streaming:
+            return read_csv_streaming(file, chunksize=chunksize, sample_rows=sample_rows,
+                                      on_chunk=on_chunk)
+
         df = pd.read_csv(file)
 
         if df.empty:
             return df
 
         # Drop colonnes inutiles
-        cols_to_drop = [c for c in df.columns if 'unnamed' in c.lower()]
+        cols_to_drop = [c for c in df.columns if c not in _useful_columns(df.columns)]
         df.drop(columns=cols_to_drop, inplace=True, errors="ignore")
 
         # Tentative conversion numérique
@@ -0,0 +1,254 @@
+# dataset_cache.py
+import hashlib
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from .config import APPROX_PROFILE_MIN_ROWS, DATASET_CACHE_DIR, DATASET_CACHE_MAX_BYTES
+from .data_loader import estimate_rows, load_dataset
+from .profiler import StreamingProfiler, remember_profile
+
+# À incrémenter si le format des fichiers mis en cache change
+CACHE_VERSION = 1
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+# =========================================================
+# HASH DU CONTENU
+# =========================================================
+
+def hash_file(file) -> str:
+    """
+    Calcule l'empreinte du contenu d'un fichier uploadé ou d'un chemin,
+    par blocs pour ne pas charger le fichier entier en mémoire.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+
+    if hasattr(file, "read"):
+        file.seek(0)
+        while True:
+            block = file.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block if isinstance(block, bytes) else block.encode("utf-8"))
+        file.seek(0)
+    else:
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+
+    return digest.hexdigest()
+
+
+# =========================================================
+# STOCKAGE ARROW IPC
+# =========================================================
+
+def _cache_dir(cache_dir=None) -> Path:
+    path = Path(cache_dir or DATASET_CACHE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def cache_key(digest: str, variant: str = "stream") -> str:
+    """Clé du cache : hash du contenu, version du format et mode de chargement"""
+    return f"{digest}-v{CACHE_VERSION}-{variant}"
+
+
+def cache_path(key: str, cache_dir=None) -> Path:
+    """Chemin du fichier colonne associé à une clé"""
+    return _cache_dir(cache_dir) / f"{key}.arrow"
+
+
+def write_cached(key: str, df: pd.DataFrame, cache_dir=None, max_bytes: int = None):
+    """
+    Écrit le DataFrame au format Arrow IPC (écriture atomique).
+    Retourne None sans rien écrire si le fichier dépasserait `max_bytes`.
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if max_bytes is not None and table.nbytes > max_bytes:
+        return None
+    path = cache_path(key, cache_dir)
+    tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+    try:
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Pas de fichier partiel laissé dans le cache (disque plein, interruption)
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+def open_cached_table(key: str, cache_dir=None):
+    """
+    Table Arrow adossée au memory-map du fichier mis en cache (sans copie) :
+    plusieurs processus qui l'ouvrent partagent les mêmes pages en mémoire.
+    Retourne None si la clé est absente ou le fichier illisible.
+    """
+    import pyarrow as pa
+
+    path = cache_path(key, cache_dir)
+    if not path.exists():
+        return None
+    try:
+        table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        # Date d'accès mise à jour pour l'éviction LRU
+        os.utime(path)
+        return table
+    except (OSError, pa.ArrowInvalid) as e:
+        print(f"Cache dataset illisible ({path.name}) : {e}")
+        path.unlink(missing_ok=True)
+        return None
+
+
+def read_cached(key: str, cache_dir=None):
+    """
+    Relit un DataFrame mis en cache via un memory-map.
+    Retourne None si la clé est absente ou le fichier illisible.
+    """
+    table = open_cached_table(key, cache_dir)
+    return table.to_pandas() if table is not None else None
+
+
+# Fichiers en cours d'utilisation : un marqueur "<clé>.<pid>.pin" par processus
+PIN_SUFFIX = ".pin"
+
+
+def _pin_path(key: str, cache_dir=None) -> Path:
+    return _cache_dir(cache_dir) / f"{key}.{os.getpid()}{PIN_SUFFIX}"
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def pin(key: str, cache_dir=None):
+    """Protège le fichier d'une clé de l'éviction tant que ce processus l'utilise"""
+    _pin_path(key, cache_dir).touch()
+
+
+def unpin(key: str, cache_dir=None):
+    _pin_path(key, cache_dir).unlink(missing_ok=True)
+
+
+def pinned_keys(cache_dir=None) -> set:
+    """Clés protégées par un processus vivant (les marqueurs orphelins sont supprimés)"""
+    keys = set()
+    for path in _cache_dir(cache_dir).glob(f"*{PIN_SUFFIX}"):
+        key, _, pid = path.name[:-len(PIN_SUFFIX)].rpartition(".")
+        if pid.isdigit() and _process_alive(int(pid)):
+            keys.add(key)
+        else:
+            path.unlink(missing_ok=True)
+    return keys
+
+
+def evict(max_bytes: int = DATASET_CACHE_MAX_BYTES, cache_dir=None, protected=()) -> int:
+    """
+    Supprime les fichiers les moins récemment utilisés jusqu'à repasser
+    sous la taille maximale. Les clés `protected` et celles épinglées par
+    un processus (`pin`) ne sont jamais supprimées.
+    Retourne le nombre d'octets libérés.
+    """
+    protected = set(protected) | pinned_keys(cache_dir)
+    entries = []
+    for path in _cache_dir(cache_dir).glob("*.arrow"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total - freed <= max_bytes:
+            break
+        if path.stem in protected:
+            continue
+        path.unlink(missing_ok=True)
+        freed += size
+    return freed
+
+
+def store_cached(key: str, df: pd.DataFrame, cache_dir=None,
+                 max_bytes: int = DATASET_CACHE_MAX_BYTES) -> bool:
+    """
+    Met un DataFrame en cache puis évince les fichiers anciens, sans jamais
+    supprimer celui qui vient d'être écrit. Un dataset plus gros que tout le
+    budget n'est pas écrit. Retourne True si le fichier est en cache.
+    """
+    import pyarrow as pa
+
+    try:
+        if write_cached(key, df, cache_dir, max_bytes=max_bytes) is None:
+            print(f"Dataset {key[:12]} non mis en cache : plus gros que le budget ({max_bytes} octets)")
+            return False
+        evict(max_bytes, cache_dir, protected={key})
+    except (OSError, pa.ArrowException) as e:
+        print(f"Erreur écriture cache dataset : {e}")
+        return False
+    return True
+
+
+# =========================================================
+# CHARGEMENT AVEC CACHE
+# =========================================================
+
+def load_dataset_cached(file, digest: str = None, streaming: bool = True,
+                        cache_dir=None, max_bytes: int = DATASET_CACHE_MAX_BYTES,
+                        profile: bool = False) -> pd.DataFrame:
+    """
+    Charge un dataset en passant par le cache disque.
+
+    Le CSV n'est parsé qu'à la première demande ; les suivantes relisent
+    le fichier Arrow. `digest` permet de fournir un hash déjà calculé.
+    Les lignes et colonnes entièrement vides sont supprimées avant stockage.
+    Avec `profile=True` (mode streaming), les blocs lus alimentent aussi un
+    profil approché, mémorisé sous `digest` (`cached_profile`) quand le
+    dataset atteint APPROX_PROFILE_MIN_ROWS lignes : pas de second parcours.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("pyarrow non installé : cache dataset désactivé")
+        df = load_dataset(file, streaming=streaming)
+        return df.dropna(how="all").dropna(axis=1, how="all")
+
+    digest = digest or hash_file(file)
+    key = cache_key(digest, "stream" if streaming else "full")
+
+    df = read_cached(key, cache_dir)
+    if df is not None:
+        return df
+
+    # Marge sur l'estimation, qui ne repose que sur le début du fichier
+    profiler = None
+    if profile and streaming and estimate_rows(file) >= APPROX_PROFILE_MIN_ROWS // 2:
+        profiler = StreamingProfiler()
+    on_chunk = None
+    if profiler is not None:
+        def on_chunk(chunk):
+            # Mêmes lignes que le dataset final : les lignes vides sont retirées
+            profiler.update(chunk.dropna(how="all"))
+    df = load_dataset(file, streaming=streaming, on_chunk=on_chunk)
+    df = df.dropna(how="all").dropna(axis=1, how="all")
+    if df.empty:
+        return df
+
+    if profiler is not None and len(df) >= APPROX_PROFILE_MIN_ROWS:
+        remember_profile(digest, profiler.profile(df))
+    store_cached(key, df, cache_dir, max_bytes)
+    return df
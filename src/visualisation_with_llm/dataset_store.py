@@ -0,0 +1,285 @@
+# dataset_store.py
+# Datasets partagés par toutes les sessions du processus : un seul DataFrame par
+# contenu (hash du fichier), des poignées légères dans st.session_state, et un
+# budget mémoire au-delà duquel les datasets sont déchargés vers le fichier
+# Arrow memory-mappé du cache disque, puis rechargés à la demande.
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+
+from .config import DATASET_CACHE_MAX_BYTES, DATASET_STORE_MAX_BYTES
+from .correlation import forget_correlations
+from .dataset_cache import (
+    cache_key, cache_path, hash_file, load_dataset_cached, open_cached_table, pin, store_cached, unpin,
+)
+from .filtering import forget_indexes
+from .histogram import forget_histograms
+from .preprocessing import forget_prepared
+
+
+@dataclass
+class _Entry:
+    df: Optional[pd.DataFrame]
+    nbytes: int
+    n_rows: int
+    n_cols: int
+    # Clé sous laquelle les caches de rendu (colonnes nettoyées, index...) connaissent ce dataset
+    dataset_key: str = None
+    refs: int = 0
+    spills: int = 0
+    # Fichier Arrow épinglé contre l'éviction du cache disque tant que le dataset déchargé est référencé
+    pinned: bool = False
+    # Copie sur disque en cours (hors verrou global) : le DataFrame reste lisible
+    spilling: bool = False
+
+
+class DatasetHandle:
+    """
+    Référence d'une session vers un dataset du store. Ne contient que la clé :
+    le DataFrame est lu via `df` (rechargé depuis le disque s'il a été déchargé).
+    La référence est rendue par `release()` ou à la destruction de la poignée
+    (fin de session).
+    """
+
+    def __init__(self, store: "DatasetStore", key: str):
+        self.key = key
+        self._store = store
+        self._finalizer = weakref.finalize(self, store._release, key)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self._store.get(self.key)
+
+    @property
+    def released(self) -> bool:
+        return not self._finalizer.alive
+
+    def release(self):
+        self._finalizer()
+
+
+class DatasetStore:
+    """Datasets dédupliqués par contenu, comptés par référence et bornés en mémoire"""
+
+    def __init__(self, max_bytes: int = DATASET_STORE_MAX_BYTES, cache_dir=None,
+                 cache_max_bytes: int = DATASET_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.resident_bytes = 0
+        self.hits = 0
+        self.loads = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks = {}
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    # ----- Poignées -----
+
+    def open(self, file, digest: str = None, streaming: bool = True) -> DatasetHandle:
+        """
+        Poignée vers le dataset d'un fichier uploadé : chargé (ou relu depuis le
+        cache disque) une seule fois, quel que soit le nombre de sessions.
+        """
+        digest = digest or hash_file(file)
+        key = cache_key(digest, "stream" if streaming else "full")
+        # Un chargement à la fois par contenu : les sessions concurrentes l'attendent
+        with self._key_lock(key):
+            handle = self.acquire(key)
+            if handle is not None:
+                return handle
+            # Très gros CSV : profil par sketches calculé pendant la lecture (`cached_profile`)
+            df = load_dataset_cached(file, digest=digest, streaming=streaming,
+                                     cache_dir=self.cache_dir, max_bytes=self.cache_max_bytes,
+                                     profile=True)
+            self.loads += 1
+            return self.put(key, df, dataset_key=digest)
+
+    def put(self, key: str, df: pd.DataFrame, dataset_key: str = None) -> DatasetHandle:
+        """
+        Ajoute un dataset (ou réutilise celui déjà présent pour cette clé).
+        `dataset_key` : clé utilisée par les caches de rendu pour ce dataset (défaut : `key`).
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = _Entry(None, 0, len(df), len(df.columns), dataset_key=dataset_key or key)
+                self._load(key, df)
+            handle = self._handle(key)
+        self._enforce_budget(keep=key)
+        return handle
+
+    def acquire(self, key: str) -> Optional[DatasetHandle]:
+        """Nouvelle poignée vers un dataset connu du store, sinon None"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self.hits += 1
+            return self._handle(key)
+
+    def _handle(self, key) -> DatasetHandle:
+        self._entries[key].refs += 1
+        return DatasetHandle(self, key)
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.refs > 0:
+                entry.refs -= 1
+                if entry.refs == 0 and entry.df is None:
+                    self._forget(key, entry)
+        # Plus référencé : conservé tant que le budget le permet, mais évincé en premier
+        self._enforce_budget()
+
+    # ----- Données -----
+
+    def get(self, key: str) -> pd.DataFrame:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                raise KeyError(f"Dataset inconnu du store : {key}")
+            if entry.df is not None:
+                self._entries.move_to_end(key)
+                return entry.df
+
+        with self._key_lock(key):
+            with self._lock:
+                if entry.df is not None:
+                    return entry.df
+            # Rechargement depuis le fichier Arrow (hors verrou global)
+            table = open_cached_table(key, self.cache_dir)
+            if table is None:
+                raise KeyError(f"Dataset déchargé et absent du cache disque : {key}")
+            df = table.to_pandas()
+            with self._lock:
+                self._load(key, df)
+            self._enforce_budget(keep=key)
+            return df
+
+    def _load(self, key, df):
+        entry = self._entries[key]
+        if entry.pinned:
+            # De nouveau en mémoire : le fichier peut être évincé (il sera réécrit au besoin)
+            unpin(key, self.cache_dir)
+            entry.pinned = False
+        entry.df = df
+        entry.nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        self.resident_bytes += entry.nbytes
+        self._entries.move_to_end(key)
+
+    def _spill(self, key, entry) -> bool:
+        """
+        Décharge un dataset marqué `spilling` : le fichier Arrow du cache disque
+        en garde une copie. L'écriture se fait hors du verrou global (les autres
+        sessions continuent de lire le DataFrame) ; le fichier est épinglé contre
+        l'éviction pendant l'écriture, puis tant que le dataset est référencé.
+        S'il ne peut pas être écrit (erreur, plus gros que le budget du cache),
+        le dataset reste en mémoire.
+        """
+        pin(key, self.cache_dir)
+        stored = (cache_path(key, self.cache_dir).exists()
+                  or store_cached(key, entry.df, self.cache_dir, self.cache_max_bytes))
+
+        with self._lock:
+            entry.spilling = False
+            if not stored or self._entries.get(key) is not entry:
+                unpin(key, self.cache_dir)
+                if not stored:
+                    print(f"⚠️ Dataset {key[:12]} conservé en mémoire (copie sur disque impossible)")
+                return False
+            entry.df = None
+            entry.spills += 1
+            entry.pinned = True
+            self.resident_bytes -= entry.nbytes
+            self._forget_memos(entry)
+            if entry.refs == 0:
+                # Plus aucune session : le fichier Arrow suffit, l'entrée est oubliée
+                self._forget(key, entry)
+            return True
+
+    def _forget(self, key, entry):
+        """Retire une entrée déchargée du store"""
+        if entry.pinned:
+            unpin(key, self.cache_dir)
+        del self._entries[key]
+
+    @staticmethod
+    def _forget_memos(entry):
+        """Les caches de rendu gardent des colonnes du dataset : ils l'oublient aussi"""
+        for forget in (forget_prepared, forget_indexes, forget_histograms, forget_correlations):
+            forget(entry.dataset_key)
+
+    def _select_spills(self, keep=None) -> list:
+        """
+        Datasets à décharger pour revenir sous le budget : les moins récemment
+        utilisés, non référencés d'abord. Ils sont marqués `spilling`.
+        """
+        pending = sum(e.nbytes for e in self._entries.values() if e.spilling)
+        excess = self.resident_bytes - pending - self.max_bytes
+        if excess <= 0:
+            return []
+        resident = [(k, e) for k, e in self._entries.items()
+                    if e.df is not None and not e.spilling and k != keep]
+        selected = []
+        for key, entry in sorted(resident, key=lambda item: item[1].refs > 0):
+            if excess <= 0:
+                break
+            entry.spilling = True
+            excess -= entry.nbytes
+            selected.append((key, entry))
+        return selected
+
+    def _enforce_budget(self, keep=None):
+        """Décharge les datasets au-delà du budget ; à appeler sans tenir le verrou global"""
+        with self._lock:
+            selected = self._select_spills(keep)
+        for key, entry in selected:
+            self._spill(key, entry)
+
+    # ----- Suivi -----
+
+    def usage(self) -> dict:
+        """Occupation du store : octets en mémoire, budget et état de chaque dataset"""
+        with self._lock:
+            return {
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "datasets": len(self._entries),
+                "handles": sum(e.refs for e in self._entries.values()),
+                "hits": self.hits,
+                "loads": self.loads,
+                "entries": [
+                    {
+                        "key": key,
+                        "rows": e.n_rows,
+                        "columns": e.n_cols,
+                        "bytes": e.nbytes,
+                        "refs": e.refs,
+                        "resident": e.df is not None,
+                        "spills": e.spills,
+                        "pinned": e.pinned,
+                    }
+                    for key, e in self._entries.items()
+                ],
+            }
+
+    def clear(self):
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.pinned:
+                    unpin(key, self.cache_dir)
+            self._entries.clear()
+            self.resident_bytes = 0
+
+
+_store = DatasetStore()
+
+
+def get_dataset_store() -> DatasetStore:
+    return _store
@@ -1,15 +1,210 @@
 # dataset_summary.py
+import re
+import unicodedata
+from collections import defaultdict
+
 import pandas as pd
 
-def summarize_dataset(df: pd.DataFrame, max_rows: int = 5) -> str:
+from .config import SUMMARY_MAX_TOKENS
+from .profiler import DatasetProfile, _is_numeric, profile_dataset
+
+# Au moins ce nombre de colonnes de même motif (nom sans chiffres, même type) pour les regrouper
+MIN_GROUP_SIZE = 3
+# Mots ignorés dans la problématique pour le calcul de pertinence
+STOPWORDS = {
+    "les", "des", "une", "est", "sont", "dans", "par", "pour", "avec", "sur", "entre", "selon",
+    "quel", "quels", "quelle", "quelles", "comment", "analyser", "identifier", "relations",
+    "tendances", "the", "and", "for", "with", "between", "what", "how", "which", "does",
+}
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def _header(profile: DatasetProfile) -> list:
+    header = [f"Nombre de lignes : {profile.n_rows}", f"Nombre de colonnes : {profile.n_cols}"]
+    if profile.approximate:
+        header.append("Statistiques approchées (quantiles et cardinalités estimés)")
+    return header
+
+
+def _column_line(col) -> str:
+    if col.is_numeric:
+        return f"- {col.name} ({col.dtype}) | min={col.min} | max={col.max} | moyenne={col.mean:.2f}"
+    return f"- {col.name} ({col.dtype}) | valeurs uniques={col.n_unique}"
+
+
+def column_kinds(profile: DatasetProfile) -> dict:
+    """Colonnes réelles du dataset et leur nature {colonne: est numérique}, pour valider les specs du LLM"""
+    return {col.name: col.is_numeric for col in profile.columns}
+
+
+def frame_column_kinds(df: pd.DataFrame) -> dict:
+    """Comme `column_kinds`, d'après les seuls dtypes du DataFrame (sans profil)"""
+    return {col: _is_numeric(df[col]) for col in df.columns}
+
+
+def render_llm_summary(profile: DatasetProfile) -> str:
+    """Résumé envoyé au LLM : bornes et moyenne des numériques, cardinalité des autres"""
+    summary = _header(profile)
+    summary.append("\nColonnes :")
+    summary.extend(_column_line(col) for col in profile.columns)
+    return "\n".join(summary)
+
+
+# =========================================================
+# RÉSUMÉ COMPACT SOUS BUDGET DE TOKENS
+# =========================================================
+
+def count_tokens(text: str) -> int:
+    """Estimation locale du nombre de tokens : ponctuation, et mots découpés par ~4 caractères"""
+    return sum((len(token) + 3) // 4 for token in _TOKEN_RE.findall(text))
+
+
+def name_tokens(text) -> list:
+    """Mots d'un nom de colonne ou d'un texte : sans accents, camelCase et séparateurs découpés"""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text).lower()
+    return [t for t in re.split(r"[^a-z0-9]+", text) if t]
+
+
+def _trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def column_relevance(name, problem_words) -> float:
+    """
+    Similarité lexicale (0 à 1) entre un nom de colonne et la problématique :
+    meilleure correspondance entre leurs mots, par préfixe commun ou trigrammes.
+    """
+    best = 0.0
+    for token in name_tokens(name):
+        if len(token) < 3:
+            continue
+        grams = _trigrams(token)
+        for word, word_grams in problem_words:
+            if len(token) >= 4 and len(word) >= 4 and (token.startswith(word) or word.startswith(token)):
+                return 1.0
+            best = max(best, len(grams & word_grams) / len(grams | word_grams))
+    return best
+
+
+def _group_columns(columns) -> list:
+    """Colonnes regroupées par motif (chiffres remplacés par #) et type ; l'ordre du dataset est conservé"""
+    groups = defaultdict(list)
+    for col in columns:
+        groups[(re.sub(r"\d+", "#", str(col.name)), col.is_numeric, col.dtype)].append(col)
+    items = []
+    for (pattern, _, _), members in groups.items():
+        if len(members) >= MIN_GROUP_SIZE:
+            items.append((pattern, members))
+        else:
+            items.extend((None, [col]) for col in members)
+    return items
+
+
+def _group_members(pattern, members) -> str:
+    """
+    Colonnes d'un groupe : « de x_1 à x_40 » pour une suite continue, sinon
+    l'ensemble des numéros (« # = 3, 5, 9–40 ») ou, à défaut, les noms.
+    """
+    names = [str(c.name) for c in members]
+    if pattern.count("#") != 1:
+        return ", ".join(names)
+    prefix, suffix = pattern.split("#")
+    numbers = [name[len(prefix):len(name) - len(suffix)] for name in names]
+
+    runs = []
+    for raw in numbers:
+        if runs and int(raw) == int(runs[-1][-1]) + 1:
+            runs[-1][-1] = raw
+        else:
+            runs.append([raw, raw])
+    if len(runs) == 1:
+        return f"de {names[0]} à {names[-1]}"
+    return "# = " + ", ".join(start if start == stop else f"{start}–{stop}" for start, stop in runs)
+
+
+def _group_line(pattern, members) -> str:
+    first = members[0]
+    line = f"- {pattern} : {len(members)} colonnes ({first.dtype}), {_group_members(pattern, members)}"
+    if first.is_numeric:
+        mins = [c.min for c in members if pd.notna(c.min)]
+        maxs = [c.max for c in members if pd.notna(c.max)]
+        if mins and maxs:
+            line += f" | min={min(mins)} | max={max(maxs)}"
+    else:
+        line += f" | valeurs uniques={min(c.n_unique for c in members)}–{max(c.n_unique for c in members)}"
+    return line
+
+
+def compact_llm_summary(profile: DatasetProfile, problem_statement: str = "",
+                        max_tokens: int = SUMMARY_MAX_TOKENS) -> str:
+    """
+    Résumé du dataset tenant dans `max_tokens` tokens (comptés localement).
+
+    Le résumé complet est renvoyé tel quel s'il tient dans le budget. Sinon,
+    les colonnes de même motif (feature_1 … feature_40) sont regroupées sur une
+    ligne, les lignes sont ordonnées par pertinence pour la problématique, et
+    celles qui dépassent le budget ne sont plus citées que par leur nom.
+    """
+    full = render_llm_summary(profile)
+    if count_tokens(full) <= max_tokens:
+        return full
+
+    problem_words = [
+        (word, _trigrams(word)) for word in dict.fromkeys(name_tokens(problem_statement))
+        if len(word) >= 3 and word not in STOPWORDS
+    ]
+    items = []
+    for position, (pattern, members) in enumerate(_group_columns(profile.columns)):
+        score = max(column_relevance(col.name, problem_words) for col in members)
+        line = _group_line(pattern, members) if pattern else _column_line(members[0])
+        items.append((-score, position, line, members))
+    items.sort()
+
+    summary = _header(profile) + ["\nColonnes (par pertinence pour la problématique) :"]
+    budget = max_tokens - count_tokens("\n".join(summary))
+    costs = [count_tokens(line) + 1 for _, _, line, _ in items]
+    # Si tout ne tient pas, un tiers du budget reste réservé aux noms des autres colonnes
+    detail_budget = budget if sum(costs) <= budget else budget * 2 // 3
+    remaining = []
+    for (_, _, line, members), cost in zip(items, costs):
+        if not remaining and cost <= detail_budget:
+            summary.append(line)
+            detail_budget -= cost
+            budget -= cost
+        else:
+            remaining.extend(members)
+
+    if remaining:
+        # Colonnes hors budget : noms seuls, tant qu'il reste de la place
+        names = []
+        budget -= count_tokens("Autres colonnes : (+0000 non listées)")
+        for col in remaining:
+            cost = count_tokens(str(col.name)) + 1
+            if cost > budget:
+                break
+            names.append(str(col.name))
+            budget -= cost
+        line = "Autres colonnes : " + ", ".join(names)
+        if len(names) < len(remaining):
+            line += f"{' ' if names else ''}(+{len(remaining) - len(names)} non listées)"
+        summary.append(line)
+    return "\n".join(summary)
+
+
+def summarize_dataset(df: pd.DataFrame, max_rows: int = 5, profile: DatasetProfile = None) -> str:
+    profile = profile or profile_dataset(df)
+
     summary = []
-    summary.append(f"Nombre de lignes : {df.shape[0]}")
-    summary.append(f"Nombre de colonnes : {df.shape[1]}")
+    summary.append(f"Nombre de lignes : {profile.n_rows}")
+    summary.append(f"Nombre de colonnes : {profile.n_cols}")
     summary.append("Colonnes :")
 
-    for col in df.columns:
+    for col in profile.columns:
         summary.append(
-            f"- {col} ({df[col].dtype}), valeurs non nulles : {df[col].notna().sum()}"
+            f"- {col.name} ({col.dtype}), valeurs non nulles : {col.count}"
         )
 
     summary.append("\nExemples de données :")
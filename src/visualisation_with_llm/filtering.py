@@ -0,0 +1,247 @@
+# filtering.py
+# Filtres interactifs indexés : permutation triée (argsort) par colonne numérique
+# et lignes groupées par catégorie, construites une fois par dataset. Un filtre
+# est ensuite résolu par searchsorted, sans masque ni copie du DataFrame complet.
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .preprocessing import frame_key, same_dataset
+
+# Nombre d'index de colonnes conservés en mémoire
+MAX_INDEXED_COLUMNS = 16
+# En dessous de cette fraction de lignes, la sélection la plus restrictive est
+# lue dans l'index puis vérifiée ; au-delà, un masque vectorisé est plus rapide
+SPARSE_FRACTION = 1 / 16
+
+
+@dataclass
+class ColumnIndex:
+    """
+    Index d'une colonne :
+    - plage (numérique) : positions triées par valeur (`order`) et valeurs triées
+    - catégories : positions groupées par code (`order`), bornes de chaque groupe
+      (`offsets`) et codes ligne à ligne pour les vérifications
+    """
+    kind: str
+    n_rows: int
+    order: np.ndarray
+    sorted_values: np.ndarray = None
+    categories: pd.Index = None
+    offsets: np.ndarray = None
+    codes: np.ndarray = None
+
+    @property
+    def n_valid(self) -> int:
+        """Lignes renseignées (valeurs manquantes exclues)"""
+        if self.kind == "range":
+            return len(self.order)
+        return int(self.offsets[-1] - self.offsets[0])
+
+    @property
+    def min(self):
+        return float(self.sorted_values[0]) if len(self.sorted_values) else np.nan
+
+    @property
+    def max(self):
+        return float(self.sorted_values[-1]) if len(self.sorted_values) else np.nan
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _positions_dtype(n_rows):
+    return np.int32 if n_rows < np.iinfo(np.int32).max else np.int64
+
+
+# =========================================================
+# CONSTRUCTION DES INDEX
+# =========================================================
+
+def build_range_index(series: pd.Series) -> ColumnIndex:
+    """Un seul argsort par colonne numérique (valeurs manquantes exclues)"""
+    if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        raise ValueError(f"Filtre de plage impossible sur la colonne non numérique '{series.name}'")
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    order = np.argsort(values, kind="stable")
+    # Les NaN sont triés en fin de permutation
+    order = order[:len(values) - int(np.isnan(values).sum())].astype(_positions_dtype(len(values)))
+    return ColumnIndex("range", len(values), order, sorted_values=values[order])
+
+
+def build_category_index(series: pd.Series) -> ColumnIndex:
+    """Codes des catégories et lignes de chaque catégorie, contiguës dans `order`"""
+    codes, categories = pd.factorize(series, sort=True)
+    dtype = _positions_dtype(len(codes))
+    codes = codes.astype(dtype)
+    order = np.argsort(codes, kind="stable").astype(dtype)
+    # Les lignes manquantes (code -1) précèdent la première catégorie
+    offsets = np.searchsorted(codes[order], np.arange(len(categories) + 1), side="left")
+    return ColumnIndex("category", len(codes), order, categories=categories, offsets=offsets, codes=codes)
+
+
+def column_index(series: pd.Series, kind: str = "range", dataset_key: str = None) -> ColumnIndex:
+    """Index d'une colonne, mis en cache par (`dataset_key`, colonne, type de filtre)"""
+    key = (dataset_key, str(series.name), kind) if dataset_key else None
+    if key is not None:
+        with _indexes_lock:
+            cached = _indexes.get(key)
+            if cached is not None and cached.n_rows == len(series):
+                _indexes.move_to_end(key)
+                return cached
+
+    index = build_range_index(series) if kind == "range" else build_category_index(series)
+
+    if key is not None:
+        with _indexes_lock:
+            _indexes[key] = index
+            while len(_indexes) > MAX_INDEXED_COLUMNS:
+                _indexes.popitem(last=False)
+    return index
+
+
+def forget_indexes(dataset_key: str):
+    """Oublie les index des colonnes d'un dataset"""
+    with _indexes_lock:
+        for key in [k for k in _indexes if same_dataset(k[0], dataset_key)]:
+            del _indexes[key]
+
+
+def clear_indexes():
+    with _indexes_lock:
+        _indexes.clear()
+
+
+# =========================================================
+# RÉSOLUTION DES FILTRES
+# =========================================================
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_))
+
+
+def filter_kind(condition, series: pd.Series = None) -> str:
+    """
+    Type d'un filtre :
+    - "range" : tuple (min, max), ou liste de deux nombres sur une colonne
+      numérique (plage relue depuis du JSON ou la ligne de commande)
+    - "category" : liste, ensemble ou tableau de valeurs
+    """
+    if isinstance(condition, tuple):
+        if len(condition) != 2:
+            raise ValueError(f"Filtre de plage (min, max) attendu, reçu {condition!r}")
+        return "range"
+    if not isinstance(condition, (list, set, frozenset, np.ndarray, pd.Index, pd.Series)):
+        raise ValueError(f"Filtre invalide : {condition!r} (plage (min, max) ou liste de valeurs attendue)")
+    if (isinstance(condition, list) and len(condition) == 2 and all(map(_is_number, condition))
+            and series is not None and pd.api.types.is_numeric_dtype(series)
+            and not pd.api.types.is_bool_dtype(series)):
+        return "range"
+    return "category"
+
+
+def filter_key(condition) -> list:
+    """Forme canonique d'un filtre pour les clés de cache : plage dans l'ordre (min, max), catégories triées"""
+    if isinstance(condition, tuple) or all(map(_is_number, condition)):
+        return [float(v) for v in condition]
+    return sorted(map(str, condition))
+
+
+def _bounds(index: ColumnIndex, condition):
+    """Tranche de `order` sélectionnée par une plage (deux recherches dichotomiques)"""
+    lo, hi = condition
+    return (int(np.searchsorted(index.sorted_values, lo, side="left")),
+            int(np.searchsorted(index.sorted_values, hi, side="right")))
+
+
+def _category_codes(index: ColumnIndex, condition) -> np.ndarray:
+    selected = index.categories.get_indexer(pd.Index(list(condition)))
+    return np.unique(selected[selected >= 0])
+
+
+def _selection(index: ColumnIndex, condition):
+    """(nombre de lignes sélectionnées, lignes sélectionnées non triées à la demande)"""
+    if index.kind == "range":
+        start, stop = _bounds(index, condition)
+        return stop - start, lambda: index.order[start:stop]
+    codes = _category_codes(index, condition)
+    sizes = index.offsets[codes + 1] - index.offsets[codes]
+    return int(sizes.sum()), lambda: np.concatenate(
+        [index.order[index.offsets[c]:index.offsets[c + 1]] for c in codes] or [index.order[:0]]
+    )
+
+
+def _matches(index: ColumnIndex, condition, values, rows=None) -> np.ndarray:
+    """Masque des lignes (toutes, ou `rows`) satisfaisant la condition"""
+    if index.kind == "range":
+        lo, hi = condition
+        v = values if rows is None else values[rows]
+        return (v >= lo) & (v <= hi)
+    # Table de correspondance code → sélection ; le code -1 (manquant) tombe sur la dernière case
+    lookup = np.zeros(len(index.categories) + 1, dtype=bool)
+    lookup[_category_codes(index, condition)] = True
+    return lookup[index.codes if rows is None else index.codes[rows]]
+
+
+def filter_rows(df: pd.DataFrame, filters, dataset_key: str = None):
+    """
+    Positions (triées) des lignes satisfaisant tous les filtres, ou None si
+    aucun filtre ne restreint le dataset.
+
+    Args:
+        filters: dict {colonne: (min, max)} pour une plage numérique,
+            {colonne: [valeurs]} pour des catégories (voir `filter_kind`).
+            Un filtre qui retient toutes les valeurs renseignées est ignoré.
+        dataset_key: clé du dataset pour le cache des index (défaut : frame_key)
+    """
+    filters = {col: cond for col, cond in (filters or {}).items() if col in df.columns}
+    if not filters:
+        return None
+    dataset_key = dataset_key or frame_key(df)
+    n_rows = len(df)
+
+    entries = []
+    for col, condition in filters.items():
+        index = column_index(df[col], filter_kind(condition, df[col]), dataset_key)
+        count, rows = _selection(index, condition)
+        if count == index.n_valid:
+            # Filtre sans effet (plage complète, toutes les catégories) : les lignes
+            # sans valeur sont conservées, comme sans filtre
+            continue
+        entries.append((count, col, condition, index, rows))
+    if not entries:
+        return None
+
+    # Le filtre le plus restrictif donne les candidats, les autres les vérifient
+    entries.sort(key=lambda e: e[0])
+    count, _, _, _, rows = entries[0]
+    others = entries[1:]
+
+    def _values(col, index):
+        return df[col].to_numpy(dtype=np.float64, na_value=np.nan) if index.kind == "range" else None
+
+    if count <= n_rows * SPARSE_FRACTION:
+        rows = np.sort(rows())
+        for _, col, condition, index, _ in others:
+            rows = rows[_matches(index, condition, _values(col, index), rows)]
+        return rows.astype(np.int64, copy=False)
+
+    mask = np.ones(n_rows, dtype=bool)
+    for _, col, condition, index, _ in entries:
+        mask &= _matches(index, condition, _values(col, index))
+    return np.flatnonzero(mask)
+
+
+def filtered_frame(df: pd.DataFrame, filters, dataset_key: str = None) -> pd.DataFrame:
+    """Lignes filtrées du DataFrame (le DataFrame lui-même, sans copie, si rien n'est filtré)"""
+    rows = filter_rows(df, filters, dataset_key)
+    return df if rows is None else df.take(rows)
+
+
+def count_rows(df: pd.DataFrame, filters, dataset_key: str = None) -> int:
+    rows = filter_rows(df, filters, dataset_key)
+    return len(df) if rows is None else len(rows)
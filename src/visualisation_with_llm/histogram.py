@@ -0,0 +1,171 @@
+# histogram.py
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .config import HISTOGRAM_CACHE_MAX_BYTES
+from .preprocessing import same_dataset
+from .profiler import cached_profile
+
+# Nombre de colonnes dont les valeurs triées restent en mémoire
+# (et au plus HISTOGRAM_CACHE_MAX_BYTES octets au total)
+MAX_CACHED_COLUMNS = 16
+# Résolution de la grille du KDE (puissance de 2 pour la FFT)
+KDE_GRID_SIZE = 1024
+
+
+@dataclass
+class ColumnDistribution:
+    """Valeurs triées d'une colonne numérique, statistiques et densité (indépendantes des bins)"""
+    values: np.ndarray
+    mean: float
+    median: float
+    kde_x: np.ndarray
+    kde_density: np.ndarray
+
+    @property
+    def count(self) -> int:
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.kde_x.nbytes + self.kde_density.nbytes
+
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+# =========================================================
+# KDE PAR BINNING + FFT
+# =========================================================
+
+def binned_kde(values: np.ndarray, grid_size: int = KDE_GRID_SIZE):
+    """
+    Densité gaussienne (bande passante de Scott, comme seaborn) évaluée sur une
+    grille régulière : binning linéaire des points puis convolution par FFT.
+    Coût O(n + g log g) au lieu de O(n × g).
+    """
+    n = len(values)
+    lo, hi = float(values[0]), float(values[-1])
+    std = float(values.std(ddof=1)) if n > 1 else 0.0
+    if n < 2 or std == 0 or hi == lo:
+        return np.empty(0), np.empty(0)
+
+    bandwidth = std * n ** (-1 / 5)
+    # Grille élargie de 3 bandes passantes pour éviter le repliement de la FFT
+    start, stop = lo - 3 * bandwidth, hi + 3 * bandwidth
+    delta = (stop - start) / (grid_size - 1)
+
+    # Binning linéaire : chaque point est réparti entre ses deux nœuds voisins
+    pos = (values - start) / delta
+    left = np.floor(pos).astype(np.int64)
+    frac = pos - left
+    grid = np.bincount(left, weights=1 - frac, minlength=grid_size + 1)
+    grid += np.bincount(left + 1, weights=frac, minlength=grid_size + 1)
+    grid = grid[:grid_size]
+
+    # Convolution par un noyau gaussien, sur une longueur doublée (convolution non circulaire)
+    size = 2 * grid_size
+    offsets = np.arange(size)
+    offsets = np.where(offsets < grid_size, offsets, offsets - size) * delta
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    density = np.fft.irfft(np.fft.rfft(grid, size) * np.fft.rfft(kernel), size)[:grid_size] / n
+
+    x = start + delta * np.arange(grid_size)
+    # Courbe limitée à l'étendue des données, comme l'histogramme
+    inside = (x >= lo) & (x <= hi)
+    return x[inside], np.clip(density[inside], 0, None)
+
+
+# =========================================================
+# DISTRIBUTION D'UNE COLONNE (MISE EN CACHE)
+# =========================================================
+
+def _profile_stats(dataset_key, column, count):
+    """Moyenne et médiane exactes déjà calculées par le profil du dataset, si disponibles"""
+    profile = cached_profile(dataset_key)
+    if profile is None or profile.approximate:
+        return None
+    try:
+        col = profile[column]
+    except KeyError:
+        return None
+    if not col.is_numeric or col.count != count or 0.5 not in col.quantiles:
+        return None
+    return col.mean, col.quantiles[0.5]
+
+
+def column_distribution(series: pd.Series, dataset_key: str = None) -> ColumnDistribution:
+    """
+    Tri unique de la colonne, moyenne, médiane et KDE, mis en cache par
+    (`dataset_key`, colonne) : changer le nombre de bins ne fait que rebinner.
+    """
+    key = (dataset_key, str(series.name)) if dataset_key else None
+    if key is not None:
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached is not None:
+                _cache.move_to_end(key)
+                return cached
+
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    values = np.sort(values[np.isfinite(values)])
+
+    stats = _profile_stats(dataset_key, series.name, len(values)) if dataset_key else None
+    if stats is None and len(values):
+        stats = (float(values.mean()), float(np.median(values)))
+    mean, median = stats or (np.nan, np.nan)
+
+    kde_x, kde_density = binned_kde(values) if len(values) else (np.empty(0), np.empty(0))
+    distribution = ColumnDistribution(values, mean, median, kde_x, kde_density)
+
+    # Une colonne plus grosse que tout le budget n'est pas mise en cache
+    if key is not None and distribution.nbytes <= HISTOGRAM_CACHE_MAX_BYTES:
+        _remember(key, distribution)
+    return distribution
+
+
+def _remember(key, distribution: ColumnDistribution):
+    global _cache_bytes
+    with _cache_lock:
+        previous = _cache.pop(key, None)
+        if previous is not None:
+            _cache_bytes -= previous.nbytes
+        _cache[key] = distribution
+        _cache_bytes += distribution.nbytes
+        while len(_cache) > MAX_CACHED_COLUMNS or _cache_bytes > HISTOGRAM_CACHE_MAX_BYTES:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= evicted.nbytes
+
+
+def histogram_counts(distribution: ColumnDistribution, bins: int = 20):
+    """Effectifs par bin lus dans les valeurs triées (searchsorted, O(bins × log n))"""
+    values = distribution.values
+    lo, hi = float(values[0]), float(values[-1])
+    if hi == lo:
+        lo, hi = lo - 0.5, hi + 0.5
+    edges = np.linspace(lo, hi, max(1, int(bins)) + 1)
+    idx = np.searchsorted(values, edges, side="left")
+    # Le dernier bin inclut sa borne droite (comme np.histogram)
+    idx[-1] = len(values)
+    return np.diff(idx), edges
+
+
+def forget_histograms(dataset_key: str):
+    """Oublie les valeurs triées des colonnes d'un dataset"""
+    global _cache_bytes
+    with _cache_lock:
+        for key in [k for k in _cache if same_dataset(k[0], dataset_key)]:
+            _cache_bytes -= _cache.pop(key).nbytes
+
+
+def clear_histograms():
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
@@ -0,0 +1,164 @@
+# llm_cache.py
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+
+from .config import LLM_CACHE_MAX_ENTRIES, LLM_CACHE_PATH, LLM_CACHE_TTL
+from .llm_client import ainvoke_with_retry, invoke_with_retry
+
+# Paramètres du modèle qui influencent la réponse
+FINGERPRINT_PARAMS = ("model", "temperature", "max_output_tokens", "top_p", "top_k")
+
+
+# =========================================================
+# EMPREINTE
+# =========================================================
+
+def llm_params(llm) -> dict:
+    """Paramètres du client LLM pris en compte dans la clé de cache"""
+    return {name: getattr(llm, name, None) for name in FINGERPRINT_PARAMS}
+
+
+def prompt_fingerprint(prompt: str, params: dict) -> str:
+    """
+    Hash du prompt normalisé (espaces et sauts de ligne compactés)
+    et des paramètres du modèle.
+    """
+    normalized = re.sub(r"\s+", " ", prompt).strip()
+    payload = json.dumps({"prompt": normalized, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# =========================================================
+# STOCKAGE SQLITE
+# =========================================================
+
+def _connect(path=None) -> sqlite3.Connection:
+    path = Path(path or LLM_CACHE_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=10)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS responses ("
+        " key TEXT PRIMARY KEY,"
+        " response TEXT NOT NULL,"
+        " created REAL NOT NULL,"
+        " accessed REAL NOT NULL)"
+    )
+    return conn
+
+
+def get_cached_response(key: str, ttl: int = LLM_CACHE_TTL, path=None):
+    """Retourne la réponse en cache si elle existe et n'a pas expiré, sinon None"""
+    now = time.time()
+    # closing() ferme la connexion, le second `with` valide la transaction
+    with closing(_connect(path)) as conn, conn:
+        row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        response, created = row
+        if now - created > ttl:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+    return response
+
+
+def store_response(key: str, response: str, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                   ttl: int = LLM_CACHE_TTL, path=None):
+    """Enregistre une réponse puis supprime les entrées expirées et les moins utilisées"""
+    now = time.time()
+    with closing(_connect(path)) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+            (key, response, now, now),
+        )
+        conn.execute("DELETE FROM responses WHERE created < ?", (now - ttl,))
+        conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (max_entries,),
+        )
+
+
+# =========================================================
+# APPEL AVEC CACHE
+# =========================================================
+
+# Réponses servies depuis le cache et appels effectifs au LLM, depuis le démarrage du processus
+cache_stats = {"hits": 0, "calls": 0}
+
+
+def _lookup(key: str):
+    try:
+        cached = get_cached_response(key)
+    except sqlite3.Error as e:
+        print(f"Cache LLM indisponible : {e}")
+        return None
+    if cached is not None:
+        cache_stats["hits"] += 1
+    return cached
+
+
+def _store(key: str, text: str):
+    cache_stats["calls"] += 1
+    try:
+        store_response(key, text)
+    except sqlite3.Error as e:
+        print(f"Erreur écriture cache LLM : {e}")
+
+
+def invoke_cached(llm, prompt: str, use_cache: bool = True) -> str:
+    """
+    Appelle le LLM en réutilisant une réponse identique déjà obtenue.
+    Avec use_cache=False, l'appel est forcé et la nouvelle réponse remplace l'ancienne.
+    """
+    key = prompt_fingerprint(prompt, llm_params(llm))
+
+    if use_cache:
+        cached = _lookup(key)
+        if cached is not None:
+            return cached
+
+    text = invoke_with_retry(llm, prompt).content.strip()
+    _store(key, text)
+    return text
+
+
+async def ainvoke_cached(llm, prompt: str, use_cache: bool = True, semaphore=None) -> str:
+    """Version asynchrone de invoke_cached"""
+    key = prompt_fingerprint(prompt, llm_params(llm))
+
+    if use_cache:
+        cached = _lookup(key)
+        if cached is not None:
+            return cached
+
+    response = await ainvoke_with_retry(llm, prompt, semaphore=semaphore)
+    text = response.content.strip()
+    _store(key, text)
+    return text
+
+
+def stream_cached(llm, prompt: str, use_cache: bool = True):
+    """
+    Itère sur les morceaux de texte de la réponse (llm.stream).
+    Une réponse en cache est renvoyée d'un bloc ; sinon la réponse complète
+    est enregistrée une fois le flux terminé.
+    """
+    key = prompt_fingerprint(prompt, llm_params(llm))
+
+    if use_cache:
+        cached = _lookup(key)
+        if cached is not None:
+            yield cached
+            return
+
+    parts = []
+    for chunk in llm.stream(prompt):
+        parts.append(chunk.content)
+        yield chunk.content
+    _store(key, "".join(parts).strip())
@@ -0,0 +1,120 @@
+# llm_client.py
+import asyncio
+import os
+import random
+import threading
+import time
+
+from .config import LLM_MAX_RETRIES
+
+# Délai initial (secondes) du backoff exponentiel, plafonné à BACKOFF_MAX
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+# Seules les erreurs passagères sont retentées : délais dépassés, connexion
+# perdue, trop de requêtes (429) et erreurs serveur (5xx)
+TRANSIENT_STATUS = (408, 429)
+TRANSIENT_ERROR_NAMES = {
+    "DeadlineExceeded", "ServiceUnavailable", "ResourceExhausted", "TooManyRequests",
+    "InternalServerError", "BadGateway", "GatewayTimeout",
+    "ReadTimeout", "ConnectTimeout", "WriteTimeout", "PoolTimeout", "ConnectError", "RemoteProtocolError",
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+# =========================================================
+# POOL DE CLIENTS
+# =========================================================
+
+def get_llm(**params):
+    """
+    Retourne le client Gemini partagé par tout le processus pour ces paramètres.
+    Le client (et ses connexions HTTP) n'est construit qu'une fois.
+    """
+    key = tuple(sorted(params.items()))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            api_key = os.getenv("GOOGLE_API_KEY")
+            if not api_key:
+                raise ValueError("Clé API manquante")
+            client = ChatGoogleGenerativeAI(api_key=api_key, **params)
+            _clients[key] = client
+    return client
+
+
+def reset_clients():
+    """Oublie les clients construits (ex. après changement de clé API)"""
+    with _clients_lock:
+        _clients.clear()
+
+
+# =========================================================
+# NOUVELLES TENTATIVES
+# =========================================================
+
+def backoff_delay(attempt: int) -> float:
+    """Délai avant la tentative suivante : exponentiel avec gigue"""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _status_code(error):
+    """Code HTTP porté par l'exception (google.api_core, google.genai, httpx), sinon None"""
+    for value in (getattr(error, "status_code", None), getattr(error, "code", None),
+                  getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    return None
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Vrai si l'erreur (ou une erreur qu'elle enveloppe) est passagère.
+    Authentification, quota refusé, requête invalide, ValueError... : faux.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in TRANSIENT_ERROR_NAMES:
+            return True
+        status = _status_code(error)
+        if status is not None:
+            return status in TRANSIENT_STATUS or 500 <= status < 600
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def invoke_with_retry(llm, prompt, retries: int = LLM_MAX_RETRIES):
+    """llm.invoke avec nouvelles tentatives espacées exponentiellement (erreurs passagères uniquement)"""
+    for attempt in range(retries + 1):
+        try:
+            return llm.invoke(prompt)
+        except Exception as e:
+            if attempt == retries or not is_transient(e):
+                raise
+            delay = backoff_delay(attempt)
+            print(f"Erreur LLM ({e}), nouvel essai dans {delay:.1f}s")
+            time.sleep(delay)
+
+
+async def ainvoke_with_retry(llm, prompt, retries: int = LLM_MAX_RETRIES, semaphore=None):
+    """Version asynchrone (ainvoke), limitée par un sémaphore optionnel"""
+    for attempt in range(retries + 1):
+        try:
+            if semaphore is None:
+                return await llm.ainvoke(prompt)
+            async with semaphore:
+                return await llm.ainvoke(prompt)
+        except Exception as e:
+            if attempt == retries or not is_transient(e):
+                raise
+            delay = backoff_delay(attempt)
+            print(f"Erreur LLM ({e}), nouvel essai dans {delay:.1f}s")
+            await asyncio.sleep(delay)
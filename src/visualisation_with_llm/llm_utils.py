@@ -1,25 +1,53 @@
-﻿import os
+﻿import asyncio
+import json
 from dotenv import load_dotenv
 import re
 
+from .config import LLM_MAX_CONCURRENCY
+from .llm_cache import ainvoke_cached, invoke_cached, stream_cached
+from .llm_client import get_llm
+
 load_dotenv()
 
+LLM_PARAMS = {
+    "model": "gemini-2.0-flash",
+    "temperature": 0.2,
+    "max_output_tokens": 2048,
+}
+
+
+# Types de graphiques et colonnes obligatoires de chacun
+SUPPORTED_TYPES = ("scatter", "bar", "line", "histogram", "boxplot", "heatmap", "count")
+REQUIRED_COLUMNS = {
+    "scatter": ("x", "y"),
+    "line": ("x", "y"),
+    "boxplot": ("x", "y"),
+    "bar": ("x",),
+    "histogram": ("x",),
+    "count": ("x",),
+    "heatmap": (),
+}
+# Colonnes qui doivent être numériques, par type
+NUMERIC_COLUMNS = {
+    "scatter": ("x", "y"),
+    "line": ("y",),
+    "boxplot": ("y",),
+    "bar": ("y",),
+    "histogram": ("x",),
+}
+SPEC_KEYS = ("type", "x", "y", "hue", "title", "justification")
+NULL_VALUES = ("", "null", "none", "n/a")
+
+SPEC_FORMAT = '''{"type": "<type>", "x": "<colonne ou null>", "y": "<colonne ou null>", "hue": "<colonne ou null>", "title": "<titre>", "justification": "<texte>"}'''
+
 
 def init_llm():
-    from langchain_google_genai import ChatGoogleGenerativeAI
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("Clé API manquante")
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash",
-        api_key=api_key,
-        temperature=0.2,
-        max_output_tokens=2048
-    )
-    return llm
+    # Client partagé par le processus : construit une seule fois
+    return get_llm(**LLM_PARAMS)
 
 
-def generate_visualization_proposals(llm, problem_statement, dataset_summary, preferred_types=None, num_proposals=3, allow_duplicates=False):
+def build_proposal_prompt(problem_statement, dataset_summary, preferred_types=None, num_proposals=3, allow_duplicates=False):
+    """Construit le prompt ; retourne (prompt, allowed_types, num_proposals, allow_duplicates)"""
     num_proposals = max(3, num_proposals)
     allowed_types = None
     
@@ -40,117 +68,344 @@ CONTRAINTE : Tu DOIS UNIQUEMENT utiliser ces types : {', '.join(allowed_types).u
         types_constraint = ""
         allowed_types = ["scatter", "bar", "line", "histogram", "boxplot", "heatmap", "count"]
     
-    columns_info = extract_columns_from_summary(dataset_summary)
-    
+    # Le résumé liste déjà les colonnes : pas de seconde liste dérivée (taille du prompt bornée par le résumé)
     prompt = f"""
 Tu es un expert en data visualisation.
 
 PROBLÉMATIQUE : {problem_statement}
 DATASET : {dataset_summary}
-COLONNES : {columns_info}
 {types_constraint}
 
 TÂCHE : Propose EXACTEMENT {num_proposals} visualisations.
 
-FORMAT ({num_proposals} lignes) :
-type: <type>, x: <col>, y: <col>, title: <titre>, justification: <texte>
+FORMAT : EXACTEMENT {num_proposals} lignes, chacune un objet JSON sur une seule ligne (JSON Lines), sans texte autour :
+{SPEC_FORMAT}
 
 TYPES : scatter, bar, line, histogram, boxplot, heatmap, count
+Les noms de colonnes doivent être recopiés exactement depuis le DATASET.
 """
+    return prompt, allowed_types, num_proposals, allow_duplicates
+
+
+def specs_from_response(text, dataset_summary, allowed_types, num_proposals, allow_duplicates, columns=None, rejected=None):
+    """Parse et valide la réponse du LLM (specs invalides ajoutées à `rejected`)"""
+    return list(iter_specs_from_stream([text], allowed_types, allow_duplicates, columns, rejected))[:num_proposals]
+
+
+def _merge_repaired(specs, repaired, allow_duplicates):
+    """Ajoute les specs réparées à celles déjà validées, sans doublon (sauf si autorisés)"""
+    merged = list(specs)
+    seen = {_signature(s) for s in merged}
+    for spec in repaired:
+        signature = _signature(spec)
+        if allow_duplicates or signature not in seen:
+            merged.append(spec)
+            seen.add(signature)
+    return merged
+
+
+def finalize_specs(specs, dataset_summary, allowed_types, num_proposals, allow_duplicates, columns=None):
+    """Complète avec des specs de secours si besoin"""
+    if len(specs) < num_proposals:
+        specs = complete_to_n_specs(specs, dataset_summary, allowed_types, num_proposals, allow_duplicates, columns)
+    return specs[:num_proposals]
+
+
+def generate_visualization_proposals(llm, problem_statement, dataset_summary, preferred_types=None, num_proposals=3, allow_duplicates=False, use_cache=True, columns=None):
+    """
+    Propositions du LLM, validées contre les colonnes du dataset.
+
+    Args:
+        columns: dict {colonne: est numérique} du DataFrame (voir column_kinds) ;
+            sans lui, seules la forme et le type des specs sont vérifiés
+    """
+    prompt, allowed_types, num_proposals, allow_duplicates = build_proposal_prompt(
+        problem_statement, dataset_summary, preferred_types, num_proposals, allow_duplicates
+    )
     
     try:
-        response = llm.invoke(prompt)
-        text = response.content.strip()
-        specs = parse_all_specs(text, dataset_summary, allow_duplicates)
-        
-        if allowed_types:
-            specs = [s for s in specs if s.get("type") in allowed_types]
-        
-        if len(specs) < num_proposals:
-            specs = complete_to_n_specs(specs, dataset_summary, allowed_types, num_proposals, allow_duplicates)
-        
-        return specs[:num_proposals]
+        # Réponse réutilisée si le même prompt a déjà été envoyé avec les mêmes paramètres
+        text = invoke_cached(llm, prompt, use_cache=use_cache)
+        rejected = []
+        specs = specs_from_response(text, dataset_summary, allowed_types, num_proposals, allow_duplicates, columns, rejected)
+        if len(specs) < num_proposals and rejected:
+            # Une seule requête de réparation, limitée aux specs invalides
+            repair = build_repair_prompt(problem_statement, dataset_summary, rejected, allowed_types)
+            repaired = invoke_cached(llm, repair, use_cache=use_cache)
+            specs = _merge_repaired(specs, specs_from_response(repaired, dataset_summary, allowed_types, num_proposals,
+                                                               allow_duplicates, columns), allow_duplicates)
+        return finalize_specs(specs, dataset_summary, allowed_types, num_proposals, allow_duplicates, columns)
     
     except Exception as e:
         print(f"Erreur LLM: {e}")
-        return generate_smart_fallback_specs(dataset_summary, allowed_types, num_proposals, allow_duplicates)
+        return generate_smart_fallback_specs(dataset_summary, allowed_types, num_proposals, allow_duplicates, columns)
 
 
-def extract_columns_from_summary(summary):
-    lines = summary.split('\n')
-    columns = []
-    for line in lines:
-        if any(dtype in line.lower() for dtype in ['int', 'float', 'object', 'string']):
-            parts = line.split()
-            if parts:
-                columns.append(parts[0].strip())
-    return "Colonnes : " + ", ".join(columns) if columns else ""
+def stream_visualization_proposals(llm, problem_statement, dataset_summary, preferred_types=None, num_proposals=3, allow_duplicates=False, use_cache=True, columns=None):
+    """
+    Version streaming de generate_visualization_proposals : chaque spec est
+    produite dès que son objet JSON est complet et valide dans la réponse du
+    LLM ; les specs invalides font l'objet d'une seule requête de réparation,
+    puis la liste est complétée par des specs de secours si besoin.
+    """
+    prompt, allowed_types, num_proposals, allow_duplicates = build_proposal_prompt(
+        problem_statement, dataset_summary, preferred_types, num_proposals, allow_duplicates
+    )
+    
+    specs = []
+    rejected = []
+    try:
+        chunks = stream_cached(llm, prompt, use_cache=use_cache)
+        for spec in iter_specs_from_stream(chunks, allowed_types, allow_duplicates, columns, rejected):
+            # Le flux est consommé jusqu'au bout pour que la réponse soit mise en cache
+            if len(specs) < num_proposals:
+                specs.append(spec)
+                yield spec
+        
+        if len(specs) < num_proposals and rejected:
+            repair = build_repair_prompt(problem_statement, dataset_summary, rejected, allowed_types)
+            seen = {_signature(s) for s in specs}
+            for spec in iter_specs_from_stream(stream_cached(llm, repair, use_cache=use_cache),
+                                               allowed_types, allow_duplicates, columns):
+                if len(specs) < num_proposals and (_signature(spec) not in seen or allow_duplicates):
+                    specs.append(spec)
+                    seen.add(_signature(spec))
+                    yield spec
+    except Exception as e:
+        print(f"Erreur LLM: {e}")
+    
+    if len(specs) < num_proposals:
+        completed = complete_to_n_specs(list(specs), dataset_summary, allowed_types, num_proposals, allow_duplicates, columns)
+        for spec in completed[len(specs):num_proposals]:
+            yield spec
 
 
-def parse_all_specs(text, dataset_summary, allow_duplicates):
-    specs = []
-    seen_combos = set()
-    lines = [line.strip() for line in text.split("\n") if line.strip()]
+async def agenerate_visualization_proposals(llm, problem_statement, dataset_summary, preferred_types=None, num_proposals=3, allow_duplicates=False, use_cache=True, semaphore=None, columns=None):
+    """Version asynchrone de generate_visualization_proposals (ainvoke)"""
+    prompt, allowed_types, num_proposals, allow_duplicates = build_proposal_prompt(
+        problem_statement, dataset_summary, preferred_types, num_proposals, allow_duplicates
+    )
+    
+    try:
+        text = await ainvoke_cached(llm, prompt, use_cache=use_cache, semaphore=semaphore)
+        rejected = []
+        specs = specs_from_response(text, dataset_summary, allowed_types, num_proposals, allow_duplicates, columns, rejected)
+        if len(specs) < num_proposals and rejected:
+            repair = build_repair_prompt(problem_statement, dataset_summary, rejected, allowed_types)
+            repaired = await ainvoke_cached(llm, repair, use_cache=use_cache, semaphore=semaphore)
+            specs = _merge_repaired(specs, specs_from_response(repaired, dataset_summary, allowed_types, num_proposals,
+                                                               allow_duplicates, columns), allow_duplicates)
+        return finalize_specs(specs, dataset_summary, allowed_types, num_proposals, allow_duplicates, columns)
     
-    for line in lines:
-        if "type:" not in line.lower():
+    except Exception as e:
+        print(f"Erreur LLM: {e}")
+        return generate_smart_fallback_specs(dataset_summary, allowed_types, num_proposals, allow_duplicates, columns)
+
+
+async def abatch_generate_proposals(requests, llm=None, max_concurrency=LLM_MAX_CONCURRENCY, **kwargs):
+    """
+    Génère les propositions pour plusieurs couples (problématique, résumé)
+    en parallèle, au plus `max_concurrency` appels simultanés.
+    Les résultats sont dans l'ordre des requêtes.
+    """
+    llm = llm or init_llm()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = [
+        agenerate_visualization_proposals(llm, problem, summary, semaphore=semaphore, **kwargs)
+        for problem, summary in requests
+    ]
+    return await asyncio.gather(*tasks)
+
+
+def batch_generate_proposals(requests, llm=None, max_concurrency=LLM_MAX_CONCURRENCY, **kwargs):
+    """Point d'entrée synchrone de abatch_generate_proposals (ex. traitements nocturnes)"""
+    return asyncio.run(abatch_generate_proposals(requests, llm=llm, max_concurrency=max_concurrency, **kwargs))
+
+
+# =========================================================
+# SPECS STRUCTURÉES (JSON) ET VALIDATION
+# =========================================================
+
+def iter_json_objects(chunks):
+    """
+    Objets JSON de premier niveau d'un flux de texte, produits dès qu'ils sont
+    complets : JSON Lines, tableau indenté ou bloc ```json``` (le texte autour est ignoré).
+    """
+    depth = 0
+    in_string = escaped = False
+    buffer = []
+    for chunk in chunks:
+        for ch in chunk:
+            if depth == 0:
+                if ch == "{":
+                    depth, buffer = 1, ["{"]
+                continue
+            buffer.append(ch)
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    yield "".join(buffer)
+
+
+def normalize_spec(obj) -> dict:
+    """Spec aux clés attendues : clés en minuscules, valeurs vides ou « null » remplacées par None"""
+    raw = {str(k).strip().lower(): v for k, v in obj.items()}
+    spec = {"type": None, "x": None, "y": None, "hue": None, "title": "Visualisation", "justification": ""}
+    for key in SPEC_KEYS:
+        value = raw.get(key)
+        if isinstance(value, str):
+            value = value.strip()
+            if value.lower() in NULL_VALUES:
+                value = None
+        if value is not None:
+            spec[key] = value if isinstance(value, str) else str(value)
+    if spec["type"]:
+        spec["type"] = spec["type"].lower()
+    return spec
+
+
+def validate_spec(spec: dict, columns=None) -> list:
+    """
+    Vérifie une spec (type, colonnes obligatoires, colonnes existantes et
+    numériques si `columns` est fourni) ; corrige la casse des noms de colonnes.
+
+    Args:
+        columns: dict {colonne: est numérique}
+
+    Returns:
+        Liste des erreurs (vide si la spec est valide)
+    """
+    errors = []
+    plot_type = spec.get("type")
+    if plot_type not in SUPPORTED_TYPES:
+        return [f"type '{plot_type}' inconnu (attendu : {', '.join(SUPPORTED_TYPES)})"]
+    if plot_type == "heatmap":
+        spec["x"] = spec["y"] = spec["hue"] = None
+        return []
+    if plot_type in ("histogram", "count"):
+        spec["y"] = None
+
+    by_lower = {str(c).lower(): c for c in columns} if columns is not None else {}
+    for key in ("x", "y", "hue"):
+        value = spec.get(key)
+        if value is None or columns is None or value in columns:
             continue
-        spec = parse_single_spec(line)
-        if spec and spec.get("type"):
-            signature = f"{spec['type']}_{spec.get('x', '')}_{spec.get('y', '')}"
-            if signature not in seen_combos or allow_duplicates:
-                specs.append(spec)
-                seen_combos.add(signature)
-    return specs
+        match = by_lower.get(value.lower())
+        if match is not None:
+            spec[key] = match
+        elif key == "hue":
+            spec["hue"] = None
+        else:
+            errors.append(f"colonne {key}='{value}' inexistante")
+
+    for key in REQUIRED_COLUMNS[plot_type]:
+        if not spec.get(key):
+            errors.append(f"colonne {key} obligatoire pour un {plot_type}")
+    if columns is not None and not errors:
+        for key in NUMERIC_COLUMNS.get(plot_type, ()):
+            if spec.get(key) and not columns[spec[key]]:
+                errors.append(f"colonne {key}='{spec[key]}' non numérique")
+    return errors
+
+
+def _signature(spec) -> str:
+    return f"{spec['type']}_{spec.get('x') or ''}_{spec.get('y') or ''}"
+
+
+def parse_all_specs(text, dataset_summary, allow_duplicates, columns=None):
+    return list(iter_specs_from_stream([text], allow_duplicates=allow_duplicates, columns=columns))
 
 
-def parse_single_spec(line):
-    spec = {"type": None, "x": None, "y": None, "title": "Visualisation", "justification": ""}
-    parts = re.split(r',\s*(?=\w+:)', line)
-    for part in parts:
-        if ":" not in part:
+def iter_specs_from_stream(chunks, allowed_types=None, allow_duplicates=False, columns=None, rejected=None):
+    """
+    Parse incrémentalement un flux de morceaux de texte : une spec est produite
+    dès que son objet JSON est complet et valide (les doublons et types non
+    autorisés sont ignorés). Les objets invalides sont ajoutés à `rejected`
+    sous forme de couples (objet, erreurs).
+    """
+    seen_combos = set()
+    for text in iter_json_objects(chunks):
+        try:
+            obj = json.loads(text)
+        except json.JSONDecodeError as e:
+            if rejected is not None:
+                rejected.append((text, [f"JSON invalide : {e.msg}"]))
             continue
-        key, value = part.split(":", 1)
-        key = key.strip().lower()
-        value = value.strip()
-        if value.lower() in ["null", "none", "", "n/a"]:
-            value = None
-        if key in spec:
-            spec[key] = value
-    return spec
+        if not isinstance(obj, dict):
+            continue
+        spec = normalize_spec(obj)
+        errors = validate_spec(spec, columns)
+        if not errors and allowed_types and spec["type"] not in allowed_types:
+            errors = [f"type '{spec['type']}' non autorisé (autorisés : {', '.join(allowed_types)})"]
+        if errors:
+            if rejected is not None:
+                rejected.append((text, errors))
+            continue
+        signature = _signature(spec)
+        if signature in seen_combos and not allow_duplicates:
+            continue
+        seen_combos.add(signature)
+        yield spec
+
+
+def build_repair_prompt(problem_statement, dataset_summary, rejected, allowed_types=None) -> str:
+    """Requête ciblée : seules les specs invalides, avec leurs erreurs, sont à corriger"""
+    items = "\n".join(f"{text.strip()}\n  ERREURS : {'; '.join(errors)}" for text, errors in rejected)
+    types = ", ".join(allowed_types or SUPPORTED_TYPES)
+    return f"""
+Tu es un expert en data visualisation.
+
+PROBLÉMATIQUE : {problem_statement}
+DATASET : {dataset_summary}
+
+Ces propositions sont invalides pour ce dataset :
+{items}
 
+TÂCHE : Corrige chacune d'elles ({len(rejected)} au total) en utilisant uniquement des colonnes du DATASET, noms recopiés exactement.
+TYPES AUTORISÉS : {types}
+FORMAT : un objet JSON par ligne (JSON Lines), sans texte autour :
+{SPEC_FORMAT}
+"""
 
-def complete_to_n_specs(specs, dataset_summary, allowed_types, num_proposals, allow_duplicates):
-    existing_combos = {f"{s['type']}_{s.get('x', '')}_{s.get('y', '')}" for s in specs}
-    fallback_specs = generate_smart_fallback_specs(dataset_summary, allowed_types, num_proposals, allow_duplicates)
+
+def complete_to_n_specs(specs, dataset_summary, allowed_types, num_proposals, allow_duplicates, columns=None):
+    existing_combos = {_signature(s) for s in specs}
+    fallback_specs = generate_smart_fallback_specs(dataset_summary, allowed_types, num_proposals, allow_duplicates, columns)
     for fb_spec in fallback_specs:
         if len(specs) >= num_proposals:
             break
-        signature = f"{fb_spec['type']}_{fb_spec.get('x', '')}_{fb_spec.get('y', '')}"
+        signature = _signature(fb_spec)
         if signature not in existing_combos or allow_duplicates:
             specs.append(fb_spec)
             existing_combos.add(signature)
     return specs
 
 
-def generate_smart_fallback_specs(dataset_summary, allowed_types=None, num_proposals=3, allow_duplicates=False):
-    numeric_cols = []
-    categorical_cols = []
-    
-    for line in dataset_summary.split("\n"):
-        line_lower = line.lower()
-        if not line.strip() or "column" in line_lower:
-            continue
-        parts = line.split()
-        if len(parts) < 2:
-            continue
-        col_name = parts[0].strip()
-        if col_name in ["-", "Column", "Type"]:
-            continue
-        if any(dtype in line_lower for dtype in ['int64', 'float64']):
-            numeric_cols.append(col_name)
-        elif any(dtype in line_lower for dtype in ['object', 'string']):
-            categorical_cols.append(col_name)
+def summary_columns(dataset_summary) -> dict:
+    """Colonnes citées dans un résumé (lignes « - nom (dtype) | ... ») : {colonne: est numérique}"""
+    columns = {}
+    for match in re.finditer(r"^- (.+?) \(([^()]+)\)(?: \||$)", dataset_summary, flags=re.MULTILINE):
+        dtype = match.group(2).lower()
+        columns[match.group(1)] = any(t in dtype for t in ("int", "float", "double", "decimal"))
+    return columns
+
+
+def generate_smart_fallback_specs(dataset_summary, allowed_types=None, num_proposals=3, allow_duplicates=False, columns=None):
+    """Specs construites sans LLM à partir des colonnes du dataset (ou, à défaut, de son résumé)"""
+    columns = columns if columns is not None else summary_columns(dataset_summary)
+    numeric_cols = [c for c, is_numeric in columns.items() if is_numeric]
+    categorical_cols = [c for c, is_numeric in columns.items() if not is_numeric]
     
     if allowed_types:
         types_pool = allowed_types
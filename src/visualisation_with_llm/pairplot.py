@@ -0,0 +1,134 @@
+# pairplot.py
+# Pairplot à coût borné : échantillon (stratifié par hue), binning partagé par
+# colonne et panneaux rastérisés en parallèle dans des processus séparés.
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .config import PAIRPLOT_WORKERS
+
+# Nombre de bins partagés par colonne (diagonale et histogrammes 2D)
+PAIRPLOT_BINS = 30
+# Effectif minimal conservé par catégorie de hue dans l'échantillon
+MIN_ROWS_PER_GROUP = 50
+# Marge autour de l'étendue des données (fraction de l'étendue)
+AXIS_MARGIN = 0.05
+
+
+# =========================================================
+# ÉCHANTILLONNAGE ET BINNING
+# =========================================================
+
+def stratified_sample(n_rows: int, n: int, groups=None, seed: int = 0) -> np.ndarray:
+    """
+    Positions (triées) d'au plus ~n lignes tirées sans remise.
+    Avec `groups` (codes entiers), chaque catégorie garde sa proportion,
+    et au moins MIN_ROWS_PER_GROUP lignes quand elle en a assez.
+    """
+    if n_rows <= n:
+        return np.arange(n_rows)
+    rng = np.random.default_rng(seed)
+    if groups is None:
+        return np.sort(rng.choice(n_rows, n, replace=False))
+
+    groups = np.asarray(groups, dtype=np.int64)
+    sizes = np.bincount(groups)
+    quota = np.minimum(sizes, np.maximum(np.round(n * sizes / n_rows), MIN_ROWS_PER_GROUP)).astype(np.int64)
+
+    # Tri par (catégorie, clé aléatoire) : les `quota` premières lignes de chaque catégorie sont gardées
+    order = np.lexsort((rng.random(n_rows), groups))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rank = np.arange(n_rows) - starts[groups[order]]
+    return np.sort(order[rank < quota[groups[order]]])
+
+
+def column_limits(values: np.ndarray):
+    """Limites d'axe d'une colonne (étendue des données plus une marge)"""
+    lo, hi = float(np.nanmin(values)), float(np.nanmax(values))
+    if hi == lo:
+        return lo - 0.5, hi + 0.5
+    pad = (hi - lo) * AXIS_MARGIN
+    return lo - pad, hi + pad
+
+
+def bin_codes(values: np.ndarray, limits, n_bins: int = PAIRPLOT_BINS) -> np.ndarray:
+    """Indice de bin de chaque valeur, calculé une seule fois par colonne"""
+    lo, hi = limits
+    idx = ((values - lo) / (hi - lo) * n_bins).astype(np.int64)
+    return np.clip(idx, 0, n_bins - 1)
+
+
+def histogram_2d(codes_x: np.ndarray, codes_y: np.ndarray, n_bins: int = PAIRPLOT_BINS) -> np.ndarray:
+    """Effectifs 2D (lignes = y, colonnes = x) à partir des indices de bins partagés"""
+    return np.bincount(codes_y * n_bins + codes_x, minlength=n_bins * n_bins).reshape(n_bins, n_bins)
+
+
+# =========================================================
+# RASTÉRISATION DES PANNEAUX
+# =========================================================
+
+def rasterize_scatter(x, y, colors, xlim, ylim, pixels, size=10.0, alpha=0.6, dpi=150):
+    """
+    Dessine un nuage de points sans axes sur un canevas Agg de pixels × pixels
+    et retourne l'image RGBA (uint8, première ligne = haut du panneau).
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(pixels / dpi, pixels / dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    fig.patch.set_alpha(0)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_axis_off()
+    ax.set_xlim(*xlim)
+    ax.set_ylim(*ylim)
+    ax.scatter(x, y, c=colors, s=size, alpha=alpha, edgecolors="white", linewidths=0.3)
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba()).copy()
+
+
+def transpose_panel(image: np.ndarray) -> np.ndarray:
+    """Image du panneau symétrique (axes x et y échangés) d'un panneau carré"""
+    return image[::-1, ::-1].transpose(1, 0, 2)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool de processus partagé ; « spawn » évite de forker un serveur multi-threadé"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PAIRPLOT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def render_panels(tasks):
+    """
+    Rastérise une liste de panneaux (kwargs de rasterize_scatter), en parallèle
+    quand plusieurs processus sont configurés ; repli séquentiel en cas d'échec.
+    """
+    if PAIRPLOT_WORKERS > 1 and len(tasks) > 1:
+        try:
+            pool = get_pool()
+            futures = [pool.submit(rasterize_scatter, **task) for task in tasks]
+            return [f.result() for f in futures]
+        except Exception as e:
+            print(f"⚠️ Rendu parallèle du pairplot indisponible ({e}), rendu séquentiel")
+            shutdown_pool()
+    return [rasterize_scatter(**task) for task in tasks]
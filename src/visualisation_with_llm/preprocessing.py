@@ -0,0 +1,169 @@
+# preprocessing.py
+import hashlib
+import json
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+from .config import PREPARED_MAX_BYTES
+
+# Nombre de datasets dont les colonnes nettoyées restent en mémoire
+# (et au plus PREPARED_MAX_BYTES octets de copies nettoyées au total)
+MAX_PREPARED_DATASETS = 4
+NULL_TOKENS = ["", "nan", "None", "NULL", "NaN"]
+# Attribut portant la clé du dataset sur les DataFrames préparés
+DATASET_KEY_ATTR = "dataset_key"
+
+
+# =========================================================
+# EMPREINTE D'UN DATASET
+# =========================================================
+
+_fingerprints = {}
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Empreinte du contenu d'un DataFrame (colonnes, types et valeurs).
+    Calculée une seule fois par objet DataFrame tant qu'il est vivant.
+    """
+    memo = _fingerprints.get(id(df))
+    if memo is not None and memo[0]() is df:
+        return memo[1]
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([str(c) for c in df.columns]).encode("utf-8"))
+    digest.update(json.dumps([str(t) for t in df.dtypes]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    fingerprint = digest.hexdigest()
+
+    key = id(df)
+    _fingerprints[key] = (weakref.ref(df, lambda _: _fingerprints.pop(key, None)), fingerprint)
+    return fingerprint
+
+
+# =========================================================
+# NETTOYAGE D'UNE COLONNE
+# =========================================================
+
+def _is_text(series: pd.Series) -> bool:
+    return series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+
+
+def clean_column(series: pd.Series) -> pd.Series:
+    """
+    Nettoie une colonne :
+    - Strip des strings et valeurs "vides" converties en NA
+    - Conversion numérique si au moins 50% des valeurs sont convertibles
+    Les colonnes déjà numériques (ou dates, catégories) sont retournées sans copie.
+    """
+    if (pd.api.types.is_numeric_dtype(series)
+            or pd.api.types.is_datetime64_any_dtype(series)
+            or isinstance(series.dtype, pd.CategoricalDtype)):
+        return series
+
+    if _is_text(series):
+        series = series.astype(str).str.strip()
+        series = series.replace(NULL_TOKENS, pd.NA)
+
+    try:
+        converted = pd.to_numeric(series, errors='coerce')
+        if len(series) and converted.notna().sum() / len(series) > 0.5:
+            return converted
+    except Exception:
+        pass
+    return series
+
+
+# =========================================================
+# COLONNES NETTOYÉES MÉMOÏSÉES
+# =========================================================
+
+_prepared = OrderedDict()
+# Octets des copies nettoyées de chaque dataset (les colonnes retournées sans copie comptent pour 0)
+_prepared_bytes = {}
+_prepared_lock = threading.Lock()
+
+
+def _column_memo(key: str) -> dict:
+    with _prepared_lock:
+        memo = _prepared.get(key)
+        if memo is None:
+            return {}
+        _prepared.move_to_end(key)
+        return memo
+
+
+def _remember_column(key: str, column, series: pd.Series, nbytes: int):
+    """Mémoïse une colonne nettoyée puis oublie les datasets les moins récents au-delà des limites"""
+    with _prepared_lock:
+        if key not in _prepared:
+            _prepared[key] = {}
+            _prepared_bytes[key] = 0
+        _prepared.move_to_end(key)
+        # Une colonne qui ne tient pas dans le budget n'est pas mémoïsée
+        if _prepared_bytes[key] + nbytes > PREPARED_MAX_BYTES:
+            return
+        _prepared[key][column] = series
+        _prepared_bytes[key] += nbytes
+
+        total = sum(_prepared_bytes.values())
+        for old in list(_prepared):
+            if len(_prepared) <= MAX_PREPARED_DATASETS and total <= PREPARED_MAX_BYTES:
+                break
+            if old != key:
+                total -= _prepared_bytes.pop(old)
+                del _prepared[old]
+
+
+def prepare_columns(df: pd.DataFrame, columns=None, dataset_key: str = None) -> pd.DataFrame:
+    """
+    DataFrame réduit aux colonnes demandées, nettoyées une seule fois par dataset.
+
+    Seules les colonnes utilisées par un graphique sont nettoyées ; le résultat
+    est mémoïsé par empreinte du dataset (ou `dataset_key` si déjà connue),
+    dans la limite de PREPARED_MAX_BYTES octets de copies nettoyées.
+    """
+    columns = list(df.columns) if columns is None else [c for c in dict.fromkeys(columns) if c in df.columns]
+    key = dataset_key or dataset_fingerprint(df)
+    memo = _column_memo(key)
+
+    cleaned = {}
+    for col in columns:
+        series = memo.get(col)
+        if series is None:
+            original = df[col]
+            series = clean_column(original)
+            nbytes = 0 if series is original else int(series.memory_usage(index=False, deep=True))
+            _remember_column(key, col, series, nbytes)
+        cleaned[col] = series
+
+    prepared = pd.DataFrame(cleaned, index=df.index, columns=columns, copy=False)
+    prepared.attrs[DATASET_KEY_ATTR] = key
+    return prepared
+
+
+def same_dataset(key: str, dataset_key: str) -> bool:
+    """Vrai pour la clé du dataset et celles de ses sous-ensembles filtrés ("<clé>:<filtres>")"""
+    return key == dataset_key or (isinstance(key, str) and key.startswith(f"{dataset_key}:"))
+
+
+def frame_key(df: pd.DataFrame) -> str:
+    """Clé du dataset d'un DataFrame préparé (sinon empreinte de son contenu)"""
+    return df.attrs.get(DATASET_KEY_ATTR) or dataset_fingerprint(df)
+
+
+def forget_prepared(dataset_key: str):
+    """Oublie les colonnes nettoyées d'un dataset (et de ses sous-ensembles filtrés)"""
+    with _prepared_lock:
+        for key in [k for k in _prepared if same_dataset(k, dataset_key)]:
+            del _prepared[key]
+            del _prepared_bytes[key]
+
+
+def clear_prepared():
+    with _prepared_lock:
+        _prepared.clear()
+        _prepared_bytes.clear()
@@ -0,0 +1,356 @@
+# profiler.py
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .config import PROFILE_BLOCK_MAX_BYTES
+from .data_loader import DEFAULT_CHUNKSIZE, csv_dtypes, iter_csv_chunks
+from .sketches import (
+    ColumnSketch,
+    DEFAULT_DISTINCT_ERROR,
+    DEFAULT_FREQUENCY_ERROR,
+    DEFAULT_QUANTILE_ERROR,
+)
+
+DEFAULT_QUANTILES = (0.25, 0.5, 0.75)
+DEFAULT_TOP_K = 5
+# Nombre maximal de colonnes numériques traitées ensemble ; le bloc est réduit
+# pour que ses copies float64 (valeurs, copie triée, différences) tiennent
+# dans PROFILE_BLOCK_MAX_BYTES
+NUMERIC_BLOCK_SIZE = 64
+NUMERIC_BLOCK_COPIES = 4
+# Taille des blocs de lignes en mode approché
+APPROX_CHUNK_ROWS = 500_000
+# Nombre de profils de datasets conservés en mémoire
+MAX_CACHED_PROFILES = 4
+
+
+# =========================================================
+# STRUCTURES
+# =========================================================
+
+@dataclass
+class ColumnProfile:
+    """Statistiques d'une colonne"""
+    name: str
+    dtype: str
+    is_numeric: bool
+    count: int
+    nulls: int
+    n_unique: int
+    min: Optional[object] = None
+    max: Optional[object] = None
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    quantiles: Dict[float, float] = field(default_factory=dict)
+    top_values: List[tuple] = field(default_factory=list)
+    # Effectifs de top_values estimés (Count-Min) plutôt que comptés
+    top_values_approximate: bool = False
+
+
+@dataclass
+class DatasetProfile:
+    """Profil complet d'un dataset, une entrée par colonne (ordre conservé)"""
+    n_rows: int
+    n_cols: int
+    columns: List[ColumnProfile]
+    approximate: bool = False
+
+    def __getitem__(self, name):
+        for col in self.columns:
+            if col.name == name:
+                return col
+        raise KeyError(name)
+
+    @property
+    def numeric_columns(self):
+        return [c.name for c in self.columns if c.is_numeric]
+
+    @property
+    def categorical_columns(self):
+        return [c.name for c in self.columns if not c.is_numeric]
+
+
+# =========================================================
+# COLONNES NUMÉRIQUES (PASSES NUMPY PAR BLOCS)
+# =========================================================
+
+def _is_numeric(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def _sorted_quantiles(sorted_block, counts, q):
+    """Quantiles (interpolation linéaire) lus dans des colonnes déjà triées"""
+    pos = (counts - 1).clip(min=0) * q
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, (counts - 1).clip(min=0))
+    cols = np.arange(sorted_block.shape[1])
+    lo_val = sorted_block[lo, cols]
+    hi_val = sorted_block[hi, cols]
+    return lo_val + (hi_val - lo_val) * (pos - lo)
+
+
+def numeric_block_size(n_rows: int, max_bytes: int = PROFILE_BLOCK_MAX_BYTES) -> int:
+    """Nombre de colonnes par bloc pour que les copies float64 du bloc tiennent dans `max_bytes`"""
+    per_column = max(n_rows, 1) * 8 * NUMERIC_BLOCK_COPIES
+    return max(1, min(NUMERIC_BLOCK_SIZE, max_bytes // per_column))
+
+
+def _profile_numeric_block(df, names, quantiles):
+    """Profile un bloc de colonnes numériques en quelques passes vectorisées"""
+    block = df[names].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+    n_rows = block.shape[0]
+
+    # Un seul tri par colonne : min, max, quantiles et cardinalité en découlent
+    sorted_block = np.sort(block, axis=0)
+    valid = ~np.isnan(sorted_block)
+    counts = valid.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sums = np.nansum(block, axis=0)
+        means = sums / counts
+        # Écarts au carré calculés sur place : pas de copie supplémentaire du bloc
+        block -= means
+        np.square(block, out=block)
+        stds = np.sqrt(np.nansum(block, axis=0) / (counts - 1))
+    del block
+
+    if n_rows > 1:
+        changes = (np.diff(sorted_block, axis=0) != 0) & valid[1:]
+        n_unique = np.where(counts > 0, 1 + changes.sum(axis=0), 0)
+    else:
+        n_unique = counts.copy()
+
+    last = (counts - 1).clip(min=0)
+    cols = np.arange(len(names))
+    mins = sorted_block[0, cols] if n_rows else np.full(len(names), np.nan)
+    maxs = sorted_block[last, cols] if n_rows else np.full(len(names), np.nan)
+    q_values = {
+        q: _sorted_quantiles(sorted_block, counts, q) if n_rows else np.full(len(names), np.nan)
+        for q in quantiles
+    }
+
+    profiles = []
+    for i, name in enumerate(names):
+        series = df[name]
+        count = int(counts[i])
+        is_int = pd.api.types.is_integer_dtype(series)
+
+        def _cast(value):
+            if count == 0:
+                return np.nan
+            return int(value) if is_int else float(value)
+
+        profiles.append(ColumnProfile(
+            name=name,
+            dtype=str(series.dtype),
+            is_numeric=True,
+            count=count,
+            nulls=n_rows - count,
+            n_unique=int(n_unique[i]),
+            min=_cast(mins[i]),
+            max=_cast(maxs[i]),
+            mean=float(means[i]) if count else np.nan,
+            std=float(stds[i]) if count > 1 else np.nan,
+            quantiles={q: float(v[i]) if count else np.nan for q, v in q_values.items()},
+        ))
+    return profiles
+
+
+# =========================================================
+# COLONNES CATÉGORIELLES (PASSE DE HACHAGE)
+# =========================================================
+
+def _profile_categorical(series: pd.Series, name, top_k):
+    """Un seul value_counts (table de hachage) donne cardinalité, effectif et top valeurs"""
+    counts = series.value_counts(dropna=True, sort=True)
+    counts = counts[counts > 0]
+    count = int(counts.sum())
+    return ColumnProfile(
+        name=name,
+        dtype=str(series.dtype),
+        is_numeric=False,
+        count=count,
+        nulls=len(series) - count,
+        n_unique=len(counts),
+        top_values=[(value, int(n)) for value, n in counts.head(top_k).items()],
+    )
+
+
+# =========================================================
+# POINT D'ENTRÉE
+# =========================================================
+
+def profile_dataset(df: pd.DataFrame, quantiles=DEFAULT_QUANTILES,
+                    top_k: int = DEFAULT_TOP_K, approximate: bool = False,
+                    **sketch_errors) -> DatasetProfile:
+    """
+    Calcule toutes les statistiques par colonne du dataset.
+
+    Les colonnes numériques sont traitées par blocs NumPy (un tri par bloc),
+    les autres avec un seul value_counts chacune. Avec `approximate=True`,
+    le DataFrame est parcouru par blocs de lignes et résumé par sketches
+    (voir `profile_chunks`).
+    """
+    if approximate:
+        chunks = (df.iloc[i:i + APPROX_CHUNK_ROWS] for i in range(0, len(df), APPROX_CHUNK_ROWS))
+        profile = profile_chunks(chunks, quantiles=quantiles, top_k=top_k, **sketch_errors)
+        if not profile.columns:
+            profile.n_cols = len(df.columns)
+        return profile
+
+    by_name = {}
+
+    numeric = [c for c in df.columns if _is_numeric(df[c])]
+    block_size = numeric_block_size(len(df))
+    for start in range(0, len(numeric), block_size):
+        names = numeric[start:start + block_size]
+        for profile in _profile_numeric_block(df, names, quantiles):
+            by_name[profile.name] = profile
+
+    for col in df.columns:
+        if col not in by_name:
+            by_name[col] = _profile_categorical(df[col], col, top_k)
+
+    return DatasetProfile(
+        n_rows=len(df),
+        n_cols=len(df.columns),
+        columns=[by_name[c] for c in df.columns],
+    )
+
+
+# =========================================================
+# MODE APPROCHÉ (SKETCHES)
+# =========================================================
+
+def _column_from_sketch(sketch: ColumnSketch, quantiles, top_k, is_int) -> ColumnProfile:
+    count = sketch.count
+
+    def _cast(value):
+        if count == 0:
+            return np.nan
+        return int(value) if is_int else float(value)
+
+    profile = ColumnProfile(
+        name=sketch.name,
+        dtype=sketch.dtype,
+        is_numeric=sketch.is_numeric,
+        count=count,
+        nulls=sketch.rows - count,
+        n_unique=min(sketch.distinct.estimate(), count),
+    )
+    if sketch.is_numeric:
+        profile.min = _cast(sketch.min)
+        profile.max = _cast(sketch.max)
+        profile.mean = sketch.mean if count else np.nan
+        profile.std = float(np.sqrt(sketch.m2 / (count - 1))) if count > 1 else np.nan
+        profile.quantiles = sketch.quantiles.quantiles(list(quantiles))
+    else:
+        profile.top_values = sketch.frequencies.top(top_k)
+        profile.top_values_approximate = True
+    return profile
+
+
+class StreamingProfiler:
+    """
+    Profil approché alimenté bloc par bloc avec des sketches fusionnables :
+    mémoire bornée et temps linéaire quelle que soit la taille du dataset.
+
+    Moyenne, écart-type, min et max restent exacts ; cardinalités (HyperLogLog),
+    quantiles (KLL) et valeurs fréquentes (Count-Min) sont approchés avec les
+    erreurs relatives demandées.
+    """
+
+    def __init__(self, quantiles=DEFAULT_QUANTILES, top_k: int = DEFAULT_TOP_K,
+                 distinct_error: float = DEFAULT_DISTINCT_ERROR,
+                 quantile_error: float = DEFAULT_QUANTILE_ERROR,
+                 frequency_error: float = DEFAULT_FREQUENCY_ERROR):
+        self.quantiles = quantiles
+        self.top_k = top_k
+        self.errors = dict(distinct_error=distinct_error, quantile_error=quantile_error,
+                           frequency_error=frequency_error)
+        self.sketches = {}
+        self.is_int = {}
+        self.n_rows = 0
+
+    def update(self, chunk: pd.DataFrame):
+        self.n_rows += len(chunk)
+        for col in chunk.columns:
+            series = chunk[col]
+            if col not in self.sketches:
+                self.sketches[col] = ColumnSketch(col, _is_numeric(series), **self.errors)
+                self.is_int[col] = pd.api.types.is_integer_dtype(series)
+            else:
+                self.is_int[col] = self.is_int[col] and pd.api.types.is_integer_dtype(series)
+            self.sketches[col].update(series)
+
+    def profile(self, df: pd.DataFrame = None) -> DatasetProfile:
+        """
+        Profil des colonnes vues. `df` : DataFrame final, dont les colonnes
+        (ordre, colonnes retirées) et les dtypes remplacent ceux des blocs.
+        """
+        names = list(df.columns) if df is not None else list(self.sketches)
+        columns = []
+        for name in names:
+            if name not in self.sketches:
+                continue
+            column = _column_from_sketch(self.sketches[name], self.quantiles, self.top_k, self.is_int[name])
+            if df is not None:
+                column.dtype = str(df[name].dtype)
+            columns.append(column)
+        return DatasetProfile(
+            n_rows=self.n_rows,
+            n_cols=len(names),
+            columns=columns,
+            approximate=True,
+        )
+
+
+def profile_chunks(chunks, quantiles=DEFAULT_QUANTILES, top_k: int = DEFAULT_TOP_K,
+                   **sketch_errors) -> DatasetProfile:
+    """Profil approché d'une suite de blocs de lignes (voir `StreamingProfiler`)"""
+    profiler = StreamingProfiler(quantiles=quantiles, top_k=top_k, **sketch_errors)
+    for chunk in chunks:
+        profiler.update(chunk)
+    return profiler.profile()
+
+
+def profile_csv(file, chunksize: int = DEFAULT_CHUNKSIZE, quantiles=DEFAULT_QUANTILES,
+                top_k: int = DEFAULT_TOP_K, **sketch_errors) -> DatasetProfile:
+    """
+    Profil approché d'un CSV lu par blocs, sans charger le dataset :
+    mêmes dtypes compacts que `read_csv_streaming`.
+    """
+    dtypes = csv_dtypes(file, chunksize=chunksize)
+    if not dtypes:
+        return DatasetProfile(n_rows=0, n_cols=0, columns=[], approximate=True)
+    return profile_chunks(iter_csv_chunks(file, dtypes, chunksize=chunksize),
+                          quantiles=quantiles, top_k=top_k, **sketch_errors)
+
+
+# =========================================================
+# PROFILS MÉMORISÉS
+# =========================================================
+
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def remember_profile(dataset_key: str, profile: DatasetProfile):
+    """Garde le profil d'un dataset pour réutiliser ses statistiques au rendu"""
+    if not dataset_key:
+        return
+    with _profiles_lock:
+        _profiles[dataset_key] = profile
+        _profiles.move_to_end(dataset_key)
+        while len(_profiles) > MAX_CACHED_PROFILES:
+            _profiles.popitem(last=False)
+
+
+def cached_profile(dataset_key: str) -> Optional[DatasetProfile]:
+    with _profiles_lock:
+        return _profiles.get(dataset_key) if dataset_key else None
@@ -0,0 +1,158 @@
+# render_cache.py
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from .config import RENDER_CACHE_MAX_BYTES, RENDER_DPI, RENDER_MAX_DPI, RENDER_MIN_DPI
+from .preprocessing import DATASET_KEY_ATTR, dataset_fingerprint, prepare_columns
+from .filtering import filter_key, filter_rows
+from .viz_utils import adaptive_dpi, fig_to_bytes, plot, spec_columns
+
+
+# =========================================================
+# CLÉ DE RENDU
+# =========================================================
+
+# Valeurs implicites de plot() : une spec qui les explicite a la même clé
+SPEC_DEFAULTS = {"bins": 20}
+
+
+def canonical_spec(spec: dict) -> str:
+    """Représentation stable d'une spec (ordre des clés, valeurs vides unifiées, défauts explicités)"""
+    def _normalize(value):
+        if isinstance(value, str) and value.strip().lower() in ("", "none", "null"):
+            return None
+        return value
+    spec = {**SPEC_DEFAULTS, **spec} if spec else {}
+    return json.dumps({k: _normalize(v) for k, v in spec.items()}, sort_keys=True, default=str)
+
+
+# =========================================================
+# CACHE LRU BORNÉ EN MÉMOIRE
+# =========================================================
+
+class RenderCache:
+    """Cache LRU d'images rendues, borné par la taille totale des octets stockés"""
+
+    def __init__(self, max_bytes: int = RENDER_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+_render_cache = RenderCache()
+
+
+def get_render_cache() -> RenderCache:
+    return _render_cache
+
+
+# =========================================================
+# RENDU AVEC CACHE
+# =========================================================
+
+def render_key(dataset_key, spec, palette, color, filters=None, dpi=150, fmt="png") -> str:
+    """Clé de rendu : dataset, spec canonique, couleurs, filtres, résolution et format"""
+    filters_key = json.dumps({str(k): filter_key(cond) for k, cond in (filters or {}).items()}, sort_keys=True)
+    payload = "|".join([dataset_key, canonical_spec(spec), str(palette), str(color), filters_key, str(dpi), fmt])
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _resolution(dpi, width):
+    """Résolution demandée : dpi fixe, ou largeur d'affichage en pixels (dpi adaptatif)"""
+    if dpi is None and width:
+        return f"w{int(width)}"
+    return dpi or RENDER_DPI
+
+
+def render_images(df, spec, palette='deep', color='#4F8BF9', filters=None,
+                  outputs=(("png", RENDER_DPI),), dataset_key=None) -> dict:
+    """
+    Rendus d'une spec en octets bruts, servis depuis le cache quand rien de
+    pertinent n'a changé ; la figure n'est construite qu'une fois pour toutes
+    les sorties manquantes.
+
+    Args:
+        df: DataFrame complet (non filtré)
+        filters: dict {colonne: (min, max) ou [catégories]} appliqué avant le rendu
+        outputs: couples (format, résolution) ; format parmi IMAGE_FORMATS,
+            résolution en dpi ou "w<pixels>" pour une largeur d'affichage cible
+        dataset_key: empreinte déjà connue du dataset (ex. hash du fichier uploadé)
+
+    Returns:
+        dict {(format, résolution): octets}
+    """
+    dataset_key = dataset_key or dataset_fingerprint(df)
+    keys = {out: render_key(dataset_key, spec, palette, color, filters, out[1], out[0]) for out in outputs}
+    images = {out: _render_cache.get(key) for out, key in keys.items()}
+    missing = [out for out, data in images.items() if data is None]
+    if not missing:
+        return images
+
+    # Colonnes nettoyées une fois par dataset ; les filtres sont résolus par les
+    # index de colonnes et seules les lignes retenues des colonnes utiles sont copiées
+    columns = spec_columns(df, spec) + list(filters or {})
+    data = prepare_columns(df, columns, dataset_key)
+    rows = filter_rows(data, filters, dataset_key)
+    if rows is not None:
+        data = data.take(rows)
+        # Sous-ensemble filtré : clé distincte pour les caches de calcul
+        data.attrs[DATASET_KEY_ATTR] = f"{dataset_key}:{render_key(dataset_key, {}, '', '', filters, 0)}"
+    # Figure hors pyplot : rendus concurrents possibles sans verrou
+    fig = plot(data, spec, palette=palette, color=color, preprocessed=True)
+    for fmt, resolution in missing:
+        if isinstance(resolution, str):
+            dpi = adaptive_dpi(fig, int(resolution[1:]), RENDER_MIN_DPI, RENDER_MAX_DPI)
+        else:
+            dpi = resolution
+        images[(fmt, resolution)] = fig_to_bytes(fig, fmt=fmt, dpi=dpi)
+    for out in missing:
+        _render_cache.put(keys[out], images[out])
+    return images
+
+
+def render_image(df, spec, palette='deep', color='#4F8BF9', filters=None, fmt="png",
+                 dpi=None, width=None, dataset_key=None) -> bytes:
+    """
+    Rendu d'une spec dans un format (png, svg, webp). Sans `dpi`, la résolution
+    s'adapte à la largeur d'affichage `width` (pixels), sinon RENDER_DPI.
+    """
+    out = (fmt, _resolution(dpi, width))
+    return render_images(df, spec, palette, color, filters, (out,), dataset_key)[out]
+
+
+def render_png(df, spec, palette='deep', color='#4F8BF9', filters=None, dpi=RENDER_DPI, dataset_key=None) -> bytes:
+    """Rendu PNG d'une spec à une résolution fixe (voir render_images)"""
+    return render_image(df, spec, palette, color, filters, "png", dpi, dataset_key=dataset_key)
@@ -0,0 +1,268 @@
+# sketches.py
+# Sketches fusionnables pour profiler de très gros datasets bloc par bloc :
+# - HyperLogLog : nombre de valeurs distinctes
+# - KLL : quantiles
+# - Count-Min : fréquences des valeurs les plus courantes
+import math
+
+import numpy as np
+import pandas as pd
+
+# Erreurs relatives par défaut
+DEFAULT_DISTINCT_ERROR = 0.01
+DEFAULT_QUANTILE_ERROR = 0.01
+DEFAULT_FREQUENCY_ERROR = 0.001
+DEFAULT_FREQUENCY_DELTA = 0.01
+
+
+def hash_values(values) -> np.ndarray:
+    """Hash 64 bits vectorisé (valeurs manquantes exclues par l'appelant)"""
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+# =========================================================
+# HYPERLOGLOG
+# =========================================================
+
+class HyperLogLog:
+    """Estimation du nombre de valeurs distinctes (erreur ≈ 1.04 / sqrt(2^p))"""
+
+    def __init__(self, error: float = DEFAULT_DISTINCT_ERROR):
+        self.p = min(18, max(4, math.ceil(math.log2((1.04 / error) ** 2))))
+        self.m = 1 << self.p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update_hashes(self, hashes: np.ndarray):
+        if len(hashes) == 0:
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest_bits = 64 - self.p
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        # Rang = position du premier bit à 1 dans les bits restants
+        _, exponent = np.frexp(rest.astype(np.float64))
+        rank = np.where(rest == 0, rest_bits + 1, rest_bits - exponent + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def update(self, values):
+        self.update_hashes(hash_values(values))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.p != self.p:
+            raise ValueError("HyperLogLog de précisions différentes")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Correction petites cardinalités (linear counting)
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+
+# =========================================================
+# KLL (QUANTILES)
+# =========================================================
+
+class KLLSketch:
+    """Sketch de quantiles KLL : compacteurs empilés, l'élément du niveau h pèse 2^h"""
+
+    def __init__(self, error: float = DEFAULT_QUANTILE_ERROR, seed: int = 0):
+        self.k = max(8, int(math.ceil(1.7 / error)))
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                items = np.sort(items)
+                # Un élément impair reste sur place, les autres sont compactés de moitié
+                keep = items[:1] if len(items) % 2 else items[:0]
+                items = items[len(keep):]
+                promoted = items[self.rng.integers(0, 2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+        return self
+
+    def quantiles(self, qs) -> dict:
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return {q: np.nan for q in qs}
+        weights = np.concatenate([np.full(len(l), 2 ** h, dtype=np.float64) for h, l in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cum = items[order], np.cumsum(weights[order])
+        targets = np.asarray(qs, dtype=np.float64) * cum[-1]
+        idx = np.minimum(np.searchsorted(cum, targets, side="left"), len(items) - 1)
+        return {q: float(items[i]) for q, i in zip(qs, idx)}
+
+
+# =========================================================
+# COUNT-MIN (VALEURS FRÉQUENTES)
+# =========================================================
+
+class CountMinSketch:
+    """
+    Fréquences approchées (surestimation ≤ error × total avec probabilité 1 - delta),
+    avec une liste bornée de candidats pour retrouver les valeurs les plus fréquentes.
+    """
+
+    def __init__(self, error: float = DEFAULT_FREQUENCY_ERROR,
+                 delta: float = DEFAULT_FREQUENCY_DELTA, max_candidates: int = 100):
+        self.width = int(math.ceil(math.e / error))
+        self.depth = int(math.ceil(math.log(1 / delta)))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.error = error
+        self.max_candidates = max_candidates
+        self.candidates = {}
+        self.total = 0
+
+    def _indexes(self, hashes: np.ndarray):
+        h1 = (hashes & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        h2 = (hashes >> np.uint64(32)).astype(np.int64)
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def _estimate_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        rows = [self.table[i, idx] for i, idx in enumerate(self._indexes(hashes))]
+        return np.min(rows, axis=0)
+
+    def update(self, values):
+        counts = pd.Series(values).value_counts(dropna=True)
+        counts = counts[counts > 0]
+        self.update_counts(counts, hash_values(counts.index.to_numpy()))
+
+    def update_counts(self, counts: pd.Series, hashes: np.ndarray):
+        """Ajoute des effectifs déjà agrégés (index = valeurs) et leurs hash"""
+        if counts.empty:
+            return
+        self.total += int(counts.sum())
+        for i, idx in enumerate(self._indexes(hashes)):
+            self.table[i] += np.bincount(idx, weights=counts.to_numpy(), minlength=self.width).astype(np.int64)
+        for value in counts.index[:self.max_candidates]:
+            self.candidates[value] = None
+        self._prune()
+
+    def _prune(self):
+        if not self.candidates:
+            return
+        values = list(self.candidates)
+        estimates = self._estimate_hashes(hash_values(np.asarray(values, dtype=object)))
+        ranked = sorted(zip(values, estimates), key=lambda item: -item[1])[:self.max_candidates]
+        self.candidates = {value: int(n) for value, n in ranked}
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        if other.table.shape != self.table.shape:
+            raise ValueError("Count-Min de dimensions différentes")
+        self.table += other.table
+        self.total += other.total
+        self.candidates.update(other.candidates)
+        self._prune()
+        return self
+
+    def top(self, k: int):
+        """
+        Les k meilleurs candidats et leur effectif estimé. Les effectifs sont
+        surestimés d'au plus error × total : sous cette marge (valeurs très
+        nombreuses et peu répétées), l'ordre n'est qu'indicatif.
+        """
+        ranked = sorted(self.candidates.items(), key=lambda item: -item[1])
+        return ranked[:k]
+
+
+# =========================================================
+# SKETCH D'UNE COLONNE
+# =========================================================
+
+class ColumnSketch:
+    """Accumule les statistiques approchées d'une colonne, bloc par bloc"""
+
+    def __init__(self, name, is_numeric: bool,
+                 distinct_error: float = DEFAULT_DISTINCT_ERROR,
+                 quantile_error: float = DEFAULT_QUANTILE_ERROR,
+                 frequency_error: float = DEFAULT_FREQUENCY_ERROR):
+        self.name = name
+        self.is_numeric = is_numeric
+        self.dtype = None
+        self.rows = 0
+        self.count = 0
+        self.distinct = HyperLogLog(distinct_error)
+        self.quantiles = KLLSketch(quantile_error) if is_numeric else None
+        self.frequencies = None if is_numeric else CountMinSketch(frequency_error)
+        # Moments (fusion de Chan) pour moyenne et écart-type exacts
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, series: pd.Series):
+        self.dtype = self.dtype or str(series.dtype)
+        self.rows += len(series)
+        series = series.dropna()
+        n = len(series)
+        if n == 0:
+            return
+        self.count += n
+        if self.is_numeric:
+            values = series.to_numpy(dtype=np.float64)
+            # Hachage des valeurs en float64 : 1 (int8), 1 (int16) et 1.0 (float32)
+            # comptent pour une seule valeur d'un bloc à l'autre ; + 0.0 confond -0.0 et 0.0
+            self.distinct.update_hashes(pd.util.hash_array(values + 0.0))
+            self.quantiles.update(values)
+            self._merge_moments(n, float(values.mean()), float(((values - values.mean()) ** 2).sum()),
+                                float(values.min()), float(values.max()))
+        else:
+            # Un seul value_counts : chaque valeur distincte n'est hachée qu'une fois
+            counts = series.value_counts()
+            counts = counts[counts > 0]
+            hashes = hash_values(counts.index.to_numpy())
+            self.distinct.update_hashes(hashes)
+            self.frequencies.update_counts(counts, hashes)
+
+    def _merge_moments(self, n, mean, m2, vmin, vmax):
+        total = self.count
+        previous = total - n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * previous * n / total
+        self.min = min(self.min, vmin)
+        self.max = max(self.max, vmax)
+
+    def merge(self, other: "ColumnSketch") -> "ColumnSketch":
+        self.rows += other.rows
+        self.dtype = self.dtype or other.dtype
+        self.distinct.merge(other.distinct)
+        if other.count == 0:
+            return self
+        self.count += other.count
+        if self.is_numeric:
+            self.quantiles.merge(other.quantiles)
+            self._merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+        else:
+            self.frequencies.merge(other.frequencies)
+        return self
@@ -0,0 +1,49 @@
+# thumbnails.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import RENDER_DISPLAY_FORMAT, RENDER_DISPLAY_WIDTH, RENDER_DPI, THUMBNAIL_DPI, THUMBNAIL_WORKERS
+from .render_cache import render_images
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Threads partagés par toutes les sessions : ils profitent des caches du processus"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix="thumbnail")
+        return _executor
+
+
+# Sorties produites avec la miniature : image affichée et PNG téléchargeable
+THUMBNAIL = ("png", THUMBNAIL_DPI)
+DISPLAY_OUTPUT = (RENDER_DISPLAY_FORMAT, f"w{RENDER_DISPLAY_WIDTH}")
+FULL_OUTPUTS = (DISPLAY_OUTPUT, ("png", RENDER_DPI))
+
+
+def _render(df, spec, palette, color, dataset_key):
+    # La même figure sert aux rendus pleine résolution : la sélection est servie depuis le cache
+    return render_images(df, spec, palette, color, outputs=(THUMBNAIL,) + FULL_OUTPUTS,
+                         dataset_key=dataset_key)[THUMBNAIL]
+
+
+def prerender(df, specs, palette='deep', color='#4F8BF9', dataset_key=None) -> list:
+    """
+    Lance en arrière-plan le rendu des miniatures de toutes les specs,
+    avec leurs versions pleine résolution (non filtrées).
+
+    Returns:
+        Liste de Futures (octets PNG de la miniature), dans l'ordre des specs
+    """
+    executor = get_executor()
+    return [executor.submit(_render, df, spec, palette, color, dataset_key) for spec in specs]
+
+
+def ready_thumbnail(future):
+    """Octets de la miniature si son rendu est terminé et a réussi, sinon None"""
+    if future is None or not future.done() or future.exception() is not None:
+        return None
+    return future.result()
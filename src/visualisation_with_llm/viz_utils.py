@@ -1,10 +1,40 @@
-import matplotlib.pyplot as plt
+import matplotlib
+import matplotlib.dates as mdates
+import matplotlib.font_manager
+import matplotlib.patches
+import matplotlib.ticker
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import seaborn as sns
 import pandas as pd
 from io import BytesIO
 import base64
+import threading
 import numpy as np
 
+from .aggregation import category_codes, density_grid, group_counts, group_stats, line_envelope
+from .config import (
+    AGGREGATION_MIN_ROWS,
+    HEATMAP_ANNOT_MAX_COLUMNS,
+    HEATMAP_MAX_COLUMNS,
+    MAX_CATEGORIES,
+    PAIRPLOT_MAX_COLUMNS,
+    PAIRPLOT_SAMPLE_ROWS,
+    PAIRPLOT_SCATTER_MAX_ROWS,
+)
+from .correlation import cluster_order, correlation_matrix, top_columns
+from .histogram import column_distribution, histogram_counts
+from .pairplot import (
+    PAIRPLOT_BINS,
+    bin_codes,
+    column_limits,
+    histogram_2d,
+    render_panels,
+    stratified_sample,
+    transpose_panel,
+)
+from .preprocessing import clean_column, frame_key, prepare_columns
+
 # =========================================================
 # CONFIGURATION GLOBALE
 # =========================================================
@@ -12,7 +42,7 @@ import numpy as np
 def apply_theme():
     """Applique un thème professionnel et lisible"""
     sns.set_theme(style="whitegrid")
-    plt.rcParams.update({
+    matplotlib.rcParams.update({
         "figure.dpi": 120,
         "figure.facecolor": "white",
         "axes.facecolor": "white",
@@ -33,6 +63,35 @@ def apply_theme():
     })
 
 
+_theme_applied = False
+_theme_lock = threading.Lock()
+
+
+def ensure_theme():
+    """
+    Applique le thème une seule fois par processus (et non à chaque rendu).
+    Les rcParams ne sont ensuite plus que lus : des rendus concurrents
+    (threads) ne modifient aucun état global ; couleurs et palette sont
+    passées explicitement à chaque appel.
+    """
+    global _theme_applied
+    with _theme_lock:
+        if not _theme_applied:
+            apply_theme()
+            _theme_applied = True
+
+
+def new_figure(figsize=(10, 6), nrows=1, ncols=1, **subplot_kw):
+    """
+    Figure et axes créés hors de pyplot, sur un canevas Agg : pas
+    d'enregistrement dans le gestionnaire global de figures, rien à libérer.
+    """
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(nrows, ncols, **subplot_kw)
+    return fig, axes
+
+
 # =========================================================
 # PREPROCESSING
 # =========================================================
@@ -47,29 +106,24 @@ def preprocess_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
     
-    df = df.copy()
-    
     # Supprimer colonnes et lignes complètement vides
     df = df.dropna(axis=1, how="all")
     df = df.dropna(axis=0, how="all")
     
-    # Nettoyer les colonnes string
-    for col in df.select_dtypes(include="object").columns:
-        df[col] = df[col].astype(str).str.strip()
-        df[col] = df[col].replace(["", "nan", "None", "NULL", "NaN"], pd.NA)
-    
-    # Convertir en numérique si possible
-    for col in df.columns:
-        try:
-            # Essayer de convertir en numérique
-            converted = pd.to_numeric(df[col], errors='coerce')
-            # Si au moins 50% des valeurs sont converties avec succès, garder
-            if converted.notna().sum() / len(df) > 0.5:
-                df[col] = converted
-        except Exception:
-            pass
-    
-    return df
+    return pd.DataFrame({col: clean_column(df[col]) for col in df.columns}, index=df.index)
+
+
+def spec_columns(df: pd.DataFrame, spec: dict) -> list:
+    """
+    Colonnes dont un graphique a besoin : x, y et hue, ou toutes les colonnes
+    pour les vues globales (heatmap, pairplot) qui sélectionnent les numériques.
+    """
+    if not isinstance(spec, dict):
+        return []
+    plot_type = str(spec.get("type", "")).lower().strip()
+    if plot_type in ("heatmap", "pairplot"):
+        return list(df.columns)
+    return [c for c in (spec.get("x"), spec.get("y"), spec.get("hue")) if c in df.columns]
 
 
 # =========================================================
@@ -78,85 +132,465 @@ def preprocess_dataframe(df: pd.DataFrame) -> pd.DataFrame:
 
 def empty_plot(message="Aucune donnée valide"):
     """Crée un graphique vide avec un message"""
-    fig, ax = plt.subplots(figsize=(10, 6))
+    ensure_theme()
+    fig, ax = new_figure(figsize=(10, 6))
     ax.text(0.5, 0.5, message, 
             ha="center", va="center", 
             fontsize=14, color="#666",
             bbox=dict(boxstyle='round', facecolor='#f0f0f0', alpha=0.8))
     ax.axis("off")
-    fig.tight_layout()
     return fig
 
 
-def auto_layout_labels(ax, axis='x', max_labels=15):
+# Métriques de texte approchées, en fractions de la taille de police : la mise
+# en page des labels est décidée à partir des chaînes, sans mesurer de texte rendu
+CHAR_WIDTH = 0.62
+LINE_HEIGHT = 1.3
+# Longueur maximale d'un label de graduation (au-delà : tronqué avec « … »)
+MAX_LABEL_CHARS = 30
+# Espace entre l'axe et ses labels (graduation + pad), et marge au bord de la figure (pouces)
+TICK_SPACE = 0.1
+EDGE_MARGIN = 0.15
+
+
+def _font_inches(size):
+    return matplotlib.font_manager.FontProperties(size=size).get_size_in_points() / 72
+
+
+def truncate_labels(labels, max_chars=MAX_LABEL_CHARS) -> np.ndarray:
+    """Labels convertis en chaînes et tronqués en une seule opération vectorisée"""
+    text = np.asarray(labels, dtype=str)
+    if text.size == 0:
+        return text
+    too_long = np.char.str_len(text) > max_chars
+    if too_long.any():
+        text = np.where(too_long, np.char.add(text.astype(f"<U{max_chars - 1}"), "…"), text)
+    return text
+
+
+def label_layout(labels, slot, fontsize, horizontal=False):
     """
-    Ajuste automatiquement la rotation et l'alignement des labels
-    selon leur nombre et longueur
+    Décide en une fois la mise en page de labels d'axe, à partir des chaînes.
+    
+    Args:
+        labels: textes des graduations
+        slot: place disponible par label le long de l'axe (pouces)
+        fontsize: taille de police des labels
+        horizontal: labels toujours horizontaux (axe y)
+    
+    Returns:
+        (textes tronqués, pas d'affichage, rotation, encombrement perpendiculaire à l'axe en pouces)
     """
-    if axis == 'x':
-        labels = [label.get_text() for label in ax.get_xticklabels()]
+    text = truncate_labels(labels)
+    size = _font_inches(fontsize)
+    width = float(np.char.str_len(text).max()) * size * CHAR_WIDTH if text.size else 0.0
+    line = size * LINE_HEIGHT
+    
+    # Encombrement le long de l'axe (footprint) et perpendiculairement (extent)
+    if horizontal:
+        rotation, footprint, extent = 0, line, width
+    elif width <= slot * 0.9:
+        rotation, footprint, extent = 0, width, line
+    elif width <= 12 * size * CHAR_WIDTH:
+        rotation, footprint, extent = 45, line * np.sqrt(2), (width + line) / np.sqrt(2)
     else:
-        labels = [label.get_text() for label in ax.get_yticklabels()]
+        rotation, footprint, extent = 90, line, width
+    
+    step = max(1, int(np.ceil(footprint / max(slot, 1e-6))))
+    return text, step, rotation, extent
+
+
+def tick_labels(axis):
+    """Positions et textes des graduations, lus dans le locator et le formatter de l'axe (sans rendu)"""
+    locs = np.asarray(axis.get_major_locator()(), dtype=np.float64)
+    formatter = axis.get_major_formatter()
+    if isinstance(formatter, matplotlib.ticker.FixedFormatter):
+        n = min(len(locs), len(formatter.seq))
+        return locs[:n], list(formatter.seq[:n])
+    lo, hi = sorted(axis.get_view_interval())
+    tol = (hi - lo) * 1e-9
+    locs = locs[(locs >= lo - tol) & (locs <= hi + tol)]
+    return locs, formatter.format_ticks(locs)
+
+
+def auto_layout_labels(ax, axis='x', max_labels=None):
+    """
+    Choisit rotation, alignement et graduations affichées selon le nombre et
+    la longueur des labels, puis les applique une seule fois.
+    
+    Returns:
+        Encombrement des labels perpendiculairement à l'axe (pouces), graduations comprises
+    """
+    target = ax.xaxis if axis == 'x' else ax.yaxis
+    locs, labels = tick_labels(target)
+    if len(locs) == 0:
+        return TICK_SPACE
+    
+    box = ax.get_position()
+    fig_width, fig_height = ax.figure.get_size_inches()
+    length = box.width * fig_width if axis == 'x' else box.height * fig_height
+    lo, hi = sorted(target.get_view_interval())
+    slot = length * float(np.min(np.diff(locs))) / (hi - lo) if len(locs) > 1 and hi > lo else length
     
-    n_labels = len(labels)
-    max_length = max([len(str(l)) for l in labels]) if labels else 0
+    fontsize = matplotlib.rcParams[f"{axis}tick.labelsize"]
+    text, step, rotation, extent = label_layout(labels, slot, fontsize, horizontal=(axis != 'x'))
+    if max_labels:
+        step = max(step, int(np.ceil(len(locs) / max_labels)))
     
-    # Trop de labels : réduire le nombre
-    if n_labels > max_labels:
-        if axis == 'x':
-            step = n_labels // max_labels + 1
-            ticks = ax.get_xticks()[::step]
-            ax.set_xticks(ticks)
-            labels = [labels[i] for i in range(0, len(labels), step)]
+    if isinstance(target.get_major_formatter(), matplotlib.ticker.FixedFormatter):
+        target.set_ticks(locs[::step], labels=text[::step])
+    elif step > 1:
+        # Formatter conservé (décalage, dates) : seules les graduations sont éclaircies
+        target.set_ticks(locs[::step])
     
-    # Déterminer la rotation selon la longueur et le nombre
     if axis == 'x':
-        if max_length > 15 or n_labels > 10:
-            rotation = 90
-            ha = "center"
-        elif max_length > 8 or n_labels > 5:
-            rotation = 45
-            ha = "right"
-        else:
-            rotation = 0
-            ha = "center"
-        
-        plt.setp(ax.get_xticklabels(), rotation=rotation, ha=ha)
+        ha = "right" if rotation == 45 else "center"
+        for label in target.get_majorticklabels():
+            label.set(rotation=rotation, ha=ha, rotation_mode="anchor" if rotation == 45 else "default")
     else:
-        if max_length > 20:
-            rotation = 0
-            ha = "right"
-        else:
-            rotation = 0
-            ha = "right"
-        
-        plt.setp(ax.get_yticklabels(), rotation=rotation, ha=ha)
+        for label in target.get_majorticklabels():
+            label.set(rotation=0, ha="right")
+    return extent + TICK_SPACE
+
+
+def fit_layout(fig, ax, right=EDGE_MARGIN):
+    """
+    Dispose les labels des deux axes puis fixe les marges à partir de leur
+    encombrement connu : remplace tight_layout, qui dessine la figure pour la mesurer.
+    """
+    bottom = auto_layout_labels(ax, 'x') + EDGE_MARGIN
+    left = auto_layout_labels(ax, 'y') + EDGE_MARGIN
+    top = EDGE_MARGIN
+    
+    label_line = _font_inches(matplotlib.rcParams["axes.labelsize"]) * LINE_HEIGHT
+    if ax.get_xlabel():
+        bottom += label_line
+    if ax.get_ylabel():
+        left += label_line
+    if ax.get_title():
+        top += _font_inches(ax.title.get_fontsize()) * LINE_HEIGHT + 20 / 72
+    
+    width, height = fig.get_size_inches()
+    fig.subplots_adjust(
+        left=min(left / width, 0.45),
+        right=max(1 - right / width, 0.55),
+        bottom=min(bottom / height, 0.45),
+        top=max(1 - top / height, 0.55),
+    )
+
+
+# Formats de sortie supportés et type MIME associé
+IMAGE_FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "webp": "image/webp",
+}
+
+# Tampon d'encodage réutilisé d'un rendu à l'autre (un par thread)
+_buffers = threading.local()
+
+
+def fig_to_bytes(fig, fmt="png", dpi=150):
+    """Encode une figure matplotlib (png, svg, webp) en octets, sans la libérer"""
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"Format non supporté : {fmt} ({', '.join(IMAGE_FORMATS)})")
+    buf = getattr(_buffers, "buf", None)
+    if buf is None:
+        buf = _buffers.buf = BytesIO()
+    buf.seek(0)
+    buf.truncate()
+    fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches='tight', facecolor='white')
+    return buf.getvalue()
+
+
+def fig_to_png(fig, dpi=150):
+    """Convertit une figure matplotlib en octets PNG"""
+    return fig_to_bytes(fig, dpi=dpi)
+
+
+def adaptive_dpi(fig, width_px, min_dpi=60, max_dpi=200):
+    """Résolution donnant une image d'environ `width_px` pixels de large"""
+    return int(max(min_dpi, min(max_dpi, width_px / fig.get_figwidth())))
 
 
 def fig_to_base64(fig):
     """Convertit une figure matplotlib en base64 pour affichage web"""
-    buf = BytesIO()
-    fig.savefig(buf, format="png", dpi=150, bbox_inches='tight', facecolor='white')
-    buf.seek(0)
-    img_base64 = base64.b64encode(buf.read()).decode("utf-8")
-    buf.close()
-    plt.close(fig)
+    img_base64 = base64.b64encode(fig_to_png(fig)).decode("utf-8")
     return f"data:image/png;base64,{img_base64}"
 
 
-def validate_columns(df, columns):
+def validate_columns(df, columns, available_columns=None):
     """Vérifie que les colonnes existent dans le DataFrame"""
     missing = [col for col in columns if col and col not in df.columns]
     if missing:
-        available = ", ".join(df.columns.tolist())
+        available = ", ".join(map(str, available_columns if available_columns is not None else df.columns))
         raise ValueError(f"Colonnes manquantes: {', '.join(missing)}\nDisponibles: {available}")
 
 
+# =========================================================
+# RENDU AGRÉGÉ (GROS VOLUMES)
+# =========================================================
+
+MAX_HUE_GROUPS = 10
+
+
+def should_aggregate(spec, n_rows, *columns):
+    """
+    Mode agrégé si la spec le demande (clé 'aggregate') ou, par défaut,
+    au-delà de AGGREGATION_MIN_ROWS points, pour des colonnes numériques ou dates.
+    """
+    if not all(pd.api.types.is_numeric_dtype(c) or pd.api.types.is_datetime64_any_dtype(c) for c in columns):
+        return False
+    forced = spec.get("aggregate")
+    if forced is not None:
+        return bool(forced)
+    return n_rows >= AGGREGATION_MIN_ROWS
+
+
+def draw_density_scatter(ax, data, x, y, hue=None, palette='deep', color='#4F8BF9'):
+    """Scatter rendu comme une image de densité (une case ≈ un pixel)"""
+    if hue:
+        # Catégories principales, le reste regroupé
+        top = data[hue].value_counts().index[:MAX_HUE_GROUPS]
+        labels = [str(v) for v in top]
+        codes = pd.Categorical(data[hue], categories=top).codes.astype(np.int64)
+        if (codes < 0).any():
+            labels.append("Autres")
+            codes = np.where(codes < 0, len(top), codes)
+        grid, extent = density_grid(data[x], data[y], groups=codes, n_groups=len(labels))
+        colors = np.array(sns.color_palette(palette, len(top)) + [(0.6, 0.6, 0.6)] * (len(labels) - len(top)))
+    else:
+        grid, extent = density_grid(data[x], data[y])
+        colors = np.array([matplotlib.colors.to_rgb(color)])
+        labels = []
+    
+    # Axes de dates : bornes en nanosecondes converties en dates matplotlib
+    extent = list(extent)
+    for axis, column, i in ((ax.xaxis, x, 0), (ax.yaxis, y, 2)):
+        if pd.api.types.is_datetime64_any_dtype(data[column]):
+            bounds = pd.to_datetime(np.array(extent[i:i + 2], dtype=np.int64), unit="ns")
+            extent[i:i + 2] = mdates.date2num(bounds.to_numpy())
+            axis.axis_date()
+    
+    total = grid.sum(axis=0)
+    intensity = np.log1p(total) / np.log1p(max(total.max(), 1))
+    # Chaque case prend la couleur de sa catégorie dominante, d'autant plus opaque que dense
+    rgba = np.zeros(total.shape + (4,))
+    rgba[..., :3] = colors[grid.argmax(axis=0)]
+    rgba[..., 3] = np.where(total > 0, 0.25 + 0.75 * intensity, 0.0)
+    
+    ax.imshow(rgba, origin="lower", extent=extent, aspect="auto", interpolation="nearest")
+    
+    if labels:
+        handles = [matplotlib.patches.Patch(color=colors[i], label=label) for i, label in enumerate(labels)]
+        ax.legend(handles=handles, title=hue, loc='best', frameon=True, shadow=True)
+    ax.text(0.99, 0.01, f"{len(data):,} points agrégés", transform=ax.transAxes,
+            ha="right", va="bottom", fontsize=9, color="#666")
+
+
+def draw_line_envelope(ax, data, x, y, color='#4F8BF9'):
+    """Courbe moyenne par colonne de pixels, avec l'enveloppe min/max"""
+    envelope = line_envelope(data[x], data[y])
+    x_values = envelope["x"]
+    if pd.api.types.is_datetime64_any_dtype(data[x]):
+        x_values = pd.to_datetime(x_values.astype(np.int64), unit="ns")
+    
+    ax.fill_between(x_values, envelope["min"], envelope["max"], color=color, alpha=0.2, linewidth=0)
+    ax.plot(x_values, envelope["mean"], color=color, linewidth=2.5)
+    ax.text(0.99, 0.01, f"{len(data):,} points agrégés", transform=ax.transAxes,
+            ha="right", va="bottom", fontsize=9, color="#666")
+
+
+def draw_category_bars(ax, labels, values, palette='deep'):
+    """Barres à partir de valeurs déjà agrégées (une par catégorie)"""
+    positions = np.arange(len(labels))
+    ax.bar(
+        positions,
+        values,
+        color=sns.color_palette(palette, len(labels)),
+        edgecolor='black',
+        linewidth=1.2,
+        width=0.8
+    )
+    ax.set_xticks(positions)
+    ax.set_xticklabels(labels)
+    ax.set_xlim(-0.5, len(labels) - 0.5)
+
+
+def draw_category_boxes(ax, labels, stats, palette='deep'):
+    """Boîtes à moustaches à partir des statistiques de group_stats"""
+    boxes = [
+        {
+            "label": label,
+            "q1": stats["q1"][i],
+            "med": stats["median"][i],
+            "q3": stats["q3"][i],
+            "whislo": stats["whislo"][i],
+            "whishi": stats["whishi"][i],
+            "fliers": stats["fliers"][i],
+        }
+        for i, label in enumerate(labels)
+    ]
+    artists = ax.bxp(
+        boxes,
+        positions=np.arange(len(labels)),
+        widths=0.8,
+        patch_artist=True,
+        boxprops={"linewidth": 1.5},
+        medianprops={"color": "#333", "linewidth": 1.5},
+        whiskerprops={"linewidth": 1.5},
+        capprops={"linewidth": 1.5},
+        flierprops={"marker": "d", "markersize": 5, "markerfacecolor": "#555", "markeredgecolor": "none"},
+    )
+    for patch, c in zip(artists["boxes"], sns.color_palette(palette, len(labels))):
+        patch.set_facecolor(c)
+    ax.set_xlim(-0.5, len(labels) - 0.5)
+
+
+def draw_heatmap(ax, matrix, annot=False):
+    """
+    Matrice de corrélation en pcolormesh, étiquetée par ses colonnes.
+    Contrairement à sns.heatmap, aucun rendu intermédiaire pour tester le
+    chevauchement des labels : leur mise en page est décidée par fit_layout.
+    """
+    values = matrix.to_numpy(dtype=np.float64)
+    n_rows, n_cols = values.shape
+    edge = dict(edgecolors="white", linewidth=1) if annot else {}
+    mesh = ax.pcolormesh(values, cmap="RdBu_r", vmin=-1, vmax=1, **edge)
+    
+    ax.set_xlim(0, n_cols)
+    ax.set_ylim(n_rows, 0)
+    ax.set_aspect("equal")
+    ax.grid(False)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    ax.tick_params(length=0)
+    ax.set_xticks(np.arange(n_cols) + 0.5, labels=list(matrix.columns))
+    ax.set_yticks(np.arange(n_rows) + 0.5, labels=list(matrix.index))
+    
+    if annot:
+        # Texte sombre sur les cases claires, clair sur les cases foncées (luminance relative)
+        rgb = mesh.cmap(mesh.norm(values))[..., :3]
+        luminance = rgb @ np.array([0.2126, 0.7152, 0.0722])
+        for (i, j), value in np.ndenumerate(values):
+            if np.isfinite(value):
+                ax.text(j + 0.5, i + 0.5, f"{value:.2f}", ha="center", va="center", fontsize=10,
+                        color="#262626" if luminance[i, j] > 0.408 else "white")
+    
+    ax.figure.colorbar(mesh, ax=ax, shrink=0.8, label="Corrélation")
+
+
+# =========================================================
+# PAIRPLOT (ÉCHANTILLONNÉ, PANNEAUX EN PARALLÈLE)
+# =========================================================
+
+PAIRPLOT_DPI = 150
+
+
+def draw_pairplot(data, columns, hue=None, palette='deep', color='#4F8BF9'):
+    """
+    Pairplot sur un échantillon (stratifié par hue) : diagonale en histogrammes
+    à bins partagés, nuages rastérisés en parallèle puis assemblés, ou
+    histogrammes 2D quand l'échantillon dépasse PAIRPLOT_SCATTER_MAX_ROWS sans hue.
+    """
+    k = len(columns)
+    n_total = len(data)
+    
+    groups, labels, colors = None, [], None
+    if hue:
+        codes, labels = category_codes(data[hue], top_n=MAX_HUE_GROUPS)
+        n_top = min(len(labels), MAX_HUE_GROUPS)
+        colors = np.array([(*c, 1.0) for c in sns.color_palette(palette, n_top)]
+                          + [(0.6, 0.6, 0.6, 1.0)] * (len(labels) - n_top))
+    
+    positions = stratified_sample(n_total, PAIRPLOT_SAMPLE_ROWS, codes if hue else None)
+    values = data[columns].to_numpy(dtype=np.float64)[positions]
+    if hue:
+        groups = codes[positions]
+    
+    # Limites et bins calculés une fois par colonne, partagés par tous les panneaux
+    limits = [column_limits(values[:, i]) for i in range(k)]
+    binned = [bin_codes(values[:, i], limits[i]) for i in range(k)]
+    
+    panel_size = max(1.6, min(2.5, 12 / k))
+    pixels = int(panel_size * PAIRPLOT_DPI)
+    density_mode = not hue and len(values) > PAIRPLOT_SCATTER_MAX_ROWS
+    
+    images = {}
+    if not density_mode:
+        rows = stratified_sample(len(values), PAIRPLOT_SCATTER_MAX_ROWS, groups)
+        point_colors = colors[groups[rows]] if hue else color
+        size = 30 if len(rows) <= 1000 else 10
+        # Un seul panneau par paire : le symétrique est l'image transposée
+        pairs = [(i, j) for i in range(k) for j in range(i + 1, k)]
+        tasks = [
+            dict(x=values[rows, j], y=values[rows, i], colors=point_colors,
+                 xlim=limits[j], ylim=limits[i], pixels=pixels, size=size, dpi=PAIRPLOT_DPI)
+            for i, j in pairs
+        ]
+        images = dict(zip(pairs, render_panels(tasks)))
+    
+    cmap = matplotlib.colors.LinearSegmentedColormap.from_list("pair_density", ["#ffffff", color])
+    fig, axes = new_figure(figsize=(panel_size * k, panel_size * k), nrows=k, ncols=k,
+                             sharex='col', sharey='row', squeeze=False)
+    
+    for i in range(k):
+        for j in range(k):
+            ax = axes[i, j]
+            if i == j:
+                # Histogramme remis à l'échelle de l'axe y de la ligne (pas d'axe jumeau)
+                lo, hi = limits[i]
+                edges = np.linspace(lo, hi, PAIRPLOT_BINS + 1)
+                if hue:
+                    counts = np.bincount(groups * PAIRPLOT_BINS + binned[i],
+                                         minlength=len(labels) * PAIRPLOT_BINS).reshape(len(labels), PAIRPLOT_BINS)
+                else:
+                    counts = np.bincount(binned[i], minlength=PAIRPLOT_BINS)[None, :]
+                heights = lo + counts / max(counts.max(), 1) * (hi - lo) * 0.95
+                for g in range(len(heights)):
+                    ax.stairs(heights[g], edges, baseline=lo, fill=True,
+                              color=colors[g] if hue else color, alpha=0.4 if hue else 0.7)
+            elif density_mode:
+                counts = histogram_2d(binned[j], binned[i])
+                ax.imshow(np.ma.masked_equal(np.log1p(counts), 0), origin="lower",
+                          extent=(*limits[j], *limits[i]), aspect="auto", cmap=cmap, interpolation="nearest")
+            else:
+                image = images[(i, j)] if i < j else transpose_panel(images[(j, i)])
+                ax.imshow(image, extent=(*limits[j], *limits[i]), aspect="auto", interpolation="nearest")
+            
+            ax.set_xlim(*limits[j])
+            ax.set_ylim(*limits[i])
+            ax.tick_params(labelsize=8)
+            ax.xaxis.set_major_locator(matplotlib.ticker.MaxNLocator(3))
+            ax.yaxis.set_major_locator(matplotlib.ticker.MaxNLocator(4))
+            if i == k - 1:
+                ax.set_xlabel(columns[j], fontsize=10, fontweight='bold')
+            if j == 0:
+                ax.set_ylabel(columns[i], fontsize=10, fontweight='bold')
+    
+    # Marges fixes : tight_layout sur k² axes coûterait plus que le rendu lui-même
+    fig.subplots_adjust(left=0.08, right=0.98, bottom=0.08, top=0.94, wspace=0.08, hspace=0.08)
+    
+    if hue:
+        handles = [matplotlib.patches.Patch(color=colors[g], label=label) for g, label in enumerate(labels)]
+        fig.legend(handles=handles, title=hue, loc='center left', bbox_to_anchor=(1.0, 0.5),
+                   frameon=True, shadow=True)
+    
+    notes = []
+    if len(values) < n_total:
+        notes.append(f"Échantillon de {len(values):,} lignes sur {n_total:,}")
+    if density_mode:
+        notes.append("Histogrammes 2D" if not notes else "histogrammes 2D")
+    if notes:
+        fig.text(0.99, 0.0, " · ".join(notes), ha="right", va="top", fontsize=9, color="#666")
+    return fig
+
+
 # =========================================================
 # FONCTION PRINCIPALE DE PLOTTING
 # =========================================================
 
-def plot(df, spec, palette='deep', color='#4F8BF9'):
+def plot(df, spec, palette='deep', color='#4F8BF9', preprocessed=False, raise_errors=False):
     """
     Génère un graphique à partir d'une spec et d'un DataFrame
     
@@ -165,21 +599,30 @@ def plot(df, spec, palette='deep', color='#4F8BF9'):
         spec: dict avec clés 'type', 'x', 'y', 'hue', 'title', 'bins'
         palette: Palette seaborn (deep, muted, pastel, colorblind)
         color: Couleur par défaut si pas de hue
+        preprocessed: True si les colonnes sont déjà nettoyées (voir prepare_columns)
+        raise_errors: lève ValueError au lieu de rendre un graphique vide avec le message
     
     Returns:
         Figure matplotlib
     """
-    apply_theme()
+    ensure_theme()
     
-    # Prétraiter le DataFrame
-    df = preprocess_dataframe(df)
+    def empty_plot_or_raise(message):
+        if raise_errors:
+            raise ValueError(message)
+        return empty_plot(message)
     
-    if df.empty:
-        return empty_plot("Le dataset est vide après nettoyage")
+    # Prétraiter uniquement les colonnes utilisées (mémoïsé par dataset)
+    available_columns = list(df.columns)
+    if not preprocessed:
+        df = prepare_columns(df, spec_columns(df, spec))
+    
+    if len(df.index) == 0:
+        return empty_plot_or_raise("Le dataset est vide après nettoyage")
     
     # ===== EXTRACTION DES PARAMÈTRES =====
     if not isinstance(spec, dict):
-        return empty_plot("Spec invalide : doit être un dictionnaire")
+        return empty_plot_or_raise("Spec invalide : doit être un dictionnaire")
     
     plot_type = str(spec.get("type", "")).lower().strip()
     x = spec.get("x")
@@ -206,206 +649,181 @@ def plot(df, spec, palette='deep', color='#4F8BF9'):
         # ===== BAR CHART =====
         if plot_type == "bar":
             if not x:
-                return empty_plot("Bar chart nécessite une colonne x")
-            
-            validate_columns(df, [x] + ([y] if y else []))
+                return empty_plot_or_raise("Bar chart nécessite une colonne x")
             
-            # Déterminer la largeur de la figure selon le nombre de catégories
-            n_categories = df[x].nunique()
-            fig_width = max(10, min(20, n_categories * 0.8))
-            fig, ax = plt.subplots(figsize=(fig_width, 6))
+            validate_columns(df, [x] + ([y] if y else []), available_columns)
             
             if y:
-                # Bar avec agrégation
+                # Bar avec agrégation (moyenne par catégorie)
                 data_clean = df[[x, y]].dropna()
                 if data_clean.empty:
-                    return empty_plot("Aucune donnée valide pour ce bar chart")
+                    return empty_plot_or_raise("Aucune donnée valide pour ce bar chart")
+                if not pd.api.types.is_numeric_dtype(data_clean[y]):
+                    return empty_plot_or_raise(f"La colonne {y} n'est pas numérique")
                 
-                sns.barplot(
-                    data=data_clean,
-                    x=x,
-                    y=y,
-                    palette=palette,
-                    ax=ax,
-                    errorbar=None,
-                    edgecolor='black',
-                    linewidth=1.2
-                )
-                ax.set_ylabel(y, fontweight='bold')
+                labels, stats = group_stats(data_clean[x], data_clean[y], top_n=MAX_CATEGORIES)
+                values = stats["mean"]
+                ylabel = y
             else:
                 # Count plot
-                data_clean = df[[x]].dropna()
+                data_clean = df[x].dropna()
                 if data_clean.empty:
-                    return empty_plot("Aucune donnée valide pour ce count plot")
+                    return empty_plot_or_raise("Aucune donnée valide pour ce count plot")
                 
-                sns.countplot(
-                    data=data_clean,
-                    x=x,
-                    palette=palette,
-                    ax=ax,
-                    edgecolor='black',
-                    linewidth=1.2
-                )
-                ax.set_ylabel("Nombre d'occurrences", fontweight='bold')
+                labels, values = group_counts(data_clean, top_n=MAX_CATEGORIES)
+                ylabel = "Nombre d'occurrences"
+            
+            # Déterminer la largeur de la figure selon le nombre de catégories
+            fig_width = max(10, min(20, len(labels) * 0.8))
+            fig, ax = new_figure(figsize=(fig_width, 6))
+            draw_category_bars(ax, labels, values, palette)
+            ax.set_ylabel(ylabel, fontweight='bold')
             
             ax.set_xlabel(x, fontweight='bold')
-            auto_layout_labels(ax, 'x')
         
         # ===== COUNT PLOT =====
         elif plot_type == "count":
             if not x:
-                return empty_plot("Count plot nécessite une colonne x")
-            
-            validate_columns(df, [x])
+                return empty_plot_or_raise("Count plot nécessite une colonne x")
             
-            n_categories = df[x].nunique()
-            fig_width = max(10, min(20, n_categories * 0.8))
-            fig, ax = plt.subplots(figsize=(fig_width, 6))
+            validate_columns(df, [x], available_columns)
             
-            data_clean = df[[x]].dropna()
+            data_clean = df[x].dropna()
             if data_clean.empty:
-                return empty_plot("Aucune donnée valide")
+                return empty_plot_or_raise("Aucune donnée valide")
             
-            sns.countplot(
-                data=data_clean,
-                x=x,
-                palette=palette,
-                ax=ax,
-                edgecolor='black',
-                linewidth=1.2
-            )
+            labels, counts = group_counts(data_clean, top_n=MAX_CATEGORIES)
+            fig_width = max(10, min(20, len(labels) * 0.8))
+            fig, ax = new_figure(figsize=(fig_width, 6))
+            draw_category_bars(ax, labels, counts, palette)
             ax.set_ylabel("Nombre d'occurrences", fontweight='bold')
             ax.set_xlabel(x, fontweight='bold')
-            auto_layout_labels(ax, 'x')
         
         # ===== SCATTER PLOT =====
         elif plot_type == "scatter":
             if not x or not y:
-                return empty_plot("Scatter plot nécessite x et y")
+                return empty_plot_or_raise("Scatter plot nécessite x et y")
             
-            validate_columns(df, [x, y] + ([hue] if hue else []))
+            validate_columns(df, [x, y] + ([hue] if hue else []), available_columns)
             
             cols_to_check = [x, y] + ([hue] if hue else [])
             data_clean = df[cols_to_check].dropna()
             
             if data_clean.empty:
-                return empty_plot("Aucune donnée valide")
-            
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            sns.scatterplot(
-                data=data_clean,
-                x=x,
-                y=y,
-                hue=hue,
-                palette=palette if hue else None,
-                color=None if hue else color,
-                ax=ax,
-                s=80,
-                alpha=0.7,
-                edgecolor='white',
-                linewidth=0.5
-            )
+                return empty_plot_or_raise("Aucune donnée valide")
+            
+            fig, ax = new_figure(figsize=(10, 6))
+            
+            if should_aggregate(spec, len(data_clean), data_clean[x], data_clean[y]):
+                draw_density_scatter(ax, data_clean, x, y, hue=hue, palette=palette, color=color)
+            else:
+                sns.scatterplot(
+                    data=data_clean,
+                    x=x,
+                    y=y,
+                    hue=hue,
+                    palette=palette if hue else None,
+                    color=None if hue else color,
+                    ax=ax,
+                    s=80,
+                    alpha=0.7,
+                    edgecolor='white',
+                    linewidth=0.5
+                )
+                
+                if hue:
+                    ax.legend(title=hue, loc='best', frameon=True, shadow=True)
             
             ax.set_xlabel(x, fontweight='bold')
             ax.set_ylabel(y, fontweight='bold')
-            
-            if hue:
-                ax.legend(title=hue, loc='best', frameon=True, shadow=True)
         
         # ===== LINE PLOT =====
         elif plot_type == "line":
             if not x or not y:
-                return empty_plot("Line plot nécessite x et y")
+                return empty_plot_or_raise("Line plot nécessite x et y")
             
-            validate_columns(df, [x, y])
+            validate_columns(df, [x, y], available_columns)
             
             data_clean = df[[x, y]].dropna()
             if data_clean.empty:
-                return empty_plot("Aucune donnée valide")
-            
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            sns.lineplot(
-                data=data_clean,
-                x=x,
-                y=y,
-                ax=ax,
-                linewidth=2.5,
-                marker='o',
-                markersize=6,
-                color=color
-            )
+                return empty_plot_or_raise("Aucune donnée valide")
+            
+            fig, ax = new_figure(figsize=(12, 6))
+            
+            if should_aggregate(spec, len(data_clean), data_clean[x], data_clean[y]):
+                draw_line_envelope(ax, data_clean, x, y, color=color)
+            else:
+                sns.lineplot(
+                    data=data_clean,
+                    x=x,
+                    y=y,
+                    ax=ax,
+                    linewidth=2.5,
+                    marker='o',
+                    markersize=6,
+                    color=color
+                )
             
             ax.set_xlabel(x, fontweight='bold')
             ax.set_ylabel(y, fontweight='bold')
-            auto_layout_labels(ax, 'x')
         
         # ===== BOX PLOT =====
         elif plot_type == "boxplot":
             if not x or not y:
-                return empty_plot("Boxplot nécessite x et y")
+                return empty_plot_or_raise("Boxplot nécessite x et y")
             
-            validate_columns(df, [x, y])
+            validate_columns(df, [x, y], available_columns)
             
             data_clean = df[[x, y]].dropna()
             if data_clean.empty:
-                return empty_plot("Aucune donnée valide")
-            
-            n_categories = data_clean[x].nunique()
-            fig_width = max(10, min(20, n_categories * 1.2))
-            fig, ax = plt.subplots(figsize=(fig_width, 6))
-            
-            sns.boxplot(
-                data=data_clean,
-                x=x,
-                y=y,
-                palette=palette,
-                ax=ax,
-                linewidth=1.5,
-                fliersize=5
-            )
+                return empty_plot_or_raise("Aucune donnée valide")
+            
+            if not pd.api.types.is_numeric_dtype(data_clean[y]):
+                return empty_plot_or_raise(f"La colonne {y} n'est pas numérique")
+            
+            labels, stats = group_stats(data_clean[x], data_clean[y], top_n=MAX_CATEGORIES)
+            fig_width = max(10, min(20, len(labels) * 1.2))
+            fig, ax = new_figure(figsize=(fig_width, 6))
+            draw_category_boxes(ax, labels, stats, palette)
             
             ax.set_xlabel(x, fontweight='bold')
             ax.set_ylabel(y, fontweight='bold')
-            auto_layout_labels(ax, 'x')
         
         # ===== HISTOGRAM =====
         elif plot_type == "histogram":
             if not x:
-                return empty_plot("Histogram nécessite une colonne x")
+                return empty_plot_or_raise("Histogram nécessite une colonne x")
             
-            validate_columns(df, [x])
+            validate_columns(df, [x], available_columns)
             
-            data_clean = df[x].dropna()
-            if data_clean.empty:
-                return empty_plot("Aucune donnée valide")
+            # Conversion numérique, tri, statistiques et KDE mis en cache par colonne :
+            # changer `bins` ne fait que rebinner
+            distribution = column_distribution(df[x], dataset_key=frame_key(df))
+            if distribution.count == 0:
+                return empty_plot_or_raise("Aucune valeur numérique valide")
             
-            # S'assurer que c'est numérique
-            try:
-                data_clean = pd.to_numeric(data_clean, errors='coerce').dropna()
-            except:
-                return empty_plot(f"La colonne {x} n'est pas numérique")
+            counts, edges = histogram_counts(distribution, bins)
             
-            if data_clean.empty:
-                return empty_plot("Aucune valeur numérique valide")
+            fig, ax = new_figure(figsize=(10, 6))
             
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            sns.histplot(
-                data_clean,
-                kde=True,
-                bins=bins,
+            ax.bar(
+                edges[:-1],
+                counts,
+                width=np.diff(edges),
+                align='edge',
                 color=color,
-                ax=ax,
                 edgecolor='black',
                 linewidth=1.2,
                 alpha=0.7
             )
+            if len(distribution.kde_x):
+                # Densité ramenée à l'échelle des effectifs
+                scale = distribution.count * (edges[1] - edges[0])
+                ax.plot(distribution.kde_x, distribution.kde_density * scale, color=color, linewidth=2)
             
             # Ajouter stats
-            mean_val = data_clean.mean()
-            median_val = data_clean.median()
+            mean_val = distribution.mean
+            median_val = distribution.median
             ax.axvline(mean_val, color='red', linestyle='--', linewidth=2, label=f'Moyenne: {mean_val:.2f}')
             ax.axvline(median_val, color='blue', linestyle='--', linewidth=2, label=f'Médiane: {median_val:.2f}')
             ax.legend(loc='best', frameon=True, shadow=True)
@@ -418,76 +836,70 @@ def plot(df, spec, palette='deep', color='#4F8BF9'):
             numeric_df = df.select_dtypes(include="number")
             
             if numeric_df.shape[1] < 2:
-                return empty_plot("Heatmap nécessite au moins 2 colonnes numériques")
+                return empty_plot_or_raise("Heatmap nécessite au moins 2 colonnes numériques")
             
-            corr = numeric_df.corr()
+            # Corrélations float32 (échantillonnées si besoin), mises en cache par dataset
+            result = correlation_matrix(numeric_df, dataset_key=frame_key(df))
+            corr = cluster_order(top_columns(result.matrix, HEATMAP_MAX_COLUMNS))
             
             n_cols = len(corr.columns)
             fig_size = max(8, min(16, n_cols * 0.8))
-            fig, ax = plt.subplots(figsize=(fig_size, fig_size))
-            
-            sns.heatmap(
-                corr,
-                annot=True,
-                fmt=".2f",
-                cmap='RdBu_r',
-                center=0,
-                vmin=-1,
-                vmax=1,
-                square=True,
-                linewidths=1,
-                linecolor='white',
-                cbar_kws={"shrink": 0.8, "label": "Corrélation"},
-                ax=ax
-            )
+            fig, ax = new_figure(figsize=(fig_size, fig_size))
             
-            ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
-            auto_layout_labels(ax, 'x')
-            auto_layout_labels(ax, 'y')
+            # Annotations seulement si elles restent lisibles
+            annot = n_cols <= HEATMAP_ANNOT_MAX_COLUMNS
+            draw_heatmap(ax, corr, annot=annot)
+            
+            notes = []
+            if result.sampled:
+                notes.append(f"échantillon de {result.n_rows:,} lignes (±{result.ci_halfwidth:.3f} à 95%)")
+            if n_cols < len(result.matrix.columns):
+                notes.append(f"{n_cols} colonnes les plus corrélées sur {len(result.matrix.columns)}")
+            if notes:
+                ax.text(0.5, 1.005, " • ".join(notes), transform=ax.transAxes,
+                        ha="center", va="bottom", fontsize=9, color="#666")
             
-            fig.tight_layout()
+            ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+            # Marge droite : barre de couleur, ses graduations et son label
+            fit_layout(fig, ax, right=1.0)
             return fig
         
         # ===== PAIRPLOT =====
         elif plot_type == "pairplot":
-            numeric_cols = df.select_dtypes(include="number").columns
+            numeric_cols = [c for c in df.select_dtypes(include="number").columns if c != hue]
             
             if len(numeric_cols) < 2:
-                return empty_plot("Pairplot nécessite au moins 2 colonnes numériques")
+                return empty_plot_or_raise("Pairplot nécessite au moins 2 colonnes numériques")
             
-            # Limiter à 5 colonnes max pour la lisibilité
-            if len(numeric_cols) > 5:
-                numeric_cols = numeric_cols[:5]
-                print(f"⚠️ Pairplot limité aux 5 premières colonnes numériques")
+            # Le coût est borné par l'échantillonnage, pas par le nombre de colonnes
+            if len(numeric_cols) > PAIRPLOT_MAX_COLUMNS:
+                numeric_cols = numeric_cols[:PAIRPLOT_MAX_COLUMNS]
+                print(f"⚠️ Pairplot limité aux {PAIRPLOT_MAX_COLUMNS} premières colonnes numériques")
             
-            data_clean = df[numeric_cols].dropna()
+            data_clean = df[numeric_cols + ([hue] if hue else [])].dropna()
             
             if data_clean.empty:
-                return empty_plot("Aucune donnée valide")
+                return empty_plot_or_raise("Aucune donnée valide")
             
-            g = sns.pairplot(
-                data_clean,
-                diag_kind='kde',
-                plot_kws={'alpha': 0.6, 's': 30},
-                diag_kws={'linewidth': 2}
-            )
+            fig = draw_pairplot(data_clean, numeric_cols, hue=hue, palette=palette, color=color)
             
-            g.fig.suptitle(title, y=1.02, fontsize=16, fontweight='bold')
-            g.fig.tight_layout()
-            return g.fig
+            fig.suptitle(title, y=1.0, fontsize=16, fontweight='bold')
+            return fig
         
         else:
-            return empty_plot(f"Type de plot '{plot_type}' non reconnu")
+            return empty_plot_or_raise(f"Type de plot '{plot_type}' non reconnu")
         
         # Ajouter le titre (sauf pour pairplot et heatmap qui l'ont déjà)
         if plot_type not in ["pairplot", "heatmap"]:
             ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
         
-        fig.tight_layout()
+        fit_layout(fig, ax)
         return fig
     
     except Exception as e:
+        if raise_errors:
+            raise
         print(f" Erreur génération graphique: {e}")
         import traceback
         traceback.print_exc()
-        return empty_plot(f"Erreur: {str(e)}")
\ No newline at end of file
+        return empty_plot_or_raise(f"Erreur: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from src.visualisation_with_llm.aggregation import (
+    OTHERS_LABEL, category_codes, density_grid, group_counts, group_stats, line_envelope,
+)
+
+
+def _data(n=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    # Catégories de fréquences très différentes : les rares finissent dans "Autres"
+    weights = np.arange(12, 0, -1) ** 2
+    x = pd.Series(rng.choice([f"c{i}" for i in range(12)], n, p=weights / weights.sum()))
+    y = rng.normal(size=n) * 10 + x.str[1:].astype(int).to_numpy()
+    return x, y
+
+
+def test_group_counts_match_value_counts():
+    x, _ = _data()
+    labels, counts = group_counts(x)
+    assert dict(zip(labels, counts)) == x.value_counts().to_dict()
+    assert labels == list(pd.unique(x))
+
+
+def test_top_categories_and_others_total():
+    x, _ = _data()
+    labels, counts = group_counts(x, top_n=5)
+    expected = x.value_counts()
+    top = expected.index[:5]
+    assert labels[-1] == OTHERS_LABEL and set(labels[:-1]) == set(top)
+    # Ordre d'apparition conservé pour les catégories gardées
+    assert labels[:-1] == [v for v in pd.unique(x) if v in set(top)]
+    assert dict(zip(labels[:-1], counts[:-1])) == expected[top].to_dict()
+    assert counts[-1] == expected.iloc[5:].sum()
+    assert counts.sum() == len(x)
+
+
+def test_numeric_categories_are_sorted():
+    codes, labels = category_codes(pd.Series([3, 1, 2, 1, 3]))
+    assert labels == ["1", "2", "3"]
+    np.testing.assert_array_equal(codes, [2, 0, 1, 0, 2])
+
+
+def test_group_stats_match_pandas():
+    x, y = _data()
+    labels, stats = group_stats(x, y, top_n=5)
+    kept = set(labels[:-1])
+    groups = pd.Series(y).groupby(np.where(x.isin(kept), x, OTHERS_LABEL))
+    expected = pd.DataFrame({
+        "count": groups.size(),
+        "mean": groups.mean(),
+        "q1": groups.quantile(0.25),
+        "median": groups.median(),
+        "q3": groups.quantile(0.75),
+    }).loc[labels]
+    for name in expected.columns:
+        np.testing.assert_allclose(stats[name], expected[name].to_numpy(), rtol=1e-12, err_msg=name)
+
+    for label, lo, hi, fliers in zip(labels, stats["whislo"], stats["whishi"], stats["fliers"]):
+        values = groups.get_group(label)
+        q1, q3 = values.quantile([0.25, 0.75])
+        inside = values[(values >= q1 - 1.5 * (q3 - q1)) & (values <= q3 + 1.5 * (q3 - q1))]
+        assert (lo, hi) == (inside.min(), inside.max())
+        assert len(fliers) == len(values) - len(inside)
+
+
+def test_outliers_are_sampled_with_extremes():
+    y = np.concatenate([np.zeros(1_000), np.arange(1, 201) * 1_000.0, -np.arange(1, 101) * 1_000.0])
+    _, stats = group_stats(np.zeros(len(y)), y, max_outliers=20)
+    fliers = stats["fliers"][0]
+    assert len(fliers) == 20
+    assert fliers.min() == -100_000 and fliers.max() == 200_000
+
+
+def test_density_grid_counts_every_point():
+    rng = np.random.default_rng(0)
+    x, y = rng.normal(size=10_000), rng.normal(size=10_000)
+    grid, extent = density_grid(x, y, width=40, height=30)
+    assert grid.shape == (1, 30, 40) and grid.sum() == len(x)
+    assert extent == (x.min(), x.max(), y.min(), y.max())
+    expected, _, _ = np.histogram2d(y, x, bins=(30, 40), range=[extent[2:], extent[:2]])
+    # Mêmes cases que np.histogram2d, aux erreurs d'arrondi près sur les bords
+    assert np.abs(grid[0] - expected).sum() <= 0.001 * len(x)
+
+
+def test_line_envelope_bounds():
+    x = np.arange(1_000.0)
+    y = np.sin(x)
+    envelope = line_envelope(x, y, n_bins=10)
+    bins = pd.Series(y).groupby(x // 100)
+    np.testing.assert_allclose(envelope["mean"], bins.mean())
+    np.testing.assert_array_equal(envelope["min"], bins.min())
+    np.testing.assert_array_equal(envelope["max"], bins.max())
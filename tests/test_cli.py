@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.visualisation_with_llm import dataset_cache  # noqa: E402
+from src.visualisation_with_llm.cli import check_specs, main  # noqa: E402
+
+COLUMNS = {"prix": True, "age": True, "region": False}
+
+
+def _run(tmp_path, monkeypatch, specs):
+    monkeypatch.setattr(dataset_cache, "DATASET_CACHE_DIR", str(tmp_path / "cache"))
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        "prix": rng.normal(size=500),
+        "age": rng.integers(18, 80, 500),
+        "region": rng.choice(["nord", "sud"], 500),
+        # Renseignées sur des lignes disjointes
+        "matin": [1.0] * 250 + [np.nan] * 250,
+        "soir": [np.nan] * 250 + [2.0] * 250,
+    }).to_csv(tmp_path / "data.csv", index=False)
+    (tmp_path / "specs.json").write_text(json.dumps(specs), encoding="utf-8")
+    output = tmp_path / "out"
+    code = main([str(tmp_path / "data.csv"), "--specs", str(tmp_path / "specs.json"),
+                 "-o", str(output), "--workers", "1"])
+    return code, sorted(p.name for p in output.glob("*")) if output.exists() else []
+
+
+def test_check_specs_keeps_extra_keys_and_reports_errors():
+    valid, rejected = check_specs([
+        {"Type": "histogram", "x": "PRIX", "bins": 30},
+        {"type": "scatter", "x": "prix", "y": "poids"},
+    ], COLUMNS)
+    assert [(idx, spec["x"], spec["bins"]) for idx, spec in valid] == [(0, "prix", 30)]
+    assert rejected == [(1, ["colonne y='poids' inexistante"])]
+
+
+def test_valid_specs_are_rendered(tmp_path, monkeypatch, capsys):
+    code, files = _run(tmp_path, monkeypatch, [
+        {"type": "scatter", "x": "prix", "y": "age", "title": "Prix"},
+        {"type": "bar", "x": "region", "y": "prix", "title": "Région"},
+    ])
+    assert code == 0
+    assert files == ["001_Prix.png", "002_Région.png"]
+
+
+def test_invalid_spec_fails_without_stopping_the_others(tmp_path, monkeypatch, capsys):
+    code, files = _run(tmp_path, monkeypatch, [
+        {"type": "scatter", "x": "prix", "y": "poids", "title": "Inconnue"},
+        {"type": "histogram", "x": "age", "title": "Age"},
+    ])
+    out = capsys.readouterr().out
+    assert code == 1
+    assert files == ["002_Age.png"]
+    assert "❌ Spec 1 : spec invalide : colonne y='poids' inexistante" in out
+    assert "1/2 graphique(s)" in out
+
+
+def test_empty_chart_is_a_failure(tmp_path, monkeypatch, capsys):
+    # Aucune ligne où les deux colonnes sont renseignées
+    code, files = _run(tmp_path, monkeypatch, [{"type": "scatter", "x": "matin", "y": "soir", "title": "Vide"}])
+    assert code == 1
+    assert files == []
+    assert "❌ Spec 1" in capsys.readouterr().out
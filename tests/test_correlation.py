@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from src.visualisation_with_llm.correlation import correlation_matrix
+
+
+def _frame(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    # Timestamps epoch : grand décalage, faible variance relative
+    t = 1.7e9 + np.arange(n) * 60.0
+    y = rng.normal(size=n)
+    return pd.DataFrame({
+        "t": t,
+        "x": t * 0.5 + rng.normal(0, 2e4, n),
+        "y": y,
+        "w": 2 * y + rng.normal(size=n) * 0.1,
+        "c": np.ones(n),
+    })
+
+
+def test_matches_pandas_with_large_offsets():
+    df = _frame()
+    result = correlation_matrix(df, sample_rows=None)
+    np.testing.assert_allclose(result.matrix.to_numpy(), df.corr().to_numpy(), atol=1e-5)
+
+
+def test_missing_values_use_pairwise_complete_rows():
+    df = _frame()
+    rng = np.random.default_rng(1)
+    df.loc[rng.random(len(df)) < 0.3, "x"] = np.nan
+    df.loc[df["y"] > 1, "w"] = np.nan
+    result = correlation_matrix(df, sample_rows=None)
+    np.testing.assert_allclose(result.matrix.to_numpy(), df.corr().to_numpy(), atol=1e-5)
+
+
+def test_identical_columns_with_missing_values():
+    a = np.arange(1000, dtype=float)
+    b = a.copy()
+    b[a > 700] = np.nan
+    result = correlation_matrix(pd.DataFrame({"a": a, "b": b}), sample_rows=None)
+    assert abs(result.matrix.loc["a", "b"] - 1.0) < 1e-6
+
+
+def test_constant_column_is_undefined():
+    result = correlation_matrix(_frame(), sample_rows=None)
+    assert result.matrix["c"].isna().all()
+    assert result.matrix.loc["y", "y"] == 1.0
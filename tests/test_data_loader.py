@@ -0,0 +1,53 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from src.visualisation_with_llm.data_loader import read_csv_streaming
+
+N = 20_000
+
+
+def _csv():
+    rows = zip(
+        [str(i) for i in range(N)] + ["ABC-12", "XYZ"],
+        ["1.5"] * (N + 1) + ["123461.789"],
+        [str(i) for i in range(N)] + ["", str(2 ** 24 + 1)],
+        [str(i % 5) for i in range(N + 2)],
+        [f"x{i % 3}" for i in range(N + 2)],
+    )
+    return "code,prix,compte,niveau,groupe\n" + "\n".join(",".join(r) for r in rows) + "\n"
+
+
+def _read(sample_rows):
+    return read_csv_streaming(io.StringIO(_csv()), chunksize=5_000, sample_rows=sample_rows)
+
+
+def test_text_after_the_sample_is_kept():
+    df = _read(10_000)
+    assert df["code"].iloc[-2:].tolist() == ["ABC-12", "XYZ"]
+    assert df["code"].iloc[0] == "0"
+
+
+def test_values_are_exact():
+    df = _read(10_000)
+    assert df["prix"].dtype == np.float64
+    assert df["prix"].iloc[-1] == 123461.789
+    assert str(df["compte"].dtype) == "Int32"
+    assert pd.isna(df["compte"].iloc[-2])
+    assert df["compte"].iloc[-1] == 2 ** 24 + 1
+
+
+def test_compact_types():
+    df = _read(10_000)
+    assert df["niveau"].dtype == np.int8
+    assert isinstance(df["groupe"].dtype, pd.CategoricalDtype)
+    assert list(df["groupe"].cat.categories) == ["x0", "x1", "x2"]
+    assert len(df) == N + 2
+
+
+def test_same_types_when_the_sample_covers_the_file():
+    chunked = _read(10_000)
+    whole = _read(100_000)
+    assert whole.dtypes.astype(str).to_dict() == chunked.dtypes.astype(str).to_dict()
+    pd.testing.assert_frame_equal(whole, chunked)
@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.visualisation_with_llm.dataset_cache import (  # noqa: E402
+    cache_path, evict, load_dataset_cached, open_cached_table, pin, pinned_keys, read_cached,
+    store_cached, unpin, write_cached,
+)
+
+
+def _frame(n=10_000):
+    return pd.DataFrame({"a": np.arange(n, dtype=np.int64), "b": np.random.default_rng(0).random(n)})
+
+
+def _write(key, cache_dir, age):
+    """Fichier en cache dont la date d'accès remonte à `age` secondes"""
+    path = write_cached(key, _frame(), cache_dir)
+    os.utime(path, (path.stat().st_atime, path.stat().st_mtime - age))
+    return path
+
+
+def _keys(cache_dir):
+    return sorted(p.stem for p in cache_dir.glob("*.arrow"))
+
+
+def test_round_trip(tmp_path):
+    df = _frame()
+    write_cached("k", df, tmp_path)
+    pd.testing.assert_frame_equal(read_cached("k", tmp_path), df)
+    assert read_cached("absent", tmp_path) is None
+
+
+def test_unreadable_file_is_dropped(tmp_path):
+    cache_path("k", tmp_path).write_bytes(b"pas un fichier arrow")
+    assert open_cached_table("k", tmp_path) is None
+    assert not cache_path("k", tmp_path).exists()
+
+
+def test_evict_least_recently_used_first(tmp_path):
+    for age, key in ((300, "old"), (200, "middle"), (100, "recent")):
+        size = _write(key, tmp_path, age).stat().st_size
+    evict(2 * size, tmp_path)
+    assert _keys(tmp_path) == ["middle", "recent"]
+
+
+def test_evict_skips_protected_and_pinned_keys(tmp_path):
+    for age, key in ((300, "old"), (200, "middle"), (100, "recent")):
+        size = _write(key, tmp_path, age).stat().st_size
+    pin("old", tmp_path)
+    evict(size, tmp_path, protected={"middle"})
+    assert _keys(tmp_path) == ["middle", "old"]
+    unpin("old", tmp_path)
+    assert pinned_keys(tmp_path) == set()
+
+
+def test_stale_pin_markers_are_removed(tmp_path):
+    # pid d'un processus terminé
+    pid = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                         capture_output=True, text=True, check=True).stdout.strip()
+    marker = tmp_path / f"k.{pid}.pin"
+    marker.touch()
+    pin("live", tmp_path)
+    assert pinned_keys(tmp_path) == {"live"}
+    assert not marker.exists()
+
+
+def test_store_cached_keeps_the_new_file(tmp_path):
+    size = _write("old", tmp_path, 100).stat().st_size
+    assert store_cached("new", _frame(), tmp_path, max_bytes=size)
+    assert _keys(tmp_path) == ["new"]
+
+
+def test_store_cached_skips_files_larger_than_the_budget(tmp_path):
+    assert not store_cached("big", _frame(), tmp_path, max_bytes=1_000)
+    assert _keys(tmp_path) == []
+
+
+def test_load_dataset_cached_parses_once(tmp_path, monkeypatch):
+    from src.visualisation_with_llm import dataset_cache
+
+    calls = []
+    load = dataset_cache.load_dataset
+    monkeypatch.setattr(dataset_cache, "load_dataset", lambda *a, **k: calls.append(1) or load(*a, **k))
+    csv = tmp_path / "data.csv"
+    _frame(1_000).to_csv(csv, index=False)
+    cache_dir = tmp_path / "cache"
+
+    first = load_dataset_cached(str(csv), cache_dir=cache_dir)
+    second = load_dataset_cached(str(csv), cache_dir=cache_dir)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    assert len(_keys(cache_dir)) == 1
@@ -0,0 +1,117 @@
+import gc
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.visualisation_with_llm import dataset_store  # noqa: E402
+from src.visualisation_with_llm.dataset_cache import cache_path, pinned_keys  # noqa: E402
+from src.visualisation_with_llm.dataset_store import DatasetStore  # noqa: E402
+
+N = 10_000
+
+
+def _frame(seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"a": rng.random(N), "b": rng.integers(0, 100, N)})
+
+
+def _store(tmp_path, datasets=1.5):
+    """Store dont le budget tient `datasets` DataFrames"""
+    nbytes = int(_frame().memory_usage(index=True, deep=True).sum())
+    return DatasetStore(max_bytes=int(nbytes * datasets), cache_dir=tmp_path, cache_max_bytes=10 ** 9)
+
+
+def _state(store, key):
+    entry = next(e for e in store.usage()["entries"] if e["key"] == key)
+    return entry["resident"], entry["refs"], entry["pinned"]
+
+
+def test_open_loads_each_content_once(tmp_path):
+    csv = tmp_path / "data.csv"
+    _frame().to_csv(csv, index=False)
+    store = _store(tmp_path)
+    first = store.open(str(csv))
+    second = store.open(str(csv))
+    assert (store.loads, store.hits) == (1, 1)
+    assert first.df is second.df
+    assert store.usage()["handles"] == 2
+
+
+def test_handles_release_on_finalize(tmp_path):
+    store = _store(tmp_path)
+    handle = store.put("k", _frame())
+    other = store.acquire("k")
+    other.release()
+    assert other.released and _state(store, "k") == (True, 1, False)
+    del handle
+    gc.collect()
+    assert _state(store, "k") == (True, 0, False)
+    assert store.acquire("absent") is None
+
+
+def test_referenced_dataset_is_spilled_pinned_and_reloaded(tmp_path):
+    store = _store(tmp_path)
+    first = store.put("first", _frame(0))
+    second = store.put("second", _frame(1))
+    # Le plus ancien, encore référencé, est déchargé vers un fichier épinglé
+    assert _state(store, "first") == (False, 1, True)
+    assert _state(store, "second") == (True, 1, False)
+    assert cache_path("first", tmp_path).exists()
+    assert pinned_keys(tmp_path) == {"first"}
+
+    pd.testing.assert_frame_equal(first.df, _frame(0))
+    # Rechargé (et désépinglé) ; l'autre dataset est déchargé à son tour
+    assert _state(store, "first") == (True, 1, False)
+    assert _state(store, "second") == (False, 1, True)
+    assert store.usage()["resident_bytes"] <= store.max_bytes
+    del second
+
+
+def test_unreferenced_dataset_is_forgotten_first(tmp_path):
+    store = _store(tmp_path)
+    store.put("old", _frame(0)).release()
+    kept = store.put("used", _frame(1))
+    store.put("new", _frame(2))
+    keys = [e["key"] for e in store.usage()["entries"]]
+    assert "old" not in keys and "used" in keys
+    assert pinned_keys(tmp_path) <= {"used"}
+    del kept
+
+
+def test_disk_write_runs_outside_the_store_lock(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    store_cached = dataset_store.store_cached
+    lock_free = []
+
+    def _try_lock():
+        acquired = store._lock.acquire(timeout=5)
+        if acquired:
+            store._lock.release()
+        lock_free.append(acquired)
+
+    def _store_cached(*args, **kwargs):
+        # Une autre session doit pouvoir prendre le verrou pendant l'écriture
+        thread = threading.Thread(target=_try_lock)
+        thread.start()
+        thread.join()
+        return store_cached(*args, **kwargs)
+
+    monkeypatch.setattr(dataset_store, "store_cached", _store_cached)
+    handles = [store.put("first", _frame(0)), store.put("second", _frame(1))]
+    assert lock_free == [True]
+    assert _state(store, "first") == (False, 1, True)
+    del handles
+
+
+def test_failed_write_keeps_dataset_in_memory(tmp_path, monkeypatch, capsys):
+    store = _store(tmp_path)
+    monkeypatch.setattr(dataset_store, "store_cached", lambda *args, **kwargs: False)
+    handles = [store.put("first", _frame(0)), store.put("second", _frame(1))]
+    assert _state(store, "first") == (True, 1, False)
+    assert pinned_keys(tmp_path) == set()
+    assert "conservé en mémoire" in capsys.readouterr().out
+    del handles
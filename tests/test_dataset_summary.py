@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.visualisation_with_llm.dataset_summary import (
+    _group_members, column_kinds, compact_llm_summary, count_tokens, frame_column_kinds,
+    render_llm_summary,
+)
+from src.visualisation_with_llm.profiler import profile_dataset
+
+
+def _profile(columns, n=50):
+    rng = np.random.default_rng(0)
+    data = {}
+    for name in columns:
+        data[name] = rng.choice(["nord", "sud"], n) if name.startswith("region") else rng.random(n)
+    return profile_dataset(pd.DataFrame(data))
+
+
+def _wide_profile():
+    names = [f"capteur_{i}" for i in range(1, 201)] + ["prix_moyen", "region"]
+    names += [f"mesure_{i}" for i in (3, 5) + tuple(range(9, 41))]
+    names += [f"divers{c}{d}" for c in "abcdefgh" for d in "xyz"]
+    return _profile(names)
+
+
+def _members(names):
+    return _profile(names).columns
+
+
+def test_group_members_by_index_set():
+    assert _group_members("x_#", _members([f"x_{i}" for i in range(1, 41)])) == "de x_1 à x_40"
+    names = [f"x_{i}" for i in (3, 5) + tuple(range(9, 41))]
+    assert _group_members("x_#", _members(names)) == "# = 3, 5, 9–40"
+    # Numéros complétés par des zéros : conservés tels quels
+    padded = [f"t{i:02d}" for i in (1, 2, 3, 7, 8)]
+    assert _group_members("t#", _members(padded)) == "# = 01–03, 07–08"
+
+
+def test_group_members_with_several_numbers_lists_names():
+    names = ["a1_b1", "a1_b2", "a2_b1"]
+    assert _group_members("a#_b#", _members(names)) == "a1_b1, a1_b2, a2_b1"
+
+
+def test_small_summary_is_returned_whole():
+    profile = _profile(["prix", "region"])
+    assert compact_llm_summary(profile, "prix", max_tokens=1_000) == render_llm_summary(profile)
+
+
+@pytest.mark.parametrize("max_tokens", [80, 150, 400, 1_500])
+def test_compact_summary_stays_under_the_token_budget(max_tokens):
+    profile = _wide_profile()
+    assert count_tokens(render_llm_summary(profile)) > max_tokens
+    summary = compact_llm_summary(profile, "Comment évoluent les prix par région ?", max_tokens=max_tokens)
+    assert count_tokens(summary) <= max_tokens
+
+
+def test_compact_summary_groups_columns_and_ranks_by_relevance():
+    summary = compact_llm_summary(_wide_profile(), "Comment évoluent les prix par région ?", max_tokens=400)
+    lines = summary.splitlines()
+    columns = lines[lines.index("Colonnes (par pertinence pour la problématique) :") + 1:]
+    assert {columns[0].split()[1], columns[1].split()[1]} == {"prix_moyen", "region"}
+    assert any(line.startswith("- capteur_# : 200 colonnes") and "de capteur_1 à capteur_200" in line
+               for line in columns)
+    assert any(line.startswith("- mesure_# : 34 colonnes") and "# = 3, 5, 9–40" in line for line in columns)
+
+
+def test_columns_beyond_the_budget_are_counted():
+    summary = compact_llm_summary(_wide_profile(), "prix", max_tokens=80)
+    last = summary.splitlines()[-1]
+    assert last.startswith("Autres colonnes : ") and "non listées)" in last
+
+
+def test_column_kinds_from_profile_and_frame_agree():
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"], "c": [True, False], "d": [1.5, None]})
+    assert column_kinds(profile_dataset(df)) == frame_column_kinds(df) == {
+        "a": True, "b": False, "c": False, "d": True,
+    }
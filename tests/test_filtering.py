@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.visualisation_with_llm.filtering import SPARSE_FRACTION, count_rows, filter_kind, filter_rows
+
+
+def _frame(n=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=n)
+    x[rng.random(n) < 0.1] = np.nan
+    cat = pd.Series(rng.choice(["a", "b", "c", "d"], n), dtype=object)
+    cat[rng.random(n) < 0.1] = None
+    return pd.DataFrame({"x": x, "y": rng.integers(0, 100, n), "cat": cat})
+
+
+def _reference(df, filters):
+    """Masque booléen équivalent : un filtre qui retient toutes les valeurs renseignées est ignoré"""
+    mask = np.ones(len(df), dtype=bool)
+    for col, condition in filters.items():
+        series = df[col]
+        if filter_kind(condition, series) == "range":
+            lo, hi = condition
+            selected = ((series >= lo) & (series <= hi)).to_numpy()
+        else:
+            selected = series.isin(list(condition)).to_numpy()
+        if selected.sum() < series.notna().sum():
+            mask &= selected
+    return np.flatnonzero(mask)
+
+
+def _check(df, filters):
+    rows = filter_rows(df, filters)
+    expected = _reference(df, filters)
+    if rows is None:
+        assert len(expected) == len(df)
+    else:
+        np.testing.assert_array_equal(rows, expected)
+    return rows
+
+
+def test_sparse_path_matches_mask():
+    df = _frame()
+    filters = {"x": (0.0, 0.05), "cat": ["a", "b"], "y": (10, 90)}
+    rows = _check(df, filters)
+    assert len(rows) <= len(df) * SPARSE_FRACTION
+
+
+def test_dense_path_matches_mask():
+    df = _frame()
+    rows = _check(df, {"x": (-1.0, 2.0), "cat": ["a", "c", "d"]})
+    assert len(rows) > len(df) * SPARSE_FRACTION
+
+
+def test_all_categories_keep_missing_values():
+    df = _frame()
+    assert filter_rows(df, {"cat": ["a", "b", "c", "d"]}) is None
+    assert count_rows(df, {"cat": ["a", "b", "c", "d"], "x": (-np.inf, np.inf)}) == len(df)
+
+
+def test_partial_selection_drops_missing_values():
+    df = _frame()
+    rows = _check(df, {"cat": ["a", "b", "c"]})
+    assert df["cat"].iloc[rows].notna().all()
+    rows = _check(df, {"x": (-3.0, 1.0)})
+    assert df["x"].iloc[rows].notna().all()
+
+
+def test_list_bounds_are_a_range_on_numeric_columns():
+    df = _frame()
+    assert filter_kind([10, 20], df["y"]) == "range"
+    assert filter_kind([10, 20, 30], df["y"]) == "category"
+    assert filter_kind(["a", "b"], df["cat"]) == "category"
+    np.testing.assert_array_equal(filter_rows(df, {"y": [10, 20]}), filter_rows(df, {"y": (10, 20)}))
+
+
+def test_invalid_filters():
+    df = _frame()
+    with pytest.raises(ValueError):
+        filter_kind("a")
+    with pytest.raises(ValueError):
+        filter_kind((1, 2, 3))
+    assert filter_rows(df, {}) is None
+    assert filter_rows(df, {"missing": (0, 1)}) is None
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.visualisation_with_llm import histogram
+from src.visualisation_with_llm.histogram import (
+    binned_kde, clear_histograms, column_distribution, forget_histograms, histogram_counts,
+)
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    clear_histograms()
+    yield
+    clear_histograms()
+
+
+@pytest.mark.parametrize("values", [
+    np.random.default_rng(0).normal(size=50_000),
+    # Valeurs entières : beaucoup de points exactement sur les bornes des bins
+    np.random.default_rng(1).integers(0, 101, 50_000).astype(float),
+])
+@pytest.mark.parametrize("bins", [1, 7, 20, 100])
+def test_bin_counts_match_numpy(values, bins):
+    counts, edges = histogram_counts(column_distribution(pd.Series(values, name="v")), bins)
+    expected, expected_edges = np.histogram(values, bins=bins)
+    np.testing.assert_allclose(edges, expected_edges)
+    np.testing.assert_array_equal(counts, expected)
+
+
+def test_constant_column_has_a_single_full_bin():
+    counts, edges = histogram_counts(column_distribution(pd.Series([3.0] * 10)), bins=5)
+    assert counts.sum() == 10 and edges[0] < 3.0 < edges[-1]
+
+
+def test_missing_and_infinite_values_are_ignored():
+    distribution = column_distribution(pd.Series([1.0, np.nan, 2.0, np.inf, 3.0, "x"]))
+    assert distribution.count == 3
+    assert (distribution.mean, distribution.median) == (2.0, 2.0)
+
+
+def test_kde_integrates_to_one():
+    values = np.sort(np.random.default_rng(0).normal(size=100_000))
+    x, density = binned_kde(values)
+    assert x[0] >= values[0] and x[-1] <= values[-1]
+    assert abs(np.trapezoid(density, x) - 1) < 0.01
+
+
+def test_kde_matches_direct_evaluation():
+    values = np.sort(np.random.default_rng(0).gamma(2.0, size=5_000))
+    x, density = binned_kde(values)
+    bandwidth = values.std(ddof=1) * len(values) ** (-1 / 5)
+    points = x[::32]
+    direct = np.exp(-0.5 * ((points[:, None] - values[None, :]) / bandwidth) ** 2).sum(axis=1)
+    direct /= len(values) * bandwidth * np.sqrt(2 * np.pi)
+    np.testing.assert_allclose(density[::32], direct, rtol=0.02, atol=1e-3 * direct.max())
+
+
+def test_degenerate_kde_is_empty():
+    assert len(binned_kde(np.array([1.0]))[0]) == 0
+    assert len(binned_kde(np.array([2.0, 2.0, 2.0]))[0]) == 0
+
+
+def test_cache_is_bounded_and_forgotten_per_dataset(monkeypatch):
+    series = pd.Series(np.arange(10_000.0), name="v")
+    one = column_distribution(series, dataset_key="d1")
+    monkeypatch.setattr(histogram, "HISTOGRAM_CACHE_MAX_BYTES", int(one.nbytes * 2.5))
+    assert column_distribution(series, dataset_key="d1") is one
+    for key in ("d2", "d3"):
+        column_distribution(series, dataset_key=key)
+    # Le budget ne tient que deux colonnes : la plus ancienne est évincée
+    assert list(histogram._cache) == [("d2", "v"), ("d3", "v")]
+    assert histogram._cache_bytes == 2 * one.nbytes
+    forget_histograms("d2")
+    assert list(histogram._cache) == [("d3", "v")]
@@ -0,0 +1,127 @@
+import json
+
+from src.visualisation_with_llm.llm_utils import (
+    _merge_repaired, iter_json_objects, iter_specs_from_stream, normalize_spec, validate_spec,
+)
+
+COLUMNS = {"prix": True, "age": True, "Region": False}
+
+
+def _objects(text, chunk_size=None):
+    chunks = [text] if chunk_size is None else [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+    return [json.loads(obj) for obj in iter_json_objects(chunks)]
+
+
+# =========================================================
+# iter_json_objects
+# =========================================================
+
+def test_json_lines_split_across_chunks():
+    text = '{"type": "bar", "x": "a"}\n{"type": "line", "x": "b"}\n'
+    expected = [{"type": "bar", "x": "a"}, {"type": "line", "x": "b"}]
+    assert _objects(text) == expected
+    assert _objects(text, chunk_size=3) == expected
+
+
+def test_code_fence_and_surrounding_text_are_ignored():
+    text = 'Voici les specs :\n```json\n[\n  {"type": "count", "x": "a"},\n  {"type": "heatmap"}\n]\n```\nFin.'
+    assert _objects(text) == [{"type": "count", "x": "a"}, {"type": "heatmap"}]
+
+
+def test_braces_and_quotes_inside_strings():
+    text = r'{"title": "Moyenne {par} région", "justification": "dit \"}\" puis {"}'
+    assert _objects(text, chunk_size=5) == [
+        {"title": "Moyenne {par} région", "justification": 'dit "}" puis {'}
+    ]
+
+
+def test_nested_objects_are_returned_whole():
+    assert _objects('{"type": "bar", "meta": {"x": 1}} {"type": "line"}') == [
+        {"type": "bar", "meta": {"x": 1}}, {"type": "line"}
+    ]
+
+
+def test_unterminated_object_is_not_returned():
+    assert _objects('{"type": "bar"} {"type": "li') == [{"type": "bar"}]
+
+
+# =========================================================
+# normalize_spec
+# =========================================================
+
+def test_normalize_keys_case_and_null_values():
+    spec = normalize_spec({"Type": "Scatter", " X ": " prix ", "y": "null", "HUE": "None", "title": 3})
+    assert spec == {"type": "scatter", "x": "prix", "y": None, "hue": None, "title": "3", "justification": ""}
+
+
+def test_normalize_defaults():
+    assert normalize_spec({}) == {
+        "type": None, "x": None, "y": None, "hue": None, "title": "Visualisation", "justification": ""
+    }
+
+
+# =========================================================
+# validate_spec
+# =========================================================
+
+def test_column_case_is_fixed():
+    spec = normalize_spec({"type": "bar", "x": "region", "y": "PRIX"})
+    assert validate_spec(spec, COLUMNS) == []
+    assert (spec["x"], spec["y"]) == ("Region", "prix")
+
+
+def test_unknown_hue_is_dropped():
+    spec = normalize_spec({"type": "scatter", "x": "prix", "y": "age", "hue": "inconnue"})
+    assert validate_spec(spec, COLUMNS) == []
+    assert spec["hue"] is None
+
+
+def test_non_numeric_y_is_rejected():
+    spec = normalize_spec({"type": "boxplot", "x": "prix", "y": "Region"})
+    assert validate_spec(spec, COLUMNS) == ["colonne y='Region' non numérique"]
+
+
+def test_unknown_and_missing_columns():
+    assert validate_spec(normalize_spec({"type": "scatter", "x": "prix", "y": "poids"}), COLUMNS) == [
+        "colonne y='poids' inexistante"
+    ]
+    assert validate_spec(normalize_spec({"type": "line", "x": "prix"}), COLUMNS) == [
+        "colonne y obligatoire pour un line"
+    ]
+    assert validate_spec(normalize_spec({"type": "camembert", "x": "prix"}), COLUMNS)[0].startswith("type")
+
+
+def test_histogram_drops_y_and_heatmap_drops_columns():
+    histogram = normalize_spec({"type": "histogram", "x": "age", "y": "prix"})
+    assert validate_spec(histogram, COLUMNS) == [] and histogram["y"] is None
+    heatmap = normalize_spec({"type": "heatmap", "x": "inconnue"})
+    assert validate_spec(heatmap, COLUMNS) == [] and heatmap["x"] is None
+
+
+def test_without_columns_only_shape_is_checked():
+    assert validate_spec(normalize_spec({"type": "scatter", "x": "a", "y": "b"})) == []
+
+
+# =========================================================
+# Flux et réparation
+# =========================================================
+
+def test_stream_rejects_invalid_specs_and_duplicates():
+    text = "\n".join([
+        '{"type": "scatter", "x": "prix", "y": "age"}',
+        '{"type": "scatter", "x": "PRIX", "y": "age"}',
+        '{"type": "bar", "x": "Region", "y": "Region"}',
+        '{"type": "count", "x": "Region"',
+    ])
+    rejected = []
+    specs = list(iter_specs_from_stream([text], columns=COLUMNS, rejected=rejected))
+    assert [(s["type"], s["x"], s["y"]) for s in specs] == [("scatter", "prix", "age")]
+    assert len(rejected) == 1 and rejected[0][1] == ["colonne y='Region' non numérique"]
+
+
+def test_merge_repaired_skips_duplicates():
+    first = normalize_spec({"type": "bar", "x": "Region", "y": "prix"})
+    same = normalize_spec({"type": "bar", "x": "Region", "y": "prix"})
+    other = normalize_spec({"type": "histogram", "x": "age"})
+    assert _merge_repaired([first], [same, other, other], allow_duplicates=False) == [first, other]
+    assert len(_merge_repaired([first], [same, other], allow_duplicates=True)) == 3
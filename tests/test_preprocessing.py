@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.visualisation_with_llm import preprocessing
+from src.visualisation_with_llm.preprocessing import (
+    clean_column, clear_prepared, dataset_fingerprint, forget_prepared, frame_key, prepare_columns,
+)
+
+
+@pytest.fixture(autouse=True)
+def _empty_memo():
+    clear_prepared()
+    yield
+    clear_prepared()
+
+
+def _text_frame(n=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "texte": pd.Series([f" v{v} " for v in rng.integers(0, 1_000, n)], dtype=object),
+        "nombre": rng.random(n),
+    })
+
+
+def _column_bytes(df, col="texte"):
+    return int(clean_column(df[col]).memory_usage(index=False, deep=True))
+
+
+def test_clean_column():
+    # Plus de la moitié des valeurs convertibles : colonne numérique
+    cleaned = clean_column(pd.Series([" 1 ", "2", "NULL", "x", "4.5"], dtype=object))
+    assert cleaned.tolist()[:2] == [1.0, 2.0] and cleaned.isna().sum() == 2
+    text = clean_column(pd.Series([" a", "b ", "nan", "1"], dtype=object))
+    assert text.tolist()[:2] == ["a", "b"] and pd.isna(text.iloc[2])
+    numeric = pd.Series([1.0, 2.0])
+    assert clean_column(numeric) is numeric
+
+
+def test_columns_are_cleaned_once_per_dataset(monkeypatch):
+    calls = []
+    clean = preprocessing.clean_column
+    monkeypatch.setattr(preprocessing, "clean_column", lambda s: calls.append(s.name) or clean(s))
+    df = _text_frame()
+    first = prepare_columns(df, ["texte", "absente"], dataset_key="k")
+    second = prepare_columns(df, ["texte", "nombre"], dataset_key="k")
+    assert calls == ["texte", "nombre"]
+    assert list(first.columns) == ["texte"] and frame_key(second) == "k"
+    pd.testing.assert_series_equal(first["texte"], second["texte"])
+
+
+def test_memo_evicts_oldest_dataset_beyond_the_byte_budget(monkeypatch):
+    frames = [_text_frame(seed=i) for i in range(3)]
+    nbytes = _column_bytes(frames[0])
+    monkeypatch.setattr(preprocessing, "PREPARED_MAX_BYTES", int(nbytes * 2.5))
+    for i, df in enumerate(frames):
+        prepare_columns(df, ["texte", "nombre"], dataset_key=f"d{i}")
+    assert list(preprocessing._prepared) == ["d1", "d2"]
+    assert sum(preprocessing._prepared_bytes.values()) <= preprocessing.PREPARED_MAX_BYTES
+    # Les colonnes déjà numériques ne sont pas copiées : elles ne comptent pas
+    assert preprocessing._prepared_bytes["d2"] == _column_bytes(frames[2])
+
+
+def test_recently_used_dataset_is_kept(monkeypatch):
+    frames = [_text_frame(seed=i) for i in range(3)]
+    monkeypatch.setattr(preprocessing, "PREPARED_MAX_BYTES", int(_column_bytes(frames[0]) * 2.5))
+    prepare_columns(frames[0], ["texte"], dataset_key="d0")
+    prepare_columns(frames[1], ["texte"], dataset_key="d1")
+    prepare_columns(frames[0], ["texte"], dataset_key="d0")
+    prepare_columns(frames[2], ["texte"], dataset_key="d2")
+    assert list(preprocessing._prepared) == ["d0", "d2"]
+
+
+def test_column_larger_than_the_budget_is_not_memoized(monkeypatch):
+    df = _text_frame()
+    monkeypatch.setattr(preprocessing, "PREPARED_MAX_BYTES", _column_bytes(df) // 2)
+    prepared = prepare_columns(df, ["texte"], dataset_key="k")
+    assert prepared["texte"].str.startswith(" ").sum() == 0
+    assert preprocessing._prepared["k"] == {} and preprocessing._prepared_bytes["k"] == 0
+
+
+def test_dataset_count_limit(monkeypatch):
+    monkeypatch.setattr(preprocessing, "MAX_PREPARED_DATASETS", 2)
+    df = _text_frame(100)
+    for key in ("a", "b", "c"):
+        prepare_columns(df, ["texte"], dataset_key=key)
+    assert list(preprocessing._prepared) == ["b", "c"]
+
+
+def test_forget_prepared_includes_filtered_subsets():
+    df = _text_frame(100)
+    for key in ("k", "k:filtre", "kk", "autre"):
+        prepare_columns(df, ["texte"], dataset_key=key)
+    forget_prepared("k")
+    assert sorted(preprocessing._prepared) == ["autre", "kk"]
+    assert sorted(preprocessing._prepared_bytes) == ["autre", "kk"]
+
+
+def test_fingerprint_follows_content():
+    df = _text_frame(100)
+    assert dataset_fingerprint(df) == dataset_fingerprint(df.copy())
+    changed = df.copy()
+    changed.loc[0, "nombre"] = -1.0
+    assert dataset_fingerprint(changed) != dataset_fingerprint(df)
@@ -0,0 +1,177 @@
+import io
+import math
+
+import numpy as np
+import pandas as pd
+
+from src.visualisation_with_llm.profiler import StreamingProfiler, profile_csv, profile_dataset
+from src.visualisation_with_llm.sketches import ColumnSketch, CountMinSketch, HyperLogLog, KLLSketch
+
+
+def _hll_tolerance(sketch):
+    # Trois écarts-types de l'erreur relative de HyperLogLog
+    return 3 * 1.04 / math.sqrt(sketch.m)
+
+
+def _rank(values, x):
+    return np.searchsorted(np.sort(values), x, side="right") / len(values)
+
+
+# =========================================================
+# HyperLogLog
+# =========================================================
+
+def test_hll_estimate_within_error():
+    for n in (50, 5_000, 300_000):
+        sketch = HyperLogLog(0.01)
+        sketch.update(np.arange(n))
+        assert abs(sketch.estimate() - n) <= max(2, n * _hll_tolerance(sketch)), n
+
+
+def test_hll_merge_equals_union():
+    whole, left, right = HyperLogLog(0.02), HyperLogLog(0.02), HyperLogLog(0.02)
+    values = [f"id{i}" for i in range(100_000)]
+    whole.update(values)
+    left.update(values[:60_000])
+    right.update(values[40_000:])
+    assert left.merge(right).estimate() == whole.estimate()
+    assert abs(whole.estimate() - 100_000) <= 100_000 * _hll_tolerance(whole)
+
+
+# =========================================================
+# KLL
+# =========================================================
+
+def test_kll_rank_error():
+    values = np.random.default_rng(0).lognormal(size=200_000)
+    sketch = KLLSketch(0.01)
+    for chunk in np.array_split(values, 20):
+        sketch.update(chunk)
+    qs = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+    for q, x in sketch.quantiles(qs).items():
+        assert abs(_rank(values, x) - q) <= 0.02, q
+    assert sum(len(level) for level in sketch.levels) < len(values) / 50
+
+
+def test_kll_merge_keeps_rank_error():
+    rng = np.random.default_rng(1)
+    parts = [rng.normal(loc, size=50_000) for loc in (0, 3, 6)]
+    sketches = [KLLSketch(0.01, seed=i) for i in range(3)]
+    for sketch, part in zip(sketches, parts):
+        sketch.update(part)
+    merged = sketches[0].merge(sketches[1]).merge(sketches[2])
+    values = np.concatenate(parts)
+    for q, x in merged.quantiles([0.1, 0.5, 0.9]).items():
+        assert abs(_rank(values, x) - q) <= 0.02, q
+
+
+# =========================================================
+# Count-Min
+# =========================================================
+
+def test_count_min_heavy_hitters():
+    rng = np.random.default_rng(0)
+    values = pd.Series(np.concatenate([
+        np.repeat(["a", "b", "c"], [30_000, 20_000, 10_000]),
+        [f"rare{i}" for i in rng.integers(0, 50_000, 40_000)],
+    ]))
+    sketch = CountMinSketch(0.001)
+    for chunk in np.array_split(values, 10):
+        sketch.update(chunk)
+    top = sketch.top(3)
+    assert [v for v, _ in top] == ["a", "b", "c"]
+    for (value, n), true in zip(top, (30_000, 20_000, 10_000)):
+        assert true <= n <= true + sketch.error * sketch.total
+
+
+def test_count_min_top_always_returns_k_candidates():
+    # Aucune valeur au-dessus de la marge d'erreur : les meilleurs candidats restent listés
+    sketch = CountMinSketch(0.01)
+    sketch.update(pd.Series([f"id{i}" for i in range(20_000)] + ["id7"] * 3))
+    top = sketch.top(5)
+    assert len(top) == 5
+    # Effectifs jamais sous-estimés, triés ; l'ordre exact est noyé dans la marge d'erreur
+    counts = [n for _, n in top]
+    assert counts == sorted(counts, reverse=True)
+    assert min(counts) >= 1
+
+
+def test_count_min_merge():
+    left, right = CountMinSketch(0.001), CountMinSketch(0.001)
+    left.update(pd.Series(["x"] * 500 + ["y"] * 100))
+    right.update(pd.Series(["y"] * 700 + ["z"] * 10))
+    merged = left.merge(right)
+    assert merged.total == 1_310
+    assert [v for v, _ in merged.top(2)] == ["y", "x"]
+
+
+# =========================================================
+# Colonnes et profil par blocs
+# =========================================================
+
+def test_column_sketch_moments_are_exact_across_dtypes():
+    sketch = ColumnSketch("v", True)
+    blocks = [pd.Series([1, 2, 3], dtype="int8"), pd.Series([1.0, 2.5, np.nan], dtype="float32"),
+              pd.Series([-0.0, 0.0, 2], dtype="float64")]
+    for block in blocks:
+        sketch.update(block)
+    values = pd.concat(blocks).dropna().to_numpy(dtype=np.float64)
+    assert (sketch.rows, sketch.count) == (9, 8)
+    assert math.isclose(sketch.mean, values.mean())
+    assert math.isclose(sketch.m2 / (sketch.count - 1), values.var(ddof=1))
+    # 1 (int8) et 1.0 (float32) sont la même valeur, -0.0 et 0.0 aussi
+    assert sketch.distinct.estimate() == 5
+
+
+def _csv(n=60_000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "prix": rng.gamma(2.0, 10.0, n).round(2),
+        "age": rng.integers(18, 90, n),
+        "ville": rng.choice([f"v{i}" for i in range(40)], n),
+    })
+    return df, df.to_csv(index=False)
+
+
+def test_streaming_profile_matches_exact_profile():
+    df, text = _csv()
+    approx = profile_csv(io.StringIO(text), chunksize=7_000)
+    exact = profile_dataset(df)
+    assert approx.approximate and approx.n_rows == len(df)
+    for col in exact.columns:
+        sketch = approx[col.name]
+        assert sketch.count == col.count
+        assert abs(sketch.n_unique - col.n_unique) <= max(2, 0.03 * col.n_unique)
+        if col.is_numeric:
+            assert (sketch.min, sketch.max) == (col.min, col.max)
+            assert math.isclose(sketch.mean, col.mean) and math.isclose(sketch.std, col.std)
+            for q, x in sketch.quantiles.items():
+                assert abs(_rank(df[col.name], x) - q) <= 0.02
+        else:
+            assert sketch.top_values_approximate
+            assert sketch.top_values[0][0] == col.top_values[0][0]
+
+
+def test_streaming_profiler_uses_final_columns_and_dtypes():
+    df, _ = _csv(1_000)
+    profiler = StreamingProfiler()
+    for start in range(0, len(df), 300):
+        profiler.update(df.iloc[start:start + 300])
+    final = df[["ville", "prix"]].astype({"ville": "category"})
+    profile = profiler.profile(final)
+    assert [c.name for c in profile.columns] == ["ville", "prix"]
+    assert profile["ville"].dtype == "category"
+
+
+def test_load_path_remembers_the_streaming_profile(tmp_path, monkeypatch):
+    from src.visualisation_with_llm import dataset_cache
+    from src.visualisation_with_llm.profiler import cached_profile
+
+    df, text = _csv(5_000)
+    monkeypatch.setattr(dataset_cache, "APPROX_PROFILE_MIN_ROWS", 1_000)
+    loaded = dataset_cache.load_dataset_cached(io.BytesIO(text.encode()), digest="stream-test",
+                                               cache_dir=tmp_path, profile=True)
+    profile = cached_profile("stream-test")
+    assert profile is not None and profile.approximate
+    assert profile.n_rows == len(loaded) == len(df)
+    assert [c.name for c in profile.columns] == list(loaded.columns)
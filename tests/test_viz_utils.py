@@ -0,0 +1,37 @@
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from src.visualisation_with_llm.viz_utils import draw_density_scatter
+
+
+def _tick_labels(fig, axis):
+    fig.canvas.draw()
+    return [label.get_text() for label in axis.get_ticklabels() if label.get_text()]
+
+
+def test_density_scatter_keeps_dates_on_the_axes():
+    n = 5_000
+    rng = np.random.default_rng(0)
+    dates = pd.Series(pd.date_range("2024-01-01", periods=n, freq="h"))
+    data = pd.DataFrame({"date": dates, "valeur": rng.normal(size=n), "fin": dates + pd.Timedelta(days=30)})
+
+    fig = Figure()
+    ax = fig.add_subplot()
+    draw_density_scatter(ax, data, "date", "fin")
+    image = ax.get_images()[0]
+    xmin, xmax, ymin, ymax = image.get_extent()
+    assert np.isclose(xmin, mdates.date2num(dates.iloc[0]))
+    assert np.isclose(xmax, mdates.date2num(dates.iloc[-1]))
+    assert np.isclose(ymin, mdates.date2num(dates.iloc[0] + pd.Timedelta(days=30)))
+    assert any("2024" in label for label in _tick_labels(fig, ax.xaxis))
+    assert any("2024" in label for label in _tick_labels(fig, ax.yaxis))
+
+
+def test_density_scatter_numeric_axes_are_unchanged():
+    data = pd.DataFrame({"a": np.arange(1_000.0), "b": np.arange(1_000.0) * 2})
+    fig = Figure()
+    ax = fig.add_subplot()
+    draw_density_scatter(ax, data, "a", "b")
+    assert ax.get_images()[0].get_extent() == [0.0, 999.0, 0.0, 1998.0]